@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the emission throughput of the TikzLineWidth output module.
+
+Compares the buffered emitter at different chunk sizes with an unbuffered
+module that calls print() for every fragment, like xoj2tikz used to do.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xojtools import Layer, Page, Palette, Stroke
+from xojtools.outputmodules import TikzLineWidth
+
+class PrintPerFragment(TikzLineWidth):
+    """TikzLineWidth with one print() call per written fragment."""
+    def write(self, value):
+        print(value, file=self.output, end="")
+
+    def writeAll(self, fragments):
+        for fragment in fragments:
+            self.write(fragment)
+
+    def flush(self):
+        pass
+
+def makeDocument(pages, strokes, points):
+    """Create a document with random strokes, half of them variable width."""
+    random.seed(0)
+    palette = Palette()
+    colors = [palette.get(code) for code in ("black", "blue", "#12345678")]
+    document = []
+    for p in range(pages):
+        items = []
+        for s in range(strokes):
+            coords = array('d', [round(random.uniform(0, 600), 2)
+                                 for i in range(2*points)])
+            widths = None
+            if s % 2 == 1:
+                widths = array('d', [round(random.uniform(0.5, 2), 2)
+                                     for i in range(points - 1)])
+            items.append(Stroke(color=random.choice(colors), coords=coords,
+                                widths=widths, width=1.41))
+        document.append(Page(layerList=[Layer(itemList=items)]))
+    return document, palette
+
+def measure(moduleClass, document, palette, path, **kwargs):
+    """Write the document to 'path' and return (seconds, characters)."""
+    with open(path, "w") as output:
+        start = time.perf_counter()
+        moduleClass(document, output=output, palette=palette,
+                    **kwargs).printAll()
+        elapsed = time.perf_counter() - start
+    return elapsed, os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--strokes", type=int, default=100)
+    parser.add_argument("--points", type=int, default=200)
+    args = parser.parse_args()
+
+    document, palette = makeDocument(args.pages, args.strokes, args.points)
+    fd, path = tempfile.mkstemp(suffix=".tikz")
+    os.close(fd)
+    try:
+        runs = [("print() per fragment", PrintPerFragment, {})]
+        for size in (4096, 65536, 1048576):
+            runs.append(("buffered, {} chars".format(size), TikzLineWidth,
+                         {"bufferSize": size}))
+        for label, moduleClass, kwargs in runs:
+            elapsed, size = measure(moduleClass, document, palette, path,
+                                    **kwargs)
+            print("{:<24} {:8.3f}s {:8.2f} MB/s".format(label, elapsed,
+                                                       size / elapsed / 1e6))
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    sys.exit(main())
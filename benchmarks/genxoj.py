@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Generate synthetic Xournal documents for benchmarking.
+
+Strokes are random walks. A configurable share of them has variable width,
+and some strokes are replaced by circles, ellipses and rectangles as drawn by
+Xournal's shape recognizer.
+"""
+
+import sys
+import gzip
+import math
+import random
+import argparse
+
+COLORS = ["black", "blue", "red", "green", "orange", "#12345678", "#ff00ff80"]
+
+def _randomWalk(rand, points, width, height):
+    """Return a list of (x, y) tuples of a random walk."""
+    x = rand.uniform(0, width)
+    y = rand.uniform(0, height)
+    angle = rand.uniform(0, 2*math.pi)
+    coords = []
+    for i in range(points):
+        coords.append((x, y))
+        angle += rand.gauss(0, 0.3)
+        x = min(max(x + 1.5*math.cos(angle), 0), width)
+        y = min(max(y + 1.5*math.sin(angle), 0), height)
+    return coords
+
+def _circle(rand, width, height):
+    x = rand.uniform(50, width - 50)
+    y = rand.uniform(50, height - 50)
+    radius = rand.uniform(5, 40)
+    points = max(12, int(radius))
+    coords = [(x + radius*math.cos(2*math.pi*i/points),
+               y + radius*math.sin(2*math.pi*i/points))
+              for i in range(points)]
+    return coords + coords[:1]
+
+def _ellipse(rand, width, height):
+    x = rand.uniform(70, width - 70)
+    y = rand.uniform(70, height - 70)
+    a = rand.uniform(10, 60)
+    b = rand.uniform(5, a*0.8)
+    points = max(12, int(a))
+    coords = [(x + a*math.cos(2*math.pi*i/points),
+               y + b*math.sin(2*math.pi*i/points))
+              for i in range(points)]
+    return coords + coords[:1]
+
+def _rectangle(rand, width, height):
+    left = rand.uniform(0, width - 100)
+    top = rand.uniform(0, height - 100)
+    right = left + rand.uniform(5, 100)
+    bottom = top + rand.uniform(5, 100)
+    return [(left, top), (right, top), (right, bottom), (left, bottom),
+            (left, top)]
+
+def _stroke(coords, color, widths, tool="pen"):
+    return ('<stroke tool="{}" color="{}" width="{}">\n{}\n</stroke>\n'
+            .format(tool, color, " ".join("{:.2f}".format(w) for w in widths),
+                    " ".join("{:.2f} {:.2f}".format(x, y) for x, y in coords)))
+
+def generate(output, pages=10, layers=1, strokes=50, points=100,
+             variableWidth=0.3, circles=0.02, ellipses=0.02, rectangles=0.02,
+             texts=2, seed=0, width=612.0, height=792.0):
+    """
+    Write a synthetic, uncompressed Xournal document to the text file
+    'output'.
+    
+    Keyword arguments:
+    pages -- Number of pages (default 10)
+    layers -- Number of layers per page (default 1)
+    strokes -- Number of strokes per layer (default 50)
+    points -- Number of points per freehand stroke (default 100)
+    variableWidth -- Share of freehand strokes with variable width
+                     (default 0.3)
+    circles -- Share of strokes that are circles (default 0.02)
+    ellipses -- Share of strokes that are ellipses (default 0.02)
+    rectangles -- Share of strokes that are rectangles (default 0.02)
+    texts -- Number of text boxes per layer (default 2)
+    seed -- Seed of the random number generator (default 0)
+    width -- Page width in pt (default 612.0)
+    height -- Page height in pt (default 792.0)
+    """
+    rand = random.Random(seed)
+    output.write('<?xml version="1.0" standalone="no"?>\n'
+                 '<xournal version="0.4.5">\n'
+                 '<title>Xournal document - see '
+                 'http://math.univ-lyon1.fr/~auroux/xournal/</title>\n'
+                 '<preview>{}</preview>\n'.format("A" * 4096))
+    for p in range(pages):
+        output.write('<page width="{:.2f}" height="{:.2f}">\n'
+                     '<background type="solid" color="white" '
+                     'style="lined" />\n'.format(width, height))
+        for l in range(layers):
+            output.write("<layer>\n")
+            for s in range(strokes):
+                color = rand.choice(COLORS)
+                shape = rand.random()
+                if shape < circles:
+                    coords = _circle(rand, width, height)
+                elif shape < circles + ellipses:
+                    coords = _ellipse(rand, width, height)
+                elif shape < circles + ellipses + rectangles:
+                    coords = _rectangle(rand, width, height)
+                else:
+                    coords = _randomWalk(rand, points, width, height)
+                    if rand.random() < variableWidth:
+                        widths = [1.41] + [rand.uniform(0.5, 2.5)
+                                           for i in range(len(coords) - 1)]
+                        output.write(_stroke(coords, color, widths))
+                        continue
+                tool = "highlighter" if rand.random() < 0.1 else "pen"
+                output.write(_stroke(coords, color, [1.41], tool=tool))
+            for t in range(texts):
+                output.write('<text font="Sans" size="12.00" x="{:.2f}" '
+                             'y="{:.2f}" color="black">Text {}\n{}</text>\n'
+                             .format(rand.uniform(0, width - 50),
+                                     rand.uniform(0, height - 20), p, t))
+            output.write("</layer>\n")
+        output.write("</page>\n")
+    output.write("</xournal>\n")
+
+def addArguments(parser):
+    """Add the options of generate() to an ArgumentParser."""
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--layers", type=int, default=1)
+    parser.add_argument("--strokes", type=int, default=50,
+                        help="strokes per layer")
+    parser.add_argument("--points", type=int, default=100,
+                        help="points per freehand stroke")
+    parser.add_argument("--variable-width", dest="variableWidth", type=float,
+                        default=0.3, help="share of variable width strokes")
+    parser.add_argument("--circles", type=float, default=0.02)
+    parser.add_argument("--ellipses", type=float, default=0.02)
+    parser.add_argument("--rectangles", type=float, default=0.02)
+    parser.add_argument("--texts", type=int, default=2,
+                        help="text boxes per layer")
+    parser.add_argument("--seed", type=int, default=0)
+
+def generatorOptions(args):
+    """Return the generate() keyword arguments from parsed arguments."""
+    return {name: getattr(args, name)
+            for name in ("pages", "layers", "strokes", "points",
+                         "variableWidth", "circles", "ellipses", "rectangles",
+                         "texts", "seed")}
+
+def main():
+    parser = argparse.ArgumentParser(
+                description="Write a synthetic .xoj file for benchmarks.")
+    parser.add_argument("output", help="output .xoj file (gzip-compressed)")
+    addArguments(parser)
+    args = parser.parse_args()
+    
+    with gzip.open(args.output, "wt") as output:
+        generate(output, **generatorOptions(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Time the stages of xoj2tikz separately: parsing, every optimization pass and
+every output module. Results can be written as JSON and compared to an
+earlier run.
+
+e.g.: harness.py --pages 50 -o before.json
+      (change something)
+      harness.py --pages 50 -o after.json --compare before.json
+"""
+
+import io
+import os
+import sys
+import gzip
+import json
+import time
+import platform
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import genxoj
+from xojtools import optimizations, xournalparser, Stroke
+from xojtools import outputmodules
+
+def countPoints(document):
+    """Return the number of stroke points in a document."""
+    return sum(item.pointCount() for page in document
+               for layer in page.layerList for item in layer.itemList
+               if isinstance(item, Stroke))
+
+def timeit(function):
+    """Call function() and return the elapsed time in seconds."""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def runPass(manager, document):
+    """Apply a PassManager to all pages of a document."""
+    for page in document:
+        manager(page)
+
+def benchmark(data, repeat):
+    """
+    Run all stages 'repeat' times on the decompressed document 'data'.
+    Return a tuple of timings (stage -> list of seconds) and sizes.
+    """
+    timings = {}
+    sizes = {"input bytes": len(data)}
+    
+    def record(name, seconds):
+        timings.setdefault(name, []).append(seconds)
+    
+    for i in range(repeat):
+        record("parse", timeit(lambda: xournalparser.parse(io.BytesIO(data))))
+        record("iterparse", timeit(
+            lambda: list(xournalparser.iterparse(io.BytesIO(data)))))
+        
+        # Every registered pass on its own, in the default order, and the
+        # whole chain in one visit per stroke
+        document = xournalparser.parse(io.BytesIO(data))
+        sizes["input points"] = countPoints(document)
+        for name in optimizations.DEFAULT_PASSES:
+            manager = optimizations.PassManager(passes=[name])
+            record("optimizations." + name,
+                   timeit(lambda: runPass(manager, document)))
+        document = xournalparser.parse(io.BytesIO(data))
+        record("optimizations.PassManager", timeit(
+            lambda: runPass(optimizations.PassManager(), document)))
+        sizes["optimized points"] = countPoints(document)
+        
+        for name in outputmodules.__all__:
+            moduleClass = getattr(outputmodules, name)
+            output = io.StringIO()
+            record("output." + name, timeit(
+                lambda: moduleClass(document, output=output).printAll()))
+            sizes["output bytes " + name] = len(output.getvalue()
+                                                .encode("utf-8"))
+        output = io.StringIO()
+        record("output.TikzLineWidth(outline)", timeit(
+            lambda: outputmodules.TikzLineWidth(document, output=output,
+                                                outline=True).printAll()))
+        sizes["output bytes TikzLineWidth(outline)"] = len(
+            output.getvalue().encode("utf-8"))
+    return timings, sizes
+
+def summarize(timings):
+    """Return min, median and all runs of every stage."""
+    return {name: {"min": min(runs), "median": statistics.median(runs),
+                   "runs": runs}
+            for name, runs in timings.items()}
+
+def compare(old, new):
+    """Print a table comparing the median timings of two results."""
+    print("{:<32} {:>10} {:>10} {:>8}".format("stage", "before", "after",
+                                              "ratio"))
+    for name, result in new["timings"].items():
+        after = result["median"]
+        if name in old["timings"]:
+            before = old["timings"][name]["median"]
+            ratio = "{:7.2f}x".format(before / after) if after else "-"
+            print("{:<32} {:>9.4f}s {:>9.4f}s {:>8}".format(name, before,
+                                                            after, ratio))
+        else:
+            print("{:<32} {:>10} {:>9.4f}s {:>8}".format(name, "-", after,
+                                                         "-"))
+
+def main():
+    parser = argparse.ArgumentParser(
+                description="Benchmark the stages of xoj2tikz.")
+    parser.add_argument("-i", "--input", nargs="+",
+                        help=".xoj files to use instead of a generated one")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="write results as JSON")
+    parser.add_argument("-c", "--compare", metavar="JSON",
+                        help="compare with the results of an earlier run")
+    genxoj.addArguments(parser)
+    args = parser.parse_args()
+    
+    meta = {"python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat}
+    if args.input:
+        meta["inputs"] = args.input
+        data = [gzip.open(path).read() for path in args.input]
+    else:
+        meta["generator"] = genxoj.generatorOptions(args)
+        document = io.StringIO()
+        genxoj.generate(document, **meta["generator"])
+        data = [document.getvalue().encode("utf-8")]
+    
+    timings = {}
+    sizes = {}
+    for content in data:
+        contentTimings, contentSizes = benchmark(content, args.repeat)
+        for name, runs in contentTimings.items():
+            if name in timings:
+                timings[name] = [a + b for a, b in zip(timings[name], runs)]
+            else:
+                timings[name] = runs
+        for name, size in contentSizes.items():
+            sizes[name] = sizes.get(name, 0) + size
+    
+    results = {"meta": meta, "sizes": sizes, "timings": summarize(timings)}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    
+    if args.compare:
+        with open(args.compare) as old:
+            compare(json.load(old), results)
+    else:
+        for name, result in results["timings"].items():
+            print("{:<32} {:>9.4f}s".format(name, result["median"]))
+        for name, size in sorted(sizes.items()):
+            print("{:<32} {:>10}".format(name, size))
+
+if __name__ == "__main__":
+    sys.exit(main())
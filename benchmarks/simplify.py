@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Time optimizations.simplifyStrokes() on single long strokes: a straight
+ruler stroke, where almost every point is removed, and a freehand stroke,
+where almost every point is kept.
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from xojtools import optimizations, Stroke
+
+def ruler(points):
+    """A straight line with evenly spaced points."""
+    coords = array('d')
+    for i in range(points):
+        coords.append(10.0 + 0.5*i)
+        coords.append(20.0 + 0.25*i)
+    return coords
+
+def freehand(points):
+    """A random walk."""
+    rand = random.Random(0)
+    coords = array('d')
+    x = y = angle = 0.0
+    for i in range(points):
+        coords.append(x)
+        coords.append(y)
+        angle += rand.gauss(0, 0.3)
+        x += math.cos(angle)
+        y += math.sin(angle)
+    return coords
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--points", type=int, nargs="+",
+                        default=[10000, 50000, 100000])
+    args = parser.parse_args()
+    
+    for name, make in (("ruler", ruler), ("freehand", freehand)):
+        for points in args.points:
+            stroke = Stroke(coords=make(points), width=1.41)
+            start = time.perf_counter()
+            stroke = optimizations.simplifyStrokes(stroke)
+            elapsed = time.perf_counter() - start
+            print("{:<9} {:>7} points: {:8.4f}s, {:>7} points kept"
+                  .format(name, points, elapsed, stroke.pointCount()))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+from math import sin, cos, pi
+
+from xojtools import batch
+
+"""
+Tests of xoj2tikz. Run them with "python3 -m unittest" in the top directory.
+"""
+
+def xournal(*pages):
+    """
+    Return a Xournal document with the given pages, each a string with the
+    XML content of a layer (e.g. stroke elements), as bytes.
+    """
+    parts = ['<?xml version="1.0" standalone="no"?>\n'
+             '<xournal version="0.4.5">\n']
+    for layer in pages:
+        parts.append('<page width="612.00" height="792.00">\n'
+                     '<background type="solid" color="white" '
+                     'style="plain" />\n<layer>\n')
+        parts.append(layer)
+        parts.append('</layer>\n</page>\n')
+    parts.append('</xournal>\n')
+    return "".join(parts).encode("utf-8")
+
+def convert(document, **kwargs):
+    """
+    Convert a Xournal document (bytes) with batch.convert() and return the
+    output. All keyword arguments are passed on to batch.convert().
+    """
+    output = io.StringIO()
+    batch.convert(io.BytesIO(document), output, **kwargs)
+    return output.getvalue()
+
+def _circle(x, y, radius, count=40):
+    """Return the coordinates of a closed, hand drawn looking circle."""
+    points = ["{:.2f} {:.2f}".format(x + radius*cos(2*pi*i/count),
+                                     y + radius*sin(2*pi*i/count))
+              for i in range(count)]
+    points.append(points[0])
+    return " ".join(points)
+
+# Two pages with every kind of item: strokes of fixed and variable width, a
+# highlighter stroke (with opacity), a single point, a box and a circle that
+# are replaced by shapes, and text with LaTeX commands and characters that
+# PDF and SVG escape.
+SAMPLE_PAGES = (
+    '<stroke tool="pen" color="blue" width="1.41">\n'
+    '10.00 10.00 50.00 80.00 90.00 20.00 130.00 60.00\n</stroke>\n'
+    '<stroke tool="highlighter" color="yellow" width="8.50">\n'
+    '10.00 100.00 200.00 110.00\n</stroke>\n'
+    '<stroke tool="pen" color="red" width="1.41 0.8 1.2 0.9">\n'
+    '20.00 150.00 60.00 170.00 100.00 150.00 140.00 190.00\n</stroke>\n'
+    '<stroke tool="pen" color="black" width="1.41">\n'
+    '300.00 300.00 400.00 300.00 400.00 350.00 300.00 350.00 '
+    '300.00 300.00\n</stroke>\n'
+    '<stroke tool="pen" color="green" width="2.26">\n' +
+    _circle(200, 500, 15) + '\n</stroke>\n'
+    '<text font="Sans" size="12.00" x="100.00" y="600.00" color="black">'
+    'Caf\u00e9 (1) \\textbf{x} $&lt;$</text>\n',
+    '<stroke tool="pen" color="black" width="1.41">\n'
+    '10.00 10.00\n</stroke>\n'
+    '<stroke tool="pen" color="#ff800080" width="1.41">\n'
+    '100.00 100.00 500.00 700.00\n</stroke>\n')
+
+SAMPLE = xournal(*SAMPLE_PAGES)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from xojtools import batch
+from . import xournal
+
+"""Tests of the batch module."""
+
+PAGE = ('<stroke tool="pen" color="black" width="1.41">\n'
+        '10.00 10.00 50.00 80.00 90.00 20.00\n</stroke>\n')
+
+class SplitTest(unittest.TestCase):
+    """Writing every page to its own file with a master file."""
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.master = os.path.join(self.directory, "notes.tikz")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def convert(self, pageCount):
+        """Convert a document with 'pageCount' pages."""
+        path = os.path.join(self.directory, "notes.xoj")
+        with open(path, "wb") as xoj:
+            xoj.write(xournal(*[PAGE]*pageCount))
+        with open(path, "rb") as xoj:
+            batch.convert(xoj, None, split=self.master)
+
+    def pageFiles(self):
+        """Return the sorted names of the page files."""
+        return sorted(name for name in os.listdir(self.directory)
+                      if "-page" in name)
+
+    def testFiles(self):
+        self.convert(2)
+        self.assertEqual(self.pageFiles(),
+                         ["notes-page1.tikz", "notes-page2.tikz"])
+        with open(self.master) as master:
+            self.assertEqual(master.read(), "\\input{notes-page1.tikz}\n"
+                                            "\\input{notes-page2.tikz}\n")
+
+    def testUnchangedFilesKept(self):
+        self.convert(2)
+        paths = [self.master, os.path.join(self.directory, "notes-page1.tikz")]
+        for path in paths:
+            os.utime(path, (0, 0))
+        self.convert(2)
+        for path in paths:
+            self.assertEqual(os.stat(path).st_mtime, 0)
+
+    def testStalePagesRemoved(self):
+        self.convert(3)
+        self.convert(1)
+        self.assertEqual(self.pageFiles(), ["notes-page1.tikz"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+from array import array
+from math import sin, cos, pi, hypot, radians
+
+from xojtools import optimizations, Stroke, Circle, Ellipse, Rectangle
+from xojtools import Polygon, Curve
+
+"""Tests of the optimization passes and the fitting functions they use."""
+
+def _segmentDistance(px, py, ax, ay, bx, by):
+    """Return the distance of (px, py) to the segment (ax, ay)-(bx, by)."""
+    dx = bx - ax
+    dy = by - ay
+    length2 = dx*dx + dy*dy
+    t = 0.0
+    if length2 > 0:
+        t = max(0.0, min(1.0, ((px - ax)*dx + (py - ay)*dy) / length2))
+    return hypot(px - ax - t*dx, py - ay - t*dy)
+
+def _deviation(xList, yList, indices):
+    """Return the largest distance of a point to the simplified polyline."""
+    result = 0.0
+    for start, end in zip(indices, indices[1:]):
+        for i in range(start + 1, end):
+            result = max(result, _segmentDistance(
+                                     xList[i], yList[i], xList[start],
+                                     yList[start], xList[end], yList[end]))
+    return result
+
+def _stroke(points, width=1.41, widths=None):
+    """Return a black Stroke through a list of (x, y) tuples."""
+    coords = array('d')
+    for x, y in points:
+        coords.append(x)
+        coords.append(y)
+    if widths is not None:
+        widths = array('d', widths)
+    return Stroke(color=(0, 0, 0, 1.0), coords=coords, width=width,
+                  widths=widths)
+
+def _ellipsePoints(x, y, a, b, angle, count, closed=True):
+    """
+    Return 'count' points on an ellipse with center (x, y), semi-axes 'a' and
+    'b', rotated by 'angle' degrees, and the first one again if 'closed'.
+    """
+    c = cos(radians(angle))
+    s = sin(radians(angle))
+    points = []
+    for i in range(count):
+        t = 2*pi*i/count
+        u = a*cos(t)
+        v = b*sin(t)
+        points.append((x + u*c - v*s, y + u*s + v*c))
+    if closed:
+        points.append(points[0])
+    return points
+
+def _side(start, end, count):
+    """Return 'count' points from 'start' towards (excluding) 'end'."""
+    return [(start[0] + (end[0] - start[0])*i/count,
+             start[1] + (end[1] - start[1])*i/count) for i in range(count)]
+
+def _handDrawn(corners, count=20, noise=0.3):
+    """Return a closed, slightly wobbly stroke through 'corners'."""
+    points = []
+    for i, corner in enumerate(corners):
+        points.extend(_side(corner, corners[(i + 1) % len(corners)], count))
+    points = [(x + noise*sin(i*1.3), y + noise*cos(i*0.7))
+              for i, (x, y) in enumerate(points)]
+    points.append(points[0])
+    return points
+
+# A wavy line with 200 points
+WAVE_X = [i * 0.5 for i in range(200)]
+WAVE_Y = [3 * sin(i / 10) + 0.05 * sin(i * 1.7) for i in range(200)]
+
+class SimplificationTest(unittest.TestCase):
+    """Ramer-Douglas-Peucker and Visvalingam-Whyatt."""
+    def testRdpDeviation(self):
+        for tolerance in (0.1, 0.25, 1.0):
+            indices = optimizations.ramerDouglasPeucker(WAVE_X, WAVE_Y,
+                                                        tolerance)
+            self.assertLess(len(indices), len(WAVE_X))
+            self.assertLessEqual(_deviation(WAVE_X, WAVE_Y, indices),
+                                 tolerance)
+
+    def testVisvalingamArea(self):
+        tolerance = 0.25
+        indices = optimizations.visvalingamWhyatt(WAVE_X, WAVE_Y, tolerance)
+        self.assertLess(len(indices), len(WAVE_X))
+        # Every remaining point forms a triangle of at least tolerance**2
+        # with its neighbours
+        for p, i, n in zip(indices, indices[1:], indices[2:]):
+            area = abs((WAVE_X[p] - WAVE_X[i]) * (WAVE_Y[n] - WAVE_Y[i]) -
+                       (WAVE_X[n] - WAVE_X[i]) * (WAVE_Y[p] - WAVE_Y[i])) / 2
+            self.assertGreaterEqual(area, tolerance**2)
+
+    def testEndsKept(self):
+        flatY = [y / 1000 for y in WAVE_Y]
+        for method in optimizations.SIMPLIFICATION_METHODS.values():
+            indices = method(WAVE_X, flatY, 1.0)
+            self.assertEqual(indices, [0, len(WAVE_X) - 1])
+            self.assertEqual(method([0.0, 1.0], [0.0, 1.0], 1.0), [0, 1])
+
+    def testDefault(self):
+        self.assertIs(optimizations.SIMPLIFICATION_METHODS[
+                          optimizations.DEFAULT_SIMPLIFICATION],
+                      optimizations.visvalingamWhyatt)
+
+class CircleTest(unittest.TestCase):
+    """Fitting and detecting circles."""
+    def testFitCircle(self):
+        points = _ellipsePoints(100, 200, 30, 30, 0, 36, closed=False)
+        x, y, radius = optimizations.fitCircle([p[0] for p in points],
+                                               [p[1] for p in points])
+        self.assertAlmostEqual(x, 100)
+        self.assertAlmostEqual(y, 200)
+        self.assertAlmostEqual(radius, 30)
+
+    def testCollinear(self):
+        self.assertIsNone(optimizations.fitCircle([0.0, 1.0, 2.0],
+                                                  [0.0, 1.0, 2.0]))
+
+    def testDetectCircle(self):
+        circle = optimizations.detectCircle(
+                     _stroke(_ellipsePoints(100, 200, 15, 15, 0, 40)))
+        self.assertIsInstance(circle, Circle)
+        self.assertAlmostEqual(circle.x, 100)
+        self.assertAlmostEqual(circle.y, 200)
+        self.assertAlmostEqual(circle.radius, 15)
+        self.assertEqual(circle.width, 1.41)
+
+    def testOpenStroke(self):
+        stroke = _stroke(_ellipsePoints(100, 200, 15, 15, 0, 40,
+                                        closed=False))
+        self.assertIs(optimizations.detectCircle(stroke), stroke)
+
+class EllipseTest(unittest.TestCase):
+    """Fitting and detecting ellipses."""
+    def testFitEllipse(self):
+        points = _ellipsePoints(300, 250, 60, 20, 30, 50, closed=False)
+        x, y, a, b, angle = optimizations.fitEllipse(
+                                [p[0] for p in points], [p[1] for p in points])
+        self.assertAlmostEqual(x, 300)
+        self.assertAlmostEqual(y, 250)
+        self.assertAlmostEqual(a, 60)
+        self.assertAlmostEqual(b, 20)
+        self.assertAlmostEqual(angle, 30)
+
+    def testAxesSwapped(self):
+        # The rotation stays between -45 and 45 degrees
+        points = _ellipsePoints(0, 0, 60, 20, 80, 50, closed=False)
+        x, y, a, b, angle = optimizations.fitEllipse(
+                                [p[0] for p in points], [p[1] for p in points])
+        self.assertAlmostEqual(a, 20)
+        self.assertAlmostEqual(b, 60)
+        self.assertAlmostEqual(angle, -10)
+
+    def testDetectEllipse(self):
+        ellipse = optimizations.detectEllipse(
+                      _stroke(_ellipsePoints(300, 250, 60, 20, 30, 60)))
+        self.assertIsInstance(ellipse, Ellipse)
+        self.assertAlmostEqual((ellipse.left + ellipse.right) / 2, 300)
+        self.assertAlmostEqual((ellipse.top + ellipse.bottom) / 2, 250)
+        self.assertAlmostEqual(ellipse.right - ellipse.left, 120)
+        self.assertAlmostEqual(ellipse.top - ellipse.bottom, 40)
+        self.assertAlmostEqual(ellipse.angle, 30)
+
+    def testNearCircle(self):
+        # Unevenly spaced points are rejected by circle detection, but
+        # ellipse detection writes a circle
+        stroke = _stroke(_ellipsePoints(100, 100, 30, 30, 0, 20)[:10] +
+                         _ellipsePoints(100, 100, 30, 30, 0, 60)[30:])
+        self.assertIs(optimizations.detectCircle(stroke), stroke)
+        circle = optimizations.detectEllipse(stroke)
+        self.assertIsInstance(circle, Circle)
+        self.assertAlmostEqual(circle.radius, 30)
+
+class PolygonTest(unittest.TestCase):
+    """Detecting rectangles and polygons."""
+    def testDetectRectangle(self):
+        stroke = _stroke([(10, 20), (110, 20), (110, 70), (10, 70), (10, 20)])
+        rectangle = optimizations.detectRectangle(stroke)
+        self.assertIsInstance(rectangle, Rectangle)
+        self.assertEqual((rectangle.x1, rectangle.y1, rectangle.x2,
+                          rectangle.y2), (10, 20, 110, 70))
+
+    def testTriangle(self):
+        corners = [(100, 100), (200, 100), (150, 180)]
+        polygon = optimizations.detectPolygon(_stroke(_handDrawn(corners)))
+        self.assertIsInstance(polygon, Polygon)
+        self.assertEqual(len(polygon.points), 3)
+        for (x, y), (cx, cy) in zip(polygon.points, corners):
+            self.assertLess(hypot(x - cx, y - cy), 0.5)
+
+    def testRotatedBox(self):
+        c = cos(radians(25))
+        s = sin(radians(25))
+        corners = [(300 + dx*c - dy*s, 300 + dx*s + dy*c)
+                   for dx, dy in ((-50, -30), (50, -30), (50, 30), (-50, 30))]
+        rectangle = optimizations.detectPolygon(
+                        _stroke(_handDrawn(corners, 25, 0.0)))
+        self.assertIsInstance(rectangle, Rectangle)
+        self.assertAlmostEqual(rectangle.angle, 25)
+        self.assertAlmostEqual(rectangle.x1, 250)
+        self.assertAlmostEqual(rectangle.y1, 270)
+        self.assertAlmostEqual(rectangle.x2, 350)
+        self.assertAlmostEqual(rectangle.y2, 330)
+
+    def testOpenLine(self):
+        stroke = _stroke(_side((0, 0), (200, 50), 40))
+        self.assertIs(optimizations.detectPolygon(stroke), stroke)
+
+def _bezier(start, segment, t):
+    """Return the point at 't' of a cubic Bezier curve."""
+    x1, y1, x2, y2, x3, y3 = segment
+    s = 1 - t
+    return (s*s*s*start[0] + 3*s*s*t*x1 + 3*s*t*t*x2 + t*t*t*x3,
+            s*s*s*start[1] + 3*s*s*t*y1 + 3*s*t*t*y2 + t*t*t*y3)
+
+class CurveTest(unittest.TestCase):
+    """Replacing smooth strokes by Bezier curves."""
+    def testArc(self):
+        points = [(100 + 80*cos(t/100), 100 + 80*sin(t/100))
+                  for t in range(0, 300)]
+        tolerance = 0.1
+        curve = optimizations.fitCurves(_stroke(points), tolerance)
+        self.assertIsInstance(curve, Curve)
+        self.assertEqual(curve.start, points[0])
+        self.assertEqual(curve.segments[-1][4:], points[-1])
+        self.assertLess(len(curve.segments), 10)
+        samples = []
+        start = curve.start
+        for segment in curve.segments:
+            samples.extend(_bezier(start, segment, i/1000)
+                           for i in range(1001))
+            start = segment[4:]
+        for x, y in points:
+            distance = min(hypot(x - sx, y - sy) for sx, sy in samples)
+            self.assertLess(distance, tolerance*1.1)
+
+class WidthTest(unittest.TestCase):
+    """Simplifying strokes with variable width."""
+    def testSleeve(self):
+        points = [(i, 50 + 0.02*sin(i)) for i in range(100)]
+        widths = [1.0 + 0.01*(i % 7) for i in range(99)] + [1.0]
+        tolerance = 0.05
+        widthTolerance = 0.1
+        stroke = optimizations.simplifyWidths(
+                     _stroke(points, widths=widths), tolerance, widthTolerance)
+        coords = stroke.coords
+        kept = list(zip(coords[0::2], coords[1::2]))
+        self.assertLess(len(kept), 10)
+        indices = [points.index(point) for point in kept]
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(points) - 1)
+        for k, (start, end) in enumerate(zip(indices, indices[1:])):
+            for i in range(start + 1, end):
+                self.assertLessEqual(_segmentDistance(
+                    points[i][0], points[i][1], points[start][0],
+                    points[start][1], points[end][0], points[end][1]),
+                    tolerance)
+            # Every original width of a merged segment is close to its width
+            for i in range(start, end):
+                self.assertLessEqual(abs(widths[i] - stroke.widths[k]),
+                                     widthTolerance)
+
+if __name__ == "__main__":
+    unittest.main()
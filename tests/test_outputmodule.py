@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import unittest
+
+from xojtools import xournalparser
+from xojtools import outputmodules as Output
+from . import xournal, convert
+
+"""Tests of the OutputModule base class."""
+
+def _page(number):
+    """Return the layer content of a page with a stroke, circle and text."""
+    return ('<stroke tool="pen" color="blue" width="1.41">\n'
+            '{0}.00 10.00 50.00 80.00 90.00 20.00\n</stroke>\n'
+            '<stroke tool="pen" color="red" width="1.41 0.8 0.9">\n'
+            '10.00 {0}.50 60.00 60.00 70.00 90.00\n</stroke>\n'
+            '<text font="Sans" size="12.00" x="100.00" y="{0}.00" '
+            'color="black">Page {0}</text>\n'.format(number))
+
+DOCUMENT = xournal(*[_page(i) for i in range(10, 22)])
+
+class ParallelTest(unittest.TestCase):
+    """Rendering pages in parallel processes."""
+    def testSameOutput(self):
+        serial = convert(DOCUMENT)
+        self.assertEqual(serial, convert(DOCUMENT, jobs=3))
+        self.assertEqual(serial, convert(DOCUMENT, jobs=3, stream=True))
+
+    def testSameOutputOtherFormats(self):
+        for moduleClass in (Output.Pgf, Output.Svg):
+            serial = convert(DOCUMENT, moduleClass=moduleClass)
+            self.assertEqual(serial, convert(DOCUMENT, jobs=2,
+                                             moduleClass=moduleClass))
+
+    def testBoundedWindow(self):
+        pulled = []
+        def pages():
+            for page in xournalparser.iterparse(io.BytesIO(DOCUMENT)):
+                pulled.append(page)
+                yield page
+        module = Output.TikzLineWidth(pages(), output=io.StringIO(),
+                                      singlePass=True, jobs=2)
+        entries = module.renderPages()
+        next(entries)
+        self.assertLessEqual(len(pulled), module.PARALLEL_WINDOW*2)
+        self.assertEqual(len(list(entries)), 11)
+
+if __name__ == "__main__":
+    unittest.main()
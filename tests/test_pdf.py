@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import re
+import unittest
+
+from xojtools import outputmodules as Output
+from . import xournal, SAMPLE, SAMPLE_PAGES, convert
+
+"""Tests of the PDF output module."""
+
+def _objects(data):
+    """
+    Check the cross-reference table of a PDF file (bytes) and return the
+    byte offsets of its objects, indexed by object number.
+    """
+    match = re.search(rb"startxref\n(\d+)\n%%EOF\n$", data)
+    if match is None:
+        raise AssertionError("no startxref at the end of the file")
+    position = int(match.group(1))
+    match = re.match(rb"xref\n0 (\d+)\n", data[position:])
+    if match is None:
+        raise AssertionError("startxref does not point to the xref table")
+    size = int(match.group(1))
+    position += match.end()
+    entries = data[position:position + 20*size]
+    if not entries.startswith(b"0000000000 65535 f \n"):
+        raise AssertionError("object 0 is not free")
+    offsets = [None]
+    for number in range(1, size):
+        entry = entries[20*number:20*number + 20]
+        if not re.match(rb"\d{10} 00000 n \n", entry):
+            raise AssertionError("malformed xref entry {!r}".format(entry))
+        offsets.append(int(entry[:10]))
+    return offsets
+
+class StructureTest(unittest.TestCase):
+    """The offsets and lengths written in the file are right."""
+    def check(self, output):
+        data = output.encode("ascii")
+        self.assertTrue(data.startswith(b"%PDF-1.4\n"))
+        offsets = _objects(data)
+        for number, offset in enumerate(offsets[1:], 1):
+            self.assertTrue(data.startswith("{} 0 obj\n".format(number)
+                                            .encode("ascii"), offset))
+        self.assertEqual(data.count(b" 0 obj\n"), len(offsets) - 1)
+        
+        streams = 0
+        for match in re.finditer(rb"<< /Length (\d+) >>\nstream\n", data):
+            end = match.end() + int(match.group(1))
+            self.assertTrue(data.startswith(b"\nendstream\nendobj\n", end))
+            streams += 1
+        self.assertEqual(streams, data.count(b"\nstream\n"))
+        return data
+
+    def testSample(self):
+        data = self.check(convert(SAMPLE, moduleClass=Output.Pdf))
+        self.assertIn(b"/Count 2 >>", data)
+        self.assertEqual(data.count(b"/MediaBox [0 0 612 792]"), 2)
+        self.assertIn(b"(Caf\\351 \\(1\\) \\\\textbf{x} $<$) Tj", data)
+
+    def testUnoptimized(self):
+        output = convert(SAMPLE, moduleClass=Output.Pdf, optimize=False)
+        self.check(output)
+        self.assertNotIn(" re\n", output)
+
+    def testParallel(self):
+        document = xournal(*SAMPLE_PAGES*6)
+        serial = convert(document, moduleClass=Output.Pdf)
+        data = self.check(serial)
+        self.assertIn(b"/Count 12 >>", data)
+        self.assertEqual(serial, convert(document, moduleClass=Output.Pdf,
+                                         jobs=2))
+        self.assertEqual(serial, convert(document, moduleClass=Output.Pdf,
+                                         stream=True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import re
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from xojtools import outputmodules as Output
+from . import SAMPLE, convert
+
+"""Tests of the SVG output module."""
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+# Number of arguments of every path command
+ARGUMENTS = {"m": 2, "l": 2, "h": 1, "v": 1, "c": 6, "s": 4, "q": 4, "t": 2,
+             "a": 7, "z": 0}
+
+NUMBER = r"-?(?:\d+\.?\d*|\.\d+)"
+
+def _checkPath(data):
+    """Check the syntax of the 'd' attribute of a path."""
+    if re.sub(r"[A-Za-z]|{}|[\s,]".format(NUMBER), "", data):
+        raise AssertionError("unexpected characters in {!r}".format(data))
+    if not data.startswith(("M", "m")):
+        raise AssertionError("path {!r} does not start with M".format(data))
+    for command, arguments in re.findall(r"([A-Za-z])([^A-Za-z]*)", data):
+        count = len(re.findall(NUMBER, arguments))
+        expected = ARGUMENTS.get(command.lower())
+        if expected is None:
+            raise AssertionError("unknown command {} in {!r}"
+                                 .format(command, data))
+        if expected == 0:
+            valid = count == 0
+        else:
+            valid = count > 0 and count % expected == 0
+        if not valid:
+            raise AssertionError("{} has {} arguments in {!r}"
+                                 .format(command, count, data))
+
+class StructureTest(unittest.TestCase):
+    """The output is a well-formed SVG image."""
+    def check(self, output):
+        root = ElementTree.fromstring(output.encode("utf-8"))
+        self.assertEqual(root.tag, SVG + "svg")
+        for path in root.iter(SVG + "path"):
+            _checkPath(path.get("d"))
+        return root
+
+    def testSample(self):
+        root = self.check(convert(SAMPLE, moduleClass=Output.Svg))
+        self.assertEqual(root.get("viewBox"), "0 0 612 1594")
+        pages = root.findall(SVG + "g")
+        self.assertEqual(len(pages), 2)
+        self.assertIsNone(pages[0].get("transform"))
+        self.assertEqual(pages[1].get("transform"), "translate(0 802)")
+        self.assertEqual(len(pages[0].findall(SVG + "circle")), 1)
+        text = pages[0].find(SVG + "text")
+        self.assertEqual("".join(text.itertext()),
+                         "Café (1) \\textbf{x} $<$")
+
+    def testUnoptimized(self):
+        root = self.check(convert(SAMPLE, moduleClass=Output.Svg,
+                                  optimize=False))
+        self.assertEqual(len(root.findall(".//" + SVG + "circle")), 0)
+        self.assertEqual(len(root.findall(".//" + SVG + "path")), 7)
+
+if __name__ == "__main__":
+    unittest.main()
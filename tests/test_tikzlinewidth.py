@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+import unittest
+
+from xojtools import outputmodules as Output
+from . import xournal, convert, SAMPLE
+
+"""Tests of the TikZ and PGF output modules."""
+
+# A fixed width stroke with a thin pen and one with variable width
+THIN = xournal('<stroke tool="pen" color="black" width="0.42">\n'
+               '10.00 10.00 50.00 80.00 90.00 20.00\n</stroke>\n'
+               '<stroke tool="pen" color="red" width="0.42 0.31 0.27 0.29">\n'
+               '100.00 10.00 150.00 80.00 190.00 20.00 230.00 90.00\n'
+               '</stroke>\n')
+
+# Alternating strokes of two styles, each style is used by three groups
+def _alternating():
+    strokes = []
+    for i in range(6):
+        color = "black" if i % 2 == 0 else "red"
+        strokes.append('<stroke tool="pen" color="{}" width="1.41">\n'
+                       '{} 10.00 {} 80.00 {} 20.00\n</stroke>\n'.format(
+                           color, 10 + 50*i, 30 + 50*i, 50 + 50*i))
+    return "".join(strokes)
+
+ALTERNATING = xournal(_alternating(), _alternating())
+
+# A box drawn with five points, detected as an axis-aligned rectangle
+BOX = xournal('<stroke tool="pen" color="black" width="1.41">\n'
+              '10.1234567 20.7654321 110.1234567 20.7654321 110.1234567 70.5 '
+              '10.1234567 70.5 10.1234567 20.7654321\n</stroke>\n')
+
+def _checkLatex(output):
+    """
+    Check that braces and environments are balanced in LaTeX code and that
+    every color is defined. Return the names of the environments.
+    """
+    stack = []
+    environments = []
+    for match in re.finditer(r"\\(begin|end)\{(\w+)\}|\\.|%[^\n]*|[{}]",
+                             output):
+        token = match.group(0)
+        if match.group(1) == "begin" or token == "{":
+            stack.append(match.group(2) or "{")
+            if match.group(2):
+                environments.append(match.group(2))
+        elif match.group(1) == "end" or token == "}":
+            if not stack or stack.pop() != (match.group(2) or "{"):
+                raise AssertionError("unbalanced {!r} at {}".format(
+                                         token, match.start()))
+    if stack:
+        raise AssertionError("unclosed {}".format(", ".join(stack)))
+    
+    defined = set(re.findall(r"\\definecolor\{(\w+)\}", output))
+    for color in re.findall(r"\b(xou[0-9a-f]+)\b", output):
+        if color not in defined:
+            raise AssertionError("color {} is not defined".format(color))
+    return environments
+
+class SmokeTest(unittest.TestCase):
+    """The output is well-formed in every mode."""
+    def testTikz(self):
+        for options in ({}, {"digits": 2, "relative": True},
+                        {"group": True}, {"outline": True}):
+            environments = _checkLatex(convert(SAMPLE,
+                                               moduleOptions=options))
+            self.assertEqual(environments, ["tikzpicture"])
+
+    def testPgf(self):
+        for options in ({}, {"digits": 2}):
+            output = convert(SAMPLE, moduleClass=Output.Pgf,
+                             moduleOptions=options)
+            environments = _checkLatex(output)
+            self.assertEqual(environments,
+                             ["pgfpicture", "pgfscope", "pgfscope"])
+            self.assertIn("\\pgfpathcircle{", output)
+            self.assertIn("{Café (1) \\textbf{x} $<$}", output)
+
+    def testPgfUnoptimized(self):
+        output = convert(SAMPLE, moduleClass=Output.Pgf, optimize=False)
+        _checkLatex(output)
+        self.assertNotIn("\\pgfpathcircle{", output)
+
+class GroupTest(unittest.TestCase):
+    """Grouping gives the same output in every mode."""
+    def testStream(self):
+        options = {"group": True}
+        output = convert(ALTERNATING, moduleOptions=options)
+        self.assertEqual(output, convert(ALTERNATING, stream=True,
+                                         moduleOptions=options))
+
+    def testStylesInHeader(self):
+        output = convert(ALTERNATING, moduleOptions={"group": True})
+        picture = output.index("\\begin{tikzpicture}")
+        style = output.index("\\tikzset{xoj-black-1.41/.style=")
+        self.assertLess(picture, style)
+        self.assertLess(style, output.index("  \\draw[xoj-"))
+        self.assertEqual(output.count("xoj-black-1.41/.style="), 1)
+
+class RectangleTest(unittest.TestCase):
+    """Rectangle corners are rounded like those of other shapes."""
+    def testDefault(self):
+        output = convert(BOX)
+        self.assertIn("(10.123,20.765) rectangle (110.123,70.5);", output)
+
+    def testDigits(self):
+        output = convert(BOX, moduleOptions={"digits": 2})
+        self.assertIn("(10.12,20.77) rectangle (110.12,70.5);", output)
+
+class CompactWidthTest(unittest.TestCase):
+    """Line widths are not rounded to the few digits of compact output."""
+    def testTikz(self):
+        output = convert(THIN, moduleOptions={"digits": 0})
+        self.assertIn("line width=0.42pt", output)
+        self.assertIn("t=0.31pt", output)
+        self.assertIn("t=0.27pt", output)
+        self.assertNotIn("=0pt", output)
+
+    def testPgf(self):
+        output = convert(THIN, moduleClass=Output.Pgf,
+                         moduleOptions={"digits": 0})
+        self.assertIn("\\pgfsetlinewidth{0.42pt}", output)
+        self.assertIn("{0.31}", output)
+        self.assertNotIn("{0pt}", output)
+
+    def testSinglePoint(self):
+        dot = xournal('<stroke tool="pen" color="black" width="1.41">\n'
+                      '10.00 10.00\n</stroke>\n')
+        output = convert(dot, moduleOptions={"digits": 0})
+        self.assertIn("(10,10)--(10,10);", output)
+        output = convert(dot, moduleOptions={"digits": 0, "relative": True})
+        self.assertIn("(10,10)--(10,10);", output)
+        output = convert(dot)
+        self.assertIn("(10.0, 10.0) -- (10.0, 10.0);", output)
+
+    def testCoordinatesRounded(self):
+        output = convert(THIN, moduleOptions={"digits": 0})
+        self.assertIn("(10,10)--(50,80)--(90,20)", output)
+
+if __name__ == "__main__":
+    unittest.main()
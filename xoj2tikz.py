@@ -17,26 +17,57 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import sys
+import glob
 import gzip
 import argparse
 
 # Strangely, cElementTree does not work if the input is stdin
 from xml.etree.cElementTree import ParseError
 
-from xojtools import optimizations, xournalparser
+from xojtools import batch, optimizations
+from xojtools.cache import PageCache
+from xojtools.stats import Statistics
 from xojtools import outputmodules as Output
 
 DEBUG = False
 VERSION = "0.4-pre"
 
+# Output module and file extension of every output format
+FORMATS = {
+    "tikz": (Output.TikzLineWidth, ".tikz"),
+    "pdf": (Output.Pdf, ".pdf"),
+    "svg": (Output.Svg, ".svg"),
+    "pgf": (Output.Pgf, ".tikz"),
+}
+
 class CmdlineParser():
     """
     Parse commandline options. Results are available as attributes of this class
     """
     def __init__(self):
         self.inputfile = None
+        self.inputs = []
+        self.batch = False
+        self.outputdir = None
         self.optimize = True
+        self.stream = False
+        self.jobs = 1
+        self.cache = None
+        self.tolerance = None
+        self.method = optimizations.DEFAULT_SIMPLIFICATION
+        self.widthTolerance = optimizations.WIDTH_TOLERANCE
+        self.passes = list(optimizations.DEFAULT_PASSES)
+        self.statistics = None
+        self.statsFormat = None
+        self.outline = False
+        self.digits = None
+        self.relative = False
+        self.group = False
+        self.format = "tikz"
+        self.split = False
+        self.masterfile = None
         self.outputfile = sys.stdout
         
     def parse(self):
@@ -44,32 +75,181 @@ class CmdlineParser():
         Parse commandline options.
         """
         parser = argparse.ArgumentParser(
-                    description="Converts Xournal .xoj files to TikZ.",
+                    description="Converts Xournal .xoj files to TikZ, PDF or SVG.",
                     epilog="e.g.: %(prog)s input.xoj -o output.tikz")
-        parser.add_argument("input", help=".xoj input file")
+        parser.add_argument("input", nargs="+",
+                            help=".xoj input file. If several files, "
+                                 "directories or glob patterns are given, "
+                                 "all of them are converted (batch mode)")
         parser.add_argument("-o", "--output", nargs=1, default=[sys.stdout],
-                                help="TikZ output file")
+                                help="Output file")
+        parser.add_argument("-f", "--format", default="tikz",
+                            choices=sorted(FORMATS),
+                            help="Output format: TikZ code, code for PGF's "
+                                 "basic layer (compiles faster), or a PDF "
+                                 "file or SVG image written directly, "
+                                 "without LaTeX (default tikz)")
+        parser.add_argument("-O", "--output-dir", dest="outputdir",
+                            help="Batch mode: write the output files to this "
+                                 "directory instead of next to the inputs")
         parser.add_argument("-n", "--dont-optimize", dest="optimize",
                             action="store_false",
                             help="Don't optimize the tikz output at all")
+        parser.add_argument("-t", "--tolerance", type=float, metavar="PT",
+                            help="Simplify strokes with the --simplify "
+                                 "algorithm and tolerance PT points")
+        parser.add_argument("--simplify", dest="method",
+                            default=optimizations.DEFAULT_SIMPLIFICATION,
+                            choices=sorted(optimizations
+                                           .SIMPLIFICATION_METHODS),
+                            help="Algorithm used with --tolerance: "
+                                 "Visvalingam-Whyatt removes points while "
+                                 "the triangle they form with their "
+                                 "neighbours is smaller than PT*PT square "
+                                 "points, in O(n log n) time. "
+                                 "Ramer-Douglas-Peucker guarantees that "
+                                 "strokes deviate at most PT points from "
+                                 "the original, but may take quadratic "
+                                 "time. (default {})".format(
+                                     optimizations.DEFAULT_SIMPLIFICATION))
+        parser.add_argument("-w", "--width-tolerance", type=float,
+                            dest="widthTolerance", metavar="PT",
+                            default=optimizations.WIDTH_TOLERANCE,
+                            help="Simplify strokes with variable width, so "
+                                 "their width changes at most PT points "
+                                 "(default {}). Their path deviates at most "
+                                 "as much as given by --tolerance."
+                                 .format(optimizations.WIDTH_TOLERANCE))
+        parser.add_argument("--passes", metavar="NAME[,NAME...]",
+                            help="Comma separated list of optimization "
+                                 "passes to run, in this order (default "
+                                 "{}). Available: {}".format(
+                                     ",".join(optimizations.DEFAULT_PASSES),
+                                     ", ".join(
+                                         "{} ({})".format(name, p.description)
+                                         for name, p in
+                                         optimizations.PASSES.items())))
+        parser.add_argument("--disable-pass", dest="disabled", metavar="NAME",
+                            action="append", default=[],
+                            choices=list(optimizations.PASSES),
+                            help="Don't run this optimization pass, may be "
+                                 "given several times")
+        parser.add_argument("--outline", action="store_true",
+                            help="Fill the outline of every stroke with "
+                                 "variable width as a single path, instead "
+                                 "of drawing each segment separately. "
+                                 "Compiles much faster.")
+        parser.add_argument("--digits", type=int, metavar="N",
+                            help="Compact output: round all coordinates to "
+                                 "N decimal places (line widths to at least "
+                                 "3) and leave out trailing zeros and spaces")
+        parser.add_argument("--relative", action="store_true",
+                            help="Compact output with relative coordinates "
+                                 "++(dx,dy), rounded to 2 decimal places "
+                                 "unless --digits is given")
+        parser.add_argument("--group", action="store_true",
+                            help="Draw consecutive items with the same "
+                                 "color, line width and opacity as one "
+                                 "path or scope and define shared styles "
+                                 "for frequent combinations")
+        parser.add_argument("--split", action="store_true",
+                            help="Write every page to its own file, e.g. "
+                                 "output-page1.tikz, and make the output "
+                                 "file \\input all of them. Files that did "
+                                 "not change are not rewritten, page files "
+                                 "of deleted pages are removed.")
+        parser.add_argument("-s", "--stream", action="store_true",
+                            help="Read and convert the input page by page, "
+                                 "instead of loading it into memory at once")
+        parser.add_argument("-j", "--jobs", type=int, default=1,
+                            help="Optimize and convert pages (or files in "
+                                 "batch mode) in JOBS parallel processes "
+                                 "(default 1)")
+        parser.add_argument("-c", "--cache", metavar="DIR",
+                            help="Keep the output of every page in DIR and "
+                                 "reuse it for unchanged pages")
+        parser.add_argument("--cache-size", type=float, default=256,
+                            metavar="MB",
+                            help="Maximum size of the cache in MiB "
+                                 "(default 256)")
+        parser.add_argument("--stats", nargs="?", const="table",
+                            choices=["table", "json"],
+                            help="Print the time, the number of replaced "
+                                 "strokes and removed points of every "
+                                 "optimization pass and the size of the "
+                                 "output to stderr, as a table (default) or "
+                                 "JSON")
         parser.add_argument("-v", "--version", action="version",
                             version="%(prog)s " + VERSION)
         args = parser.parse_args()
         
-        if args.input == "-":
+        self.optimize = args.optimize
+        self.stream = args.stream
+        self.jobs = max(1, args.jobs)
+        self.tolerance = args.tolerance
+        self.method = args.method
+        self.widthTolerance = args.widthTolerance
+        self.outline = args.outline
+        if args.digits is not None and args.digits < 0:
+            parser.error("--digits must not be negative")
+        self.digits = args.digits
+        self.relative = args.relative
+        self.group = args.group
+        self.format = args.format
+        self.split = args.split
+        if args.split and args.format not in ("tikz", "pgf"):
+            parser.error("--split can only be used with --format tikz or pgf")
+        if args.passes is not None:
+            self.passes = [name.strip() for name in args.passes.split(",")
+                           if name.strip()]
+            for name in self.passes:
+                if name not in optimizations.PASSES:
+                    parser.error("unknown optimization pass '{}'".format(name))
+        self.passes = [name for name in self.passes
+                       if name not in args.disabled]
+        if args.stats is not None:
+            self.statistics = Statistics()
+            self.statsFormat = args.stats
+        if args.cache is not None:
+            try:
+                self.cache = PageCache(args.cache,
+                                       maxSize=int(args.cache_size*1024*1024))
+            except OSError as err:
+                print("Failed to create cache directory '{}':\n  {}"
+                      .format(args.cache, err.strerror))
+                sys.exit(1)
+        
+        first = args.input[0]
+        if (len(args.input) > 1 or args.outputdir is not None or
+                glob.has_magic(first) or os.path.isdir(first)):
+            if args.output[0] != sys.stdout:
+                parser.error("-o can not be used in batch mode, use -O")
+            self.batch = True
+            self.inputs = batch.findInputs(args.input)
+            self.outputdir = args.outputdir
+            return self
+        
+        if first == "-":
             # workaround for cElementTree
             self.inputfile = sys.stdin.detach()
         else:
             try:
-                self.inputfile = gzip.open(args.input)
+                self.inputfile = gzip.open(first)
             except IOError as err:
                 print("Failed to open input file '{}':\n  {}"
-                      .format(args.input, err.strerror))
+                      .format(first, err.strerror))
                 sys.exit(1)
                 
         
         if args.output[0] == sys.stdout or args.output[0] == "-":
+            if args.split:
+                parser.error("--split needs an output file, use -o")
             self.outputfile = sys.stdout
+        elif args.split:
+            # The master file is only written if it changes, see
+            # batch.writeSplit()
+            self.outputfile = None
+            self.masterfile = args.output[0]
         else:
             try:
                 self.outputfile = open(args.output[0], 'w')
@@ -77,8 +257,6 @@ class CmdlineParser():
                 print("Failed to open output file '{}':\n  {}"
                       .format(args.output[0], err.strerror))
                 sys.exit(1)
-        
-        self.optimize = args.optimize
         return self
 
 
@@ -89,33 +267,101 @@ def main():
     1. Parse commandline arguments and get input and output file
     2. Read inputfile
     3. Parse the input file with a XML parser and store the document in memory
+       (or, when streaming, read it one page at a time during step 5)
     4. Optimize/Simplify internal representation of the xournal document
     5. Convert the internal representation to TikZ code and write the output
        file
     """
     args = CmdlineParser().parse()
     
+    moduleClass = FORMATS[args.format][0]
+    if DEBUG and args.format == "tikz":
+        moduleClass = Output.TikzDebug
+    
+    if args.batch:
+        return convertBatch(args, moduleClass)
+    
     try:
-        document = xournalparser.parse(args.inputfile)
+        batch.convert(args.inputfile, args.outputfile, moduleClass=moduleClass,
+                      optimize=args.optimize, stream=args.stream,
+                      jobs=args.jobs, cache=args.cache,
+                      tolerance=args.tolerance, method=args.method,
+                      passes=args.passes, widthTolerance=args.widthTolerance,
+                      statistics=args.statistics,
+                      moduleOptions=moduleOptions(args),
+                      split=args.masterfile)
     except ParseError as err:
         print("ERROR: Unable to parse input file ("+str(err)+")",
               file=sys.stderr)
         sys.exit(1)
-
-    
-    if args.optimize:
-        optimizations.runAll(document)
-    
-    if DEBUG:
-        output = Output.TikzDebug(document, output=args.outputfile)
-    else:
-        output = Output.TikzLineWidth(document, output=args.outputfile)
-    output.printAll()
+    except OSError as err:
+        if args.masterfile is None:
+            raise
+        print("Failed to write output file '{}':\n  {}"
+              .format(err.filename, err.strerror), file=sys.stderr)
+        sys.exit(1)
     
-    if args.outputfile is not sys.stdout and not args.outputfile.isatty():
+    if (args.outputfile is not None and args.outputfile is not sys.stdout and
+            not args.outputfile.isatty()):
         args.outputfile.close()
     if args.inputfile is not sys.stdin and not args.inputfile.isatty():
         args.inputfile.close()
+    printStatistics(args)
+
+def moduleOptions(args):
+    """Return the keyword arguments for the output module."""
+    if args.format not in ("tikz", "pgf"):
+        return {}
+    return {"outline": args.outline, "digits": args.digits,
+            "relative": args.relative, "group": args.group}
+
+def convertBatch(args, moduleClass):
+    """
+    Convert all input files in a pool of worker processes and report every
+    file that failed. Return 1 if any file failed.
+    """
+    if not args.inputs:
+        print("ERROR: No input files found", file=sys.stderr)
+        return 1
+    if args.outputdir is not None:
+        try:
+            os.makedirs(args.outputdir, exist_ok=True)
+        except OSError as err:
+            print("Failed to create output directory '{}':\n  {}"
+                  .format(args.outputdir, err.strerror), file=sys.stderr)
+            return 1
+    
+    extension = FORMATS[args.format][1]
+    tasks = [(path, batch.outputPath(path, args.outputdir, extension))
+             for path in args.inputs]
+    failed = 0
+    for inputPath, outputPath, error in batch.convertAll(
+            tasks, jobs=args.jobs, moduleClass=moduleClass,
+            optimize=args.optimize, stream=args.stream, cache=args.cache,
+            tolerance=args.tolerance, method=args.method,
+            passes=args.passes, widthTolerance=args.widthTolerance,
+            statistics=args.statistics,
+            moduleOptions=moduleOptions(args), split=args.split):
+        if error is not None:
+            failed += 1
+            print("Failed to convert '{}':\n  {}".format(inputPath, error),
+                  file=sys.stderr)
+    printStatistics(args)
+    
+    if failed > 0:
+        print("ERROR: {} of {} files failed".format(failed, len(tasks)),
+              file=sys.stderr)
+        return 1
+    return 0
+
+def printStatistics(args):
+    """Print the statistics to stderr, if --stats was given."""
+    if args.statistics is None:
+        return
+    if args.statsFormat == "json":
+        print(args.statistics.json(), file=sys.stderr)
+    else:
+        print(args.statistics.table(), end="", file=sys.stderr)
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -1,12 +1,15 @@
 from .circle import Circle
+from .color import Color, Palette, COLOR_PREFIX
+from .curve import Curve
 from .ellipse import Ellipse
 from .layer import Layer
 from .page import Page
+from .polygon import Polygon
 from .rectangle import Rectangle
 from .stroke import Stroke
 from .textbox import TextBox
-from .outputmodule import OutputModule, COLOR_PREFIX
+from .outputmodule import OutputModule
 
-__all__ = ["Circle", "Ellipse", "Layer", "optimizations", "OutputModule",
-           "COLOR_PREFIX", "Page", "Rectangle", "Stroke", "TextBox",
-           "xournalparser"]
+__all__ = ["batch", "Circle", "Color", "Curve", "Ellipse", "Layer",
+           "optimizations", "OutputModule", "COLOR_PREFIX", "Page", "Palette",
+           "Polygon", "Rectangle", "Stroke", "TextBox", "xournalparser"]
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import re
+import glob
+import gzip
+import multiprocessing
+
+from . import optimizations, xournalparser, Palette
+from .stats import ByteCounter, Statistics
+from .outputmodules import TikzLineWidth
+
+"""Conversion of one or many Xournal files."""
+
+def convert(inputfile, outputfile, moduleClass=TikzLineWidth, optimize=True,
+            stream=False, jobs=1, cache=None, tolerance=None,
+            method=optimizations.DEFAULT_SIMPLIFICATION,
+            passes=None, widthTolerance=optimizations.WIDTH_TOLERANCE,
+            statistics=None, moduleOptions=None, split=None):
+    """
+    Convert a decompressed Xournal document and write it to 'outputfile'.
+    
+    Keyword arguments:
+    inputfile -- File-like object with Xournal XML content (mandatory)
+    outputfile -- File-like object the output is written to (mandatory)
+    moduleClass -- OutputModule subclass used to write the output
+                   (default TikzLineWidth)
+    optimize -- Run all optimizations on the document (default True)
+    stream -- Read the input one page at a time (default False)
+    jobs -- Number of processes that convert pages in parallel (default 1)
+    cache -- PageCache to reuse the output of unchanged pages (default None)
+    tolerance -- Simplify strokes, so they deviate at most this much (in pt)
+                 from the original, see optimizations.simplifyTolerance()
+                 (default None)
+    method -- Algorithm used to simplify strokes
+              (default optimizations.DEFAULT_SIMPLIFICATION)
+    passes -- Names of the optimization passes to run, in this order
+              (default optimizations.DEFAULT_PASSES)
+    widthTolerance -- Simplify strokes with variable width, so their width
+                      changes at most this much (in pt), see
+                      optimizations.simplifyWidths()
+                      (default optimizations.WIDTH_TOLERANCE)
+    statistics -- Statistics object that is updated with the optimization
+                  passes and the output size (default None)
+    moduleOptions -- Dictionary of further keyword arguments for moduleClass,
+                     e.g. {"outline": True} (default None)
+    split -- Path of a master file: write every page to its own file named
+             after it and an \\input command for each of them to the master
+             file instead of 'outputfile', which may be None then, see
+             writeSplit() (default None)
+    """
+    palette = Palette()
+    digest = cache is not None
+    if stream:
+        document = xournalparser.iterparse(inputfile, palette=palette,
+                                           digest=digest)
+    else:
+        document = xournalparser.parse(inputfile, palette=palette,
+                                       digest=digest)
+    
+    # Pages are optimized right before they are written, possibly in parallel
+    if optimize:
+        preprocess = optimizations.PassManager(passes=passes,
+                                               tolerance=tolerance,
+                                               method=method,
+                                               widthTolerance=widthTolerance,
+                                               statistics=statistics)
+    elif statistics is not None:
+        # No passes, but count the points
+        preprocess = optimizations.PassManager(passes=[],
+                                               statistics=statistics)
+    else:
+        preprocess = None
+    
+    if statistics is not None and split is None:
+        outputfile = ByteCounter(outputfile, statistics)
+    
+    # A streamed document is traversed only once, colors are collected while
+    # writing the body. Every page file of a split document only defines the
+    # colors it uses.
+    if moduleOptions is None:
+        moduleOptions = {}
+    output = moduleClass(document, output=outputfile, palette=palette,
+                         singlePass=stream or split is not None,
+                         preprocess=preprocess, jobs=jobs, cache=cache,
+                         **moduleOptions)
+    if split is None:
+        output.printAll()
+    else:
+        writeSplit(output, split, statistics)
+
+def writeSplit(output, path, statistics=None):
+    """
+    Write every page of a document to its own file and a master file with
+    an \\input command for each of them. The page files are named after the
+    master file, e.g. "notes.tikz" gives "notes-page1.tikz",
+    "notes-page2.tikz" and so on, and are \\input by their name, relative
+    to the master file. Page files left over from a document with more pages
+    are removed.
+    
+    Files whose content has not changed (including the master file) are not
+    written again, so their modification time stays the same.
+    
+    Keyword arguments:
+    output -- OutputModule with the document (mandatory)
+    path -- Path of the master file, the page files are written to the same
+            directory (mandatory)
+    statistics -- Statistics object whose output size is increased by the
+                  size of all files (default None)
+    """
+    base, extension = os.path.splitext(path)
+    inputs = []
+    for number, text in enumerate(output.pageFiles(), 1):
+        pagePath = "{}-page{}{}".format(base, number, extension)
+        writeIfChanged(pagePath, text, statistics)
+        # Relative to the master file, which is next to the page files
+        inputs.append("\\input{{{}}}\n".format(os.path.basename(pagePath)))
+    writeIfChanged(path, "".join(inputs), statistics)
+    
+    # Page files of an earlier version of the document with more pages
+    pattern = re.compile(re.escape(os.path.basename(base)) + r"-page(\d+)" +
+                         re.escape(extension) + "$")
+    for stalePath in glob.glob(glob.escape(base) + "-page*" +
+                               glob.escape(extension)):
+        match = pattern.match(os.path.basename(stalePath))
+        if match and int(match.group(1)) > len(inputs):
+            os.remove(stalePath)
+
+def writeIfChanged(path, text, statistics=None):
+    """
+    Write 'text' to the file 'path', unless it already has this content.
+    Return True if the file was written. The size of 'text' is added to the
+    output size of 'statistics' in either case, if given.
+    """
+    if statistics is not None:
+        statistics.outputBytes += len(text.encode("utf-8"))
+    try:
+        with open(path) as existing:
+            if existing.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    with open(path, "w") as outputfile:
+        outputfile.write(text)
+    return True
+
+def convertFile(inputPath, outputPath, split=False, **kwargs):
+    """
+    Convert the .xoj file 'inputPath' and write the output to 'outputPath'.
+    If 'split' is True, 'outputPath' becomes a master file that \\inputs
+    every page from its own file, see writeSplit().
+    
+    All other keyword arguments are passed on to convert().
+    """
+    with gzip.open(inputPath) as inputfile:
+        if split:
+            convert(inputfile, None, split=outputPath, **kwargs)
+            return
+        with open(outputPath, "w") as outputfile:
+            convert(inputfile, outputfile, **kwargs)
+
+def findInputs(patterns):
+    """
+    Return a sorted list of .xoj files from a list of file names, directories
+    and glob patterns. Directories are searched recursively.
+    """
+    paths = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = glob.glob(pattern)
+        else:
+            matches = [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                paths.update(glob.glob(os.path.join(path, "**", "*.xoj"),
+                                       recursive=True))
+            else:
+                paths.add(path)
+    return sorted(paths)
+
+def outputPath(inputPath, outputDir=None, extension=".tikz"):
+    """
+    Return the name of the output file for 'inputPath': the same name with
+    'extension' instead of '.xoj', next to the input file or in 'outputDir'.
+    """
+    base = os.path.splitext(inputPath)[0] + extension
+    if outputDir is not None:
+        base = os.path.join(outputDir, os.path.basename(base))
+    return base
+
+def convertAll(tasks, jobs=1, **kwargs):
+    """
+    Convert many files in a pool of 'jobs' worker processes.
+    
+    Yield a tuple (inputPath, outputPath, error) for every file, in the order
+    of 'tasks'. 'error' is None if the conversion succeeded, otherwise a
+    string describing the problem. A failed file does not stop the others.
+    
+    Keyword arguments:
+    tasks -- List of (inputPath, outputPath) tuples (mandatory)
+    jobs -- Number of worker processes (default 1)
+    
+    All other keyword arguments are passed on to convert(). Note that a file
+    is always converted by a single process. If a Statistics object is given
+    as 'statistics', the statistics of all files are added to it.
+    """
+    statistics = kwargs.pop("statistics", None)
+    work = [(inputPath, outputPath, statistics is not None, kwargs)
+            for inputPath, outputPath in tasks]
+    if jobs <= 1:
+        for result in map(_convertTask, work):
+            yield _collect(result, statistics)
+        return
+    
+    with multiprocessing.Pool(jobs) as pool:
+        for result in pool.imap(_convertTask, work):
+            yield _collect(result, statistics)
+
+def _collect(result, statistics):
+    """
+    Add the statistics of a result of _convertTask() to 'statistics' and
+    return the rest of it.
+    """
+    inputPath, outputPath, error, fileStatistics = result
+    if statistics is not None:
+        statistics.merge(fileStatistics)
+    return inputPath, outputPath, error
+
+def _convertTask(task):
+    """
+    Convert a single file, catching all errors. Return a tuple (inputPath,
+    outputPath, error, statistics).
+    """
+    inputPath, outputPath, collect, kwargs = task
+    statistics = Statistics() if collect else None
+    try:
+        convertFile(inputPath, outputPath, statistics=statistics, **kwargs)
+    except Exception as err:
+        if isinstance(err, (IOError, OSError)) and err.strerror:
+            message = err.strerror
+        else:
+            message = str(err) or type(err).__name__
+        # Do not leave a truncated output file behind
+        if os.path.isfile(outputPath):
+            os.remove(outputPath)
+        return (inputPath, outputPath, message, statistics)
+    return (inputPath, outputPath, None, statistics)
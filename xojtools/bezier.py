@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+from math import hypot
+
+"""
+Fitting of cubic Bezier curves to polylines, with the algorithm of Philip J.
+Schneider ("An Algorithm for Automatically Fitting Digitized Curves",
+Graphics Gems, 1990).
+"""
+
+# Maximum number of Newton-Raphson steps to improve the parameters of the
+# points, before a curve is split
+MAX_ITERATIONS = 4
+
+def fitCurve(xList, yList, tolerance, corners=(), maxCurves=None):
+    """
+    Fit a sequence of cubic Bezier curves to a polyline, so that no point is
+    farther than 'tolerance' away from them.
+    
+    Return a list of (x1, y1, x2, y2, x, y) tuples: the two control points and
+    the end point of every curve. The first curve starts at the first point.
+    
+    Keyword arguments:
+    xList -- x-coordinates of the points (mandatory)
+    yList -- y-coordinates of the points (mandatory)
+    tolerance -- Maximum distance of the points to the curves (mandatory)
+    corners -- Indices of points where the direction may change abruptly,
+               the curves are split there (default ())
+    maxCurves -- Give up and return None, as soon as it is clear that more
+                 curves are needed (default None)
+    """
+    points = list(zip(xList, yList))
+    last = len(points) - 1
+    bounds = sorted(set([0, last]) | set(i for i in corners if 0 < i < last))
+    
+    if maxCurves is None:
+        maxCurves = len(points)
+    if len(bounds) - 1 > maxCurves:
+        return None
+    
+    curves = []
+    for first, end in zip(bounds, bounds[1:]):
+        # Every part needs at least one curve
+        remaining = maxCurves - len(curves) - (len(bounds) - 2 -
+                                              bounds.index(first))
+        if not _fitPart(points, first, end, tolerance, curves, remaining):
+            return None
+    return curves
+
+def _fitPart(points, first, last, tolerance, curves, maxCurves):
+    """
+    Fit curves to points[first:last+1], between two corners, and append
+    them to 'curves'. Return False if more than 'maxCurves' are needed.
+    """
+    error2 = tolerance*tolerance
+    start = len(curves)
+    # Parts of the polyline that still have to be fitted, with the tangents
+    # at their ends. The stack is processed front to back.
+    stack = [(first, last, _leftTangent(points, first, last),
+              _rightTangent(points, first, last))]
+    while stack:
+        if len(curves) - start + len(stack) > maxCurves:
+            return False
+        first, last, tangent1, tangent2 = stack.pop()
+        p0 = points[first]
+        p3 = points[last]
+        
+        if last - first == 1:
+            distance = hypot(p3[0] - p0[0], p3[1] - p0[1]) / 3
+            curves.append((p0[0] + tangent1[0]*distance,
+                           p0[1] + tangent1[1]*distance,
+                           p3[0] + tangent2[0]*distance,
+                           p3[1] + tangent2[1]*distance, p3[0], p3[1]))
+            continue
+        
+        parameters = _chordLengths(points, first, last)
+        curve = _generate(points, first, last, parameters, tangent1, tangent2)
+        maxError, split = _maxError(points, first, last, curve, parameters)
+        
+        # Close misses may fit after improving the parameters
+        iteration = 0
+        while error2 < maxError < 4*error2 and iteration < MAX_ITERATIONS:
+            parameters = _reparameterize(points, first, curve, parameters)
+            curve = _generate(points, first, last, parameters, tangent1,
+                              tangent2)
+            maxError, split = _maxError(points, first, last, curve,
+                                        parameters)
+            iteration += 1
+        
+        if maxError <= error2:
+            curves.append(curve[1] + curve[2] + curve[3])
+            continue
+        
+        # Split at the point with the largest error and fit both halves
+        center = _centerTangent(points, split)
+        stack.append((split, last, (-center[0], -center[1]), tangent2))
+        stack.append((first, split, tangent1, center))
+    return len(curves) - start <= maxCurves
+
+def _normalize(dx, dy):
+    length = hypot(dx, dy)
+    if length == 0:
+        return (0.0, 0.0)
+    return (dx / length, dy / length)
+
+def _leftTangent(points, first, last):
+    """Direction from the first point into the polyline."""
+    x, y = points[first]
+    for i in range(first + 1, last + 1):
+        if points[i] != points[first]:
+            return _normalize(points[i][0] - x, points[i][1] - y)
+    return (0.0, 0.0)
+
+def _rightTangent(points, first, last):
+    """Direction from the last point back into the polyline."""
+    x, y = points[last]
+    for i in range(last - 1, first - 1, -1):
+        if points[i] != points[last]:
+            return _normalize(points[i][0] - x, points[i][1] - y)
+    return (0.0, 0.0)
+
+def _centerTangent(points, i):
+    """Direction of the polyline at point i, pointing backwards."""
+    tangent = _normalize(points[i-1][0] - points[i+1][0],
+                         points[i-1][1] - points[i+1][1])
+    if tangent == (0.0, 0.0):
+        tangent = _normalize(points[i-1][0] - points[i][0],
+                             points[i-1][1] - points[i][1])
+    return tangent
+
+def _chordLengths(points, first, last):
+    """Parameters of the points, proportional to the distance along them."""
+    parameters = [0.0]
+    total = 0.0
+    for i in range(first + 1, last + 1):
+        total += hypot(points[i][0] - points[i-1][0],
+                       points[i][1] - points[i-1][1])
+        parameters.append(total)
+    if total == 0:
+        return [i / (last - first) for i in range(last - first + 1)]
+    return [parameter / total for parameter in parameters]
+
+def _bezier(curve, t):
+    """Point of a cubic Bezier curve at parameter t."""
+    s = 1 - t
+    b0 = s*s*s
+    b1 = 3*s*s*t
+    b2 = 3*s*t*t
+    b3 = t*t*t
+    return (b0*curve[0][0] + b1*curve[1][0] + b2*curve[2][0] +
+            b3*curve[3][0],
+            b0*curve[0][1] + b1*curve[1][1] + b2*curve[2][1] +
+            b3*curve[3][1])
+
+def _generate(points, first, last, parameters, tangent1, tangent2):
+    """
+    Return the curve as a tuple of four points, that fits the points best
+    in the least squares sense, given their parameters and the tangents at
+    both ends.
+    """
+    p0 = points[first]
+    p3 = points[last]
+    c00 = c01 = c11 = x0 = x1 = 0.0
+    for i, t in enumerate(parameters):
+        s = 1 - t
+        b0 = s*s*s
+        b1 = 3*s*s*t
+        b2 = 3*s*t*t
+        b3 = t*t*t
+        a1x = tangent1[0]*b1
+        a1y = tangent1[1]*b1
+        a2x = tangent2[0]*b2
+        a2y = tangent2[1]*b2
+        c00 += a1x*a1x + a1y*a1y
+        c01 += a1x*a2x + a1y*a2y
+        c11 += a2x*a2x + a2y*a2y
+        px, py = points[first + i]
+        tx = px - (b0 + b1)*p0[0] - (b2 + b3)*p3[0]
+        ty = py - (b0 + b1)*p0[1] - (b2 + b3)*p3[1]
+        x0 += a1x*tx + a1y*ty
+        x1 += a2x*tx + a2y*ty
+    
+    determinant = c00*c11 - c01*c01
+    if determinant != 0:
+        alpha1 = (x0*c11 - x1*c01) / determinant
+        alpha2 = (c00*x1 - c01*x0) / determinant
+    else:
+        alpha1 = alpha2 = 0.0
+    
+    # Fall back to a heuristic, if the control points are too close to the
+    # ends or on the wrong side
+    distance = hypot(p3[0] - p0[0], p3[1] - p0[1])
+    epsilon = 1e-6*distance
+    if alpha1 < epsilon or alpha2 < epsilon:
+        alpha1 = alpha2 = distance / 3
+    return (p0, (p0[0] + tangent1[0]*alpha1, p0[1] + tangent1[1]*alpha1),
+            (p3[0] + tangent2[0]*alpha2, p3[1] + tangent2[1]*alpha2), p3)
+
+def _maxError(points, first, last, curve, parameters):
+    """
+    Return the largest squared distance of a point to its position on the
+    curve and the index of that point.
+    """
+    maxError = 0.0
+    split = (first + last) // 2
+    for i in range(first + 1, last):
+        x, y = _bezier(curve, parameters[i - first])
+        px, py = points[i]
+        error = (x - px)**2 + (y - py)**2
+        if error >= maxError:
+            maxError = error
+            split = i
+    return maxError, split
+
+def _reparameterize(points, first, curve, parameters):
+    """Improve the parameters of the points with a Newton-Raphson step."""
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = curve
+    # Control points of the first and second derivative
+    d1 = ((3*(x1 - x0), 3*(y1 - y0)), (3*(x2 - x1), 3*(y2 - y1)),
+          (3*(x3 - x2), 3*(y3 - y2)))
+    d2 = ((2*(d1[1][0] - d1[0][0]), 2*(d1[1][1] - d1[0][1])),
+          (2*(d1[2][0] - d1[1][0]), 2*(d1[2][1] - d1[1][1])))
+    result = []
+    for i, t in enumerate(parameters):
+        px, py = points[first + i]
+        x, y = _bezier(curve, t)
+        s = 1 - t
+        dx = s*s*d1[0][0] + 2*s*t*d1[1][0] + t*t*d1[2][0]
+        dy = s*s*d1[0][1] + 2*s*t*d1[1][1] + t*t*d1[2][1]
+        ddx = s*d2[0][0] + t*d2[1][0]
+        ddy = s*d2[0][1] + t*d2[1][1]
+        numerator = (x - px)*dx + (y - py)*dy
+        denominator = dx*dx + dy*dy + (x - px)*ddx + (y - py)*ddy
+        if denominator != 0:
+            t -= numerator / denominator
+        # Points outside of the curve would be measured against its
+        # extrapolation
+        result.append(min(max(t, 0.0), 1.0))
+    return result
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+"""An on-disk cache of rendered pages."""
+
+def _codeFingerprint():
+    """Return a hash of the xojtools sources, so code changes invalidate."""
+    digest = hashlib.sha1()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for directory, subdirs, files in sorted(os.walk(root)):
+        subdirs.sort()
+        for name in sorted(files):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as source:
+                    digest.update(source.read())
+    return digest.hexdigest()
+
+class PageCache:
+    """
+    Stores the output of pages on disk, so unchanged pages of a document do
+    not need to be optimized and rendered again.
+    
+    Entries are keyed by a hash of the page's XML content and the settings of
+    the output module (see OutputModule.cacheOptions()). When the total size
+    of the cache exceeds 'maxSize', the least recently used entries are
+    removed by prune().
+    """
+    _fingerprint = None
+
+    def __init__(self, directory, maxSize=256*1024*1024):
+        """
+        Constructor
+        
+        Keyword arguments:
+        directory -- Directory that holds the cache entries, it is created if
+                     it does not exist (mandatory)
+        maxSize -- Maximum total size of all entries in bytes
+                   (default 256 MiB)
+        """
+        self.directory = directory
+        self.maxSize = maxSize
+        os.makedirs(directory, exist_ok=True)
+        if PageCache._fingerprint is None:
+            PageCache._fingerprint = _codeFingerprint()
+
+    def key(self, digest, options):
+        """
+        Return the key of a page.
+        
+        Keyword arguments:
+        digest -- Hash of the page's XML content (Page.digest)
+        options -- String describing all settings that affect the output
+        """
+        return hashlib.sha1("\0".join((self._fingerprint, digest, options))
+                            .encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".page")
+
+    def get(self, key):
+        """Return the entry stored for 'key', or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry:
+                value = pickle.load(entry)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """Store a picklable value for 'key'."""
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as entry:
+                pickle.dump(value, entry, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self._path(key))
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def prune(self):
+        """Remove the least recently used entries until the cache fits."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".page"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Removed by a concurrent process
+                pass
+            total -= size
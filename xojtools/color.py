@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import re
+
+"""Interned colors, shared by the Xournal parser and the output modules."""
+
+COLOR_PREFIX = "xou"
+
+# Colors of Xournal's color palette, as written to .xoj files
+XOURNAL_COLORS = {
+    "black": (0, 0, 0),
+    "blue": (51, 51, 204),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "gray": (128, 128, 128),
+    "lightblue": (0, 192, 255),
+    "lightgreen": (0, 255, 0),
+    "magenta": (255, 0, 255),
+    "orange": (255, 128, 0),
+    "yellow": (255, 255, 0),
+    "white": (255, 255, 255),
+}
+
+# Colors that are predefined by xcolor and do not need to be defined
+TEX_COLORS = {
+    (0, 0, 0): "black",
+    (255, 255, 255): "white",
+    (255, 0, 0): "red",
+    (0, 255, 0): "green",
+    (0, 0, 255): "blue",
+    (0, 173, 239): "cyan",
+    (236, 0, 140): "magenta",
+    (255, 242, 0): "yellow",
+}
+
+_HEX_COLOR = re.compile(r"#([0-9a-fA-F]{2})([0-9a-fA-F]{2})"
+                        r"([0-9a-fA-F]{2})([0-9a-fA-F]{2})")
+
+def texColorName(r, g, b):
+    """Return an unique name of the color (r, g, b) for use in TeX."""
+    name = TEX_COLORS.get((r, g, b))
+    if name is None:
+        name = "{}{:02x}{:02x}{:02x}".format(COLOR_PREFIX, r, g, b)
+    return name
+
+class Color(tuple):
+    """
+    A color as a tuple of four: (red, green, blue, opacity)
+    
+    Red, green and blue are integers from 0 to 255, opacity is a float from
+    0.0 to 1.0. As it is a tuple, a Color can be used everywhere a plain tuple
+    is expected. In addition, it carries its name for use in TeX documents in
+    self.texName.
+    """
+    def __new__(cls, r, g, b, opacity=1.0):
+        self = tuple.__new__(cls, (r, g, b, opacity))
+        self.texName = texColorName(r, g, b)
+        return self
+
+    def __getnewargs__(self):
+        return tuple(self)
+
+def parseColor(code, defaultOpacity=1.0):
+    """
+    Parse a xournal color name and return a Color.
+    
+    Keyword arguments:
+    code -- The color string to parse (mandatory)
+    defaultOpacity -- If 'code' does not contain opacity information, use this.
+                      (default 1.0)
+    """
+    rgb = XOURNAL_COLORS.get(code)
+    if rgb is not None:
+        return Color(rgb[0], rgb[1], rgb[2], defaultOpacity)
+    
+    match = _HEX_COLOR.match(code)
+    if match is None:
+        raise Exception("invalid color")
+    r, g, b, opacity = match.groups()
+    return Color(int(r, 16), int(g, 16), int(b, 16), int(opacity, 16)/255.0)
+
+class Palette:
+    """
+    Registry of all colors used in a document.
+    
+    Every distinct color is stored exactly once, so all items of the same
+    color share one Color object. Iterating over a palette yields its colors
+    in the order they were first added.
+    """
+    def __init__(self):
+        """Constructor"""
+        # Maps (color string, default opacity) to Color
+        self._codes = {}
+        # Maps (red, green, blue, opacity) to Color
+        self._colors = {}
+
+    def get(self, code, defaultOpacity=1.0):
+        """
+        Return the Color for a xournal color string, adding it if necessary.
+        
+        Keyword arguments:
+        code -- The color string to parse (mandatory)
+        defaultOpacity -- If 'code' does not contain opacity information, use
+                          this. (default 1.0)
+        """
+        try:
+            return self._codes[(code, defaultOpacity)]
+        except KeyError:
+            color = self.add(parseColor(code, defaultOpacity))
+            self._codes[(code, defaultOpacity)] = color
+            return color
+
+    def add(self, color):
+        """
+        Add a color (tuple of red, green, blue and opacity) to the palette and
+        return the corresponding Color of this palette.
+        """
+        key = tuple(color)
+        try:
+            return self._colors[key]
+        except KeyError:
+            if not isinstance(color, Color):
+                color = Color(*key)
+            self._colors[key] = color
+            return color
+
+    def __iter__(self):
+        return iter(self._colors.values())
+
+    def __len__(self):
+        return len(self._colors)
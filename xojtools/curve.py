@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+class Curve:
+    """
+    Represents a path of cubic Bezier curves (identified by its start point
+    and the control and end points of every curve).
+    
+    Note that Xournal does not save curves as such in its .xoj files. They
+    are fitted to the points of a stroke.
+    """
+    def __init__(self, color=None, start=(0.0, 0.0), segments=None, width=0):
+        """
+        Constructor
+        
+        Keyword arguments:
+        color -- Curve color, tuple of red, green, blue and opacity (default (0,0,0,1.0))
+        start -- (x, y) tuple of the start point (default (0.0, 0.0))
+        segments -- List of (x1, y1, x2, y2, x, y) tuples, the two control
+                    points and the end point of every Bezier curve
+                    (default [])
+        width -- Width of the stroke in pt (default 0)
+        """
+        self.color = color
+        if color is None:
+            self.color = (0, 0, 0, 1.0)
+        self.start = start
+        self.segments = segments
+        if segments is None:
+            self.segments = []
+        self.width = width
+        
+    def __str__(self):
+        return "Curve from {} with {} segments with color '{}' and width {}pt"\
+               .format(self.start, len(self.segments), self.color, self.width)
+
+    def print(self, prefix=""):
+        """
+        Print a short description of the object.
+        (for debugging purposes)
+        
+        Keyword arguments:
+        prefix -- Prefix output with this string (default "")
+        """
+        print("{}Curve from {} with {} segments with color '{}' and width {}pt"\
+              .format(prefix, self.start, len(self.segments), self.color,
+                      self.width))
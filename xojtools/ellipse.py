@@ -19,13 +19,14 @@
 
 class Ellipse:
     """
-    Represents an Ellipse (identfied its bounding rectangle).
+    Represents an Ellipse (identfied its bounding rectangle, which may be
+    rotated around its center).
     
     Note that Xournal does not save ellipses as such in its .xoj files.
     We need to do our best to recognize them.
     """
     def __init__(self, color=None, left=-1.0, right=-1.0, top=-1.0, bottom=-1.0,
-                 width=0):
+                 width=0, angle=0.0):
         """
         Constructor
         
@@ -36,6 +37,8 @@ class Ellipse:
         top -- y-Coordinate of the upper edge (default -1.0)
         bottom -- y-Coordinate of lower edge (default -1.0)
         width -- Width of the stroke in pt (default 0)
+        angle -- Counterclockwise rotation around the center in degrees
+                 (default 0.0)
         """
         self.color = color
         if color is None:
@@ -45,11 +48,13 @@ class Ellipse:
         self.top = top
         self.bottom = bottom
         self.width = width
+        self.angle = angle
         
     def __str__(self):
-        return "Ellipse at ({},{}) to ({},{}) with color '{}' and width {}pt"\
-               .format(self.left, self.bottom, self.right, self.top, self.color,
-                       self.width)
+        return "Ellipse at ({},{}) to ({},{}) rotated by {} degrees with "\
+               "color '{}' and width {}pt"\
+               .format(self.left, self.bottom, self.right, self.top,
+                       self.angle, self.color, self.width)
 
     def print(self, prefix=""):
         """
@@ -59,6 +64,7 @@ class Ellipse:
         Keyword arguments:
         prefix -- Prefix output with this string (default "")
         """
-        print("{}Ellipse at ({},{}) to ({},{}) with color '{}' and width {}pt"\
-               .format(self.left, self.bottom, self.right, self.top, self.color,
-                       self.width))
+        print("{}Ellipse at ({},{}) to ({},{}) rotated by {} degrees with "
+              "color '{}' and width {}pt"\
+               .format(prefix, self.left, self.bottom, self.right, self.top,
+                       self.angle, self.color, self.width))
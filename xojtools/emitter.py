@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class Emitter:
+    """
+    Buffered writer for output modules.
+    
+    Text fragments are collected in a buffer and written to the output file
+    with a single write() call, once the buffer holds at least 'chunkSize'
+    characters. Call flush() when done, to write the remaining fragments.
+    """
+    def __init__(self, output, chunkSize=65536):
+        """
+        Constructor
+        
+        Keyword arguments:
+        output -- File-like object the text is written to (mandatory)
+        chunkSize -- Number of characters that are collected before they are
+                     written to the output (default 65536)
+        """
+        self.output = output
+        self.chunkSize = chunkSize
+        self._buffer = []
+        self._size = 0
+
+    def write(self, text):
+        """Append a string to the buffer."""
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.chunkSize:
+            self.flush()
+
+    def writeAll(self, fragments):
+        """Append the concatenation of an iterable of strings to the buffer."""
+        self.write("".join(fragments))
+
+    def flush(self):
+        """Write the contents of the buffer to the output."""
+        if self._buffer:
+            self.output.write("".join(self._buffer))
+            del self._buffer[:]
+            self._size = 0
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+
+"""Compact formatting of numbers and coordinates for the output modules."""
+
+# Trailing zeros of the numbers in a "(x,y)" string, with the decimal point if
+# nothing is left behind it
+_TRAILING_ZEROS = re.compile(r"\.?0+(?=[,)])")
+_NEGATIVE_ZERO = re.compile(r"(?<![\d.])-0(?=[,)])")
+
+class NumberFormatter:
+    """
+    Formats numbers with a fixed number of decimal places and without
+    trailing zeros, e.g. 12.5 instead of 12.500000000001 and 3 instead of
+    3.0.
+    
+    Coordinates can also be written relative to the previous point, which
+    gives shorter numbers for long paths. Relative coordinates are computed
+    from the rounded absolute ones, so the rounding errors do not add up.
+    """
+    def __init__(self, digits=2):
+        """
+        Constructor
+        
+        Keyword arguments:
+        digits -- Number of decimal places (default 2)
+        """
+        self.digits = digits
+        self.scale = 10**digits
+        self._format = "%.{}f".format(digits)
+        self._pointFormat = "(%.{0}f,%.{0}f)".format(digits)
+
+    def number(self, value):
+        """Return 'value' rounded to the number of decimal places."""
+        text = self._format % value
+        if self.digits > 0:
+            text = text.rstrip("0").rstrip(".")
+        if text == "-0":
+            return "0"
+        return text
+
+    def numbers(self, values):
+        """
+        Return a list of the rounded 'values'. Faster than number() for
+        lists with many repeated values, e.g. the widths of a stroke.
+        """
+        cache = {}
+        number = self.number
+        result = []
+        for value in values:
+            text = cache.get(value)
+            if text is None:
+                text = cache[value] = number(value)
+            result.append(text)
+        return result
+
+    def coordinates(self, xList, yList, relative=False):
+        """
+        Return a list with one "(x,y)" string for every point.
+        
+        Keyword arguments:
+        xList -- x-coordinates of the points (mandatory)
+        yList -- y-coordinates of the points (mandatory)
+        relative -- Write all but the first point as "++(dx,dy)", relative
+                    to the point before (default False)
+        """
+        pointFormat = self._pointFormat
+        if not relative:
+            result = [pointFormat % point for point in zip(xList, yList)]
+        else:
+            # Differences of the rounded coordinates, as integers
+            scale = self.scale
+            xInts = [round(x * scale) for x in xList]
+            yInts = [round(y * scale) for y in yList]
+            result = [pointFormat % (xInts[0] / scale, yInts[0] / scale)]
+            result.extend(["++" + pointFormat % ((x - previousX) / scale,
+                                                 (y - previousY) / scale)
+                           for x, previousX, y, previousY in
+                           zip(xInts[1:], xInts, yInts[1:], yInts)])
+        if self.digits == 0:
+            return [_NEGATIVE_ZERO.sub("0", text) if "-0" in text else text
+                    for text in result]
+        return [_stripZeros(text) if "0," in text or "0)" in text else text
+                for text in result]
+
+def _stripZeros(text):
+    """Remove the trailing zeros of both numbers in a "(x,y)" string."""
+    text = _TRAILING_ZEROS.sub("", text)
+    if "-0" in text:
+        text = _NEGATIVE_ZERO.sub("0", text)
+    return text
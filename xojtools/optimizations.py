@@ -17,269 +17,1347 @@
 # You should have received a copy of the GNU General Public License
 # along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
 
-from math import sqrt, floor, ceil
+import time
+import heapq
+import collections
+from math import (sqrt, ceil, hypot, atan2, cos, sin, asin, acos, degrees,
+                  pi)
+from array import array
 
-from . import Page, Layer, Stroke, Rectangle, Circle, Ellipse
+from . import Page, Layer, Stroke, Rectangle, Circle, Ellipse, Polygon, Curve
+from .bezier import fitCurve
+from .stats import Statistics
 
 """
 This is a collection of functions to simplify strokes and detect shapes to
 improve the quality and size of the output file.
 """
 
-def detectCircle(stroke, increasedTolerance=False):
+class Features:
+    """
+    Facts about a stroke that several optimization passes need.
+    
+    They are computed once per stroke by the PassManager and shared by all
+    passes, so each pass can reject a stroke early without looking at its
+    points again. Passes that change the points of a stroke must not be
+    given stale features; the PassManager recomputes them in that case.
+    """
+    def __init__(self, stroke):
+        """
+        Constructor
+        
+        Keyword arguments:
+        stroke -- The Stroke to describe (mandatory)
+        """
+        coords = stroke.coords
+        self.xList = coords[0::2]
+        self.yList = coords[1::2]
+        self.pointCount = len(self.xList)
+        self.variableWidth = stroke.widths is not None
+        if self.pointCount > 0:
+            self.minX = min(self.xList)
+            self.maxX = max(self.xList)
+            self.minY = min(self.yList)
+            self.maxY = max(self.yList)
+            self.closed = (self.pointCount > 1 and
+                           self.xList[0] == self.xList[-1] and
+                           self.yList[0] == self.yList[-1])
+        else:
+            self.minX = self.maxX = self.minY = self.maxY = 0.0
+            self.closed = False
+        self._length = None
+        self._simplified = {}
+
+    def simplified(self, method, tolerance):
+        """
+        Return the indices of the points that are kept by the simplification
+        algorithm 'method' (see SIMPLIFICATION_METHODS) with 'tolerance'.
+        The result is cached, as several passes need it.
+        """
+        key = (method, tolerance)
+        if key not in self._simplified:
+            self._simplified[key] = SIMPLIFICATION_METHODS[method](
+                                        self.xList, self.yList, tolerance)
+        return self._simplified[key]
+
+    @property
+    def length(self):
+        """Arc length of the stroke in pt."""
+        if self._length is None:
+            xList = self.xList
+            yList = self.yList
+            self._length = sum(hypot(xList[i+1] - xList[i],
+                                     yList[i+1] - yList[i])
+                               for i in range(self.pointCount - 1))
+        return self._length
+
+def fitCircle(xList, yList):
+    """
+    Fit a circle to a list of points with the algebraic least squares method
+    of Kasa and return its center and radius as (x, y, radius). Return None
+    if all points are collinear.
+    
+    The coordinates are centered on their mean first, for numerical
+    stability. All sums are computed in a single pass over the points.
+    """
+    length = len(xList)
+    meanX = sum(xList) / length
+    meanY = sum(yList) / length
+    
+    suu = svv = suv = suuu = svvv = suvv = svuu = 0.0
+    for x, y in zip(xList, yList):
+        u = x - meanX
+        v = y - meanY
+        uu = u*u
+        vv = v*v
+        suu += uu
+        svv += vv
+        suv += u*v
+        suuu += uu*u
+        svvv += vv*v
+        suvv += u*vv
+        svuu += v*uu
+    
+    # Solve the 2x2 linear system for the center (uc, vc):
+    #   uc*suu + vc*suv = (suuu + suvv) / 2
+    #   uc*suv + vc*svv = (svvv + svuu) / 2
+    determinant = suu*svv - suv*suv
+    if determinant == 0:
+        return None
+    bu = (suuu + suvv) / 2
+    bv = (svvv + svuu) / 2
+    uc = (bu*svv - bv*suv) / determinant
+    vc = (bv*suu - bu*suv) / determinant
+    radius = sqrt(uc*uc + vc*vc + (suu + svv) / length)
+    return (meanX + uc, meanY + vc, radius)
+
+def _det3(m):
+    """Return the determinant of a 3x3 matrix (list of rows)."""
+    return (m[0][0]*(m[1][1]*m[2][2] - m[1][2]*m[2][1]) -
+            m[0][1]*(m[1][0]*m[2][2] - m[1][2]*m[2][0]) +
+            m[0][2]*(m[1][0]*m[2][1] - m[1][1]*m[2][0]))
+
+def _cubicRoots(b, c, d):
+    """Return the real roots of x^3 + b*x^2 + c*x + d = 0."""
+    # Substitute x = t - b/3 to get t^3 + p*t + q = 0
+    p = c - b*b/3
+    q = 2*b*b*b/27 - b*c/3 + d
+    shift = -b/3
+    discriminant = q*q/4 + p*p*p/27
+    if discriminant > 0:
+        root = sqrt(discriminant)
+        u = -q/2 + root
+        v = -q/2 - root
+        return [shift + (abs(u)**(1/3) if u >= 0 else -abs(u)**(1/3)) +
+                (abs(v)**(1/3) if v >= 0 else -abs(v)**(1/3))]
+    if p == 0:
+        return [shift]
+    # Three real roots, trigonometric method
+    r = 2*sqrt(-p/3)
+    phi = acos(max(-1.0, min(1.0, 3*q/(p*r))))/3
+    return [shift + r*cos(phi - 2*pi*k/3) for k in range(3)]
+
+# Maximum difference of the distances of the points of a circle to its center
+# in pt, an empirically determined epsilon. Ellipses whose semi-axes differ
+# less than this are circles.
+CIRCLE_TOLERANCE = 0.02
+# Maximum distance of the points of an ellipse to the fitted one, relative to
+# its minor semi-axis
+ELLIPSE_TOLERANCE = 0.05
+# Minimum ratio of the minor and major semi-axis of an ellipse, thinner ones
+# are not detected
+ELLIPSE_MIN_RATIO = 0.1
+
+def fitEllipse(xList, yList):
+    """
+    Fit an ellipse to a list of points with the direct least squares method
+    of Fitzgibbon, Pilu and Fisher, in the numerically stable form of Halir
+    and Flusser. Return its center, semi-axes and rotation as
+    (x, y, a, b, angle), where 'angle' is the counterclockwise rotation of
+    the 'a' axis in degrees, between -45 and 45. Return None if no ellipse
+    fits.
+    
+    The coordinates are centered on their mean and scaled, for numerical
+    stability. All sums are computed in a single pass over the points.
+    """
+    length = len(xList)
+    meanX = sum(xList) / length
+    meanY = sum(yList) / length
+    
+    # Sums of all monomials of the centered coordinates up to degree 4. The
+    # sums of u and v are zero.
+    s40 = s31 = s22 = s13 = s04 = s30 = s21 = s12 = s03 = 0.0
+    s20 = s11 = s02 = 0.0
+    for x, y in zip(xList, yList):
+        u = x - meanX
+        v = y - meanY
+        uu = u*u
+        uv = u*v
+        vv = v*v
+        s40 += uu*uu
+        s31 += uu*uv
+        s22 += uu*vv
+        s13 += uv*vv
+        s04 += vv*vv
+        s30 += uu*u
+        s21 += uu*v
+        s12 += u*vv
+        s03 += vv*v
+        s20 += uu
+        s11 += uv
+        s02 += vv
+    
+    # Scale the coordinates, so their mean distance to the center is 1
+    scale = sqrt((s20 + s02) / length)
+    if scale == 0:
+        return None
+    s2 = scale*scale
+    s3 = s2*scale
+    s4 = s2*s2
+    s40 /= s4
+    s31 /= s4
+    s22 /= s4
+    s13 /= s4
+    s04 /= s4
+    s30 /= s3
+    s21 /= s3
+    s12 /= s3
+    s03 /= s3
+    s20 /= s2
+    s11 /= s2
+    s02 /= s2
+    
+    # Scatter matrix of the quadratic part (s1), the linear part (s3) and
+    # both (s2)
+    s1 = [[s40, s31, s22], [s31, s22, s13], [s22, s13, s04]]
+    s2 = [[s30, s21, s20], [s21, s12, s11], [s12, s03, s02]]
+    s3 = [[s20, s11, 0.0], [s11, s02, 0.0], [0.0, 0.0, float(length)]]
+    
+    # t = -s3^-1 * s2^T maps the quadratic to the linear coefficients. s3 is
+    # block diagonal, only its upper 2x2 block has to be inverted.
+    determinant = s20*s02 - s11*s11
+    if determinant == 0:
+        return None
+    inverse = [[s02/determinant, -s11/determinant, 0.0],
+               [-s11/determinant, s20/determinant, 0.0],
+               [0.0, 0.0, 1.0/length]]
+    t = [[-sum(inverse[i][k]*s2[j][k] for k in range(3)) for j in range(3)]
+         for i in range(3)]
+    m = [[s1[i][j] + sum(s2[i][k]*t[k][j] for k in range(3))
+          for j in range(3)] for i in range(3)]
+    # Multiply with the inverse of the constraint matrix 4ac - b^2 = 1
+    m = [[value/2 for value in m[2]], [-value for value in m[1]],
+         [value/2 for value in m[0]]]
+    
+    # The eigenvector of m that satisfies the constraint holds the
+    # quadratic coefficients
+    trace = m[0][0] + m[1][1] + m[2][2]
+    minors = (m[0][0]*m[1][1] - m[0][1]*m[1][0] +
+              m[0][0]*m[2][2] - m[0][2]*m[2][0] +
+              m[1][1]*m[2][2] - m[1][2]*m[2][1])
+    best = None
+    for eigenvalue in _cubicRoots(-trace, minors, -_det3(m)):
+        rows = [[m[i][j] - (eigenvalue if i == j else 0.0) for j in range(3)]
+                for i in range(3)]
+        # The eigenvector is orthogonal to all rows, take the longest cross
+        # product of two of them
+        vector = None
+        for r1, r2 in ((0, 1), (0, 2), (1, 2)):
+            a, b = rows[r1], rows[r2]
+            cross = [a[1]*b[2] - a[2]*b[1], a[2]*b[0] - a[0]*b[2],
+                     a[0]*b[1] - a[1]*b[0]]
+            if vector is None or (sum(c*c for c in cross) >
+                                  sum(c*c for c in vector)):
+                vector = cross
+        condition = 4*vector[0]*vector[2] - vector[1]*vector[1]
+        if condition > 0 and (best is None or condition > best[0]):
+            best = (condition, vector)
+    if best is None:
+        return None
+    
+    A, B, C = best[1]
+    D, E, F = [sum(t[i][j]*best[1][j] for j in range(3)) for i in range(3)]
+    
+    # Center, axes and rotation of A*u^2 + B*u*v + C*v^2 + D*u + E*v + F = 0
+    denominator = B*B - 4*A*C
+    u0 = (2*C*D - B*E) / denominator
+    v0 = (2*A*E - B*D) / denominator
+    value = F + (D*u0 + E*v0) / 2
+    angle = atan2(B, A - C) / 2
+    c = cos(angle)
+    s = sin(angle)
+    axisA = A*c*c + B*c*s + C*s*s
+    axisB = A*s*s - B*c*s + C*c*c
+    if value == 0 or -value/axisA <= 0 or -value/axisB <= 0:
+        return None
+    a = sqrt(-value/axisA) * scale
+    b = sqrt(-value/axisB) * scale
+    
+    # Keep the rotation small, so an axis-aligned ellipse is not rotated by
+    # 90 degrees
+    angle = degrees(angle)
+    if angle > 45:
+        angle -= 90
+        a, b = b, a
+    elif angle <= -45:
+        angle += 90
+        a, b = b, a
+    return (meanX + u0*scale, meanY + v0*scale, a, b, angle)
+
+def detectCircle(stroke, features=None):
     """
     Detect, whether the input stroke is a circle and calculate its radius and
     center.
     
+    Cheap tests reject most strokes early: a circle is closed, has at least
+    10 points, a square bounding box and points that are evenly spaced. Only
+    then a circle is fitted to the points, which must all lie on it.
+    
     Keyword arguments:
     stroke -- The Stroke that should be analyzed and possibly replaced.
-    increasedTolerance -- True if a varying distance between the individual
-                          points of a stroke should not be an indicator of
-                          the stroke not being a circle.
-    """
-    
-    if (not isinstance(stroke, Stroke) or len(stroke.coordList) < 10 or 
-            stroke.coordList[-1] != stroke.coordList[0] or
-            len(stroke.coordList[1]) != 2):
-        return stroke
-
-    # plural of radius ;-)
-    radii = []
-    # list of coordinates that might be the center of the circle
-    xCoords = [] 
-    yCoords = []
-    distances = []
-    length = len(stroke.coordList)
-    
-    for i in range(length):
-        # Pick three points on the circle. the distance between these should be
-        # maximal to increase precision.
-        # (x1,y1) shall be point one, (x2,y2) point two, (x3,y3) point three
-        x1 = stroke.coordList[i][0]
-        y1 = stroke.coordList[i][1]
-        x2 = stroke.coordList[(i+floor(length/3))%length][0]
-        y2 = stroke.coordList[(i+floor(length/3))%length][1]
-        x3 = stroke.coordList[(i+floor(2*length/3))%length][0]
-        y3 = stroke.coordList[(i+floor(2*length/3))%length][1]
-        
-        # Calculate the point between point one and two, lets call it 'alpha'
-        x12 = (x1+x2)/2
-        y12 = (y1+y2)/2
-        # Calculate the point between point two and three, lets call it 'beta'
-        x23 = (x2+x3)/2
-        y23 = (y2+y3)/2
-        
-        # Calculate a point which forms a line with point alpha that is
-        # perpendicular to the line between point one and two,
-        # lets call it 'perp_alpha'
-        perp_x12 = x12 + (y1 - y2)
-        perp_y12 = y12 - (x1 - x2)
-        # Calculate a point which forms a line with point beta that is
-        # perpendicular to the line between point two and three,
-        # lets call it 'perp_beta'
-        perp_x23 = x23 + (y2 - y3)
-        perp_y23 = y23 - (x2 - x3)
-        
-        # Now we calculate the intersection of the lines (alpha, perp_alpha) 
-        # and (beta, perp_beta). This is the center of our circle.
-        x = (((x12*perp_y12 - y12*perp_x12)*(x23 - perp_x23) - (x12 - perp_x12)*(x23*perp_y23 - y23*perp_x23)) /
-             ((x12 - perp_x12)*(y23 - perp_y23) - (y12 - perp_y12)*(x23 - perp_x23)))
-        y = (((x12*perp_y12 - y12*perp_x12)*(y23 - perp_y23) - (y12 - perp_y12)*(x23*perp_y23 - y23*perp_x23)) /
-             ((x12 - perp_x12)*(y23 - perp_y23) - (y12 - perp_y12)*(x23 - perp_x23)))
-        xCoords.append(x)
-        yCoords.append(y)
-    
-    xAvg = sum(xCoords)/len(xCoords)
-    yAvg = sum(yCoords)/len(yCoords)
-
-    # Calculate the radius
-    for i in range(length-1):
-        x1 = stroke.coordList[i][0]
-        y1 = stroke.coordList[i][1]
-        x2 = stroke.coordList[i+1][0]
-        y2 = stroke.coordList[i+1][1]
-        x12 = (x1+x2)/2
-        y12 = (y1+y2)/2
-        
-        # Distance between point one and two
-        distances.append(sqrt((x1-x2)**2 + (y1-y2)**2))
-        
-        # Calculate two radii and store the average of the two:
-        # radius1: Distance from the center to point one
-        # radius2: Distance from the center to the line between point one and two
-        radius1 = sqrt((x1-xAvg)**2 + (y1-yAvg)**2)
-        radius2 = sqrt((x12-xAvg)**2 + (y12-yAvg)**2)
-        radii.append((radius1+radius2)/2)
-    radius = sum(radii)/len(radii)
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if (features.variableWidth or features.pointCount < 10 or
+            not features.closed):
+        return stroke
+    
+    # The bounding box of a circle is a square (the corners of a polygon with
+    # 10 points may miss it by up to 5%).
+    width = features.maxX - features.minX
+    height = features.maxY - features.minY
+    if width == 0 or height == 0 or not 0.8 < width / height < 1.25:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    
+    # Distances between the individual points of the stroke
+    minDistance = float("inf")
+    maxDistance = 0.0
+    totalDistance = 0.0
+    for i in range(len(xList) - 1):
+        distance = sqrt((xList[i+1] - xList[i])**2 +
+                        (yList[i+1] - yList[i])**2)
+        minDistance = min(minDistance, distance)
+        maxDistance = max(maxDistance, distance)
+        totalDistance += distance
+    meanDistance = totalDistance / (len(xList) - 1)
+    
+    # The last point is the same as the first one, leave it out of the fit
+    fit = fitCircle(xList[:-1], yList[:-1])
+    if fit is None:
+        return stroke
+    x, y, radius = fit
     
     # If the distances between the individual coordinates of the stroke are too
     # high or the distance varies too much, it might not be a circle.
     # e1 and e2 were empirically determined
-    if increasedTolerance:
-        e1 = 0.5
-        e2 = 10
-    else:
-        e1 = 0.04
-        e2 = 3.5
+    e1 = 0.04
+    e2 = 3.5
     
-    if (max(distances) - min(distances) > e1 or
-            sum(distances) / len(distances) > e2):
+    if maxDistance - minDistance > e1 or meanDistance > e2:
         # Special case: If the circle is *very* large, stroke simplication
         # might have kicked in and removed some coordinates of the stroke.
         # 275 was chosen, because stroke simplification seems to remove
         # coordinates if the radius of the circle is bigger than ~300.
-        if (radius/275 < 1 or
-                ceil(radius/275)*e2 < sum(distances)/len(distances)):
+        if radius/275 < 1 or ceil(radius/275)*e2 < meanDistance:
             return stroke
     
-    # If the possible centers of the circle vary too much, then it may not be a
-    # circle after all.
-    # 0.02 is an empirically determined epsilon.
-    if max(xCoords) - min(xCoords) > 0.02 or max(yCoords) - min(yCoords) > 0.02:
-        return stroke
-    
-    # If the possible radii vary too much, it is not a circle.
-    # 0.02 is again an empirically determined epsilon.
-    if max(radii) - min(radii) > 0.02:
-        return stroke
+    # If the distances of the points to the center vary too much, it is not a
+    # circle.
+    minRadius = maxRadius = radius
+    for px, py in zip(xList, yList):
+        pointRadius = sqrt((px - x)**2 + (py - y)**2)
+        minRadius = min(minRadius, pointRadius)
+        maxRadius = max(maxRadius, pointRadius)
+        if maxRadius - minRadius > CIRCLE_TOLERANCE:
+            return stroke
         
-    return Circle(color=stroke.color, x=xAvg, y=yAvg,
-                  radius=radius, width=stroke.width)
+    return Circle(color=stroke.color, x=x, y=y, radius=radius,
+                  width=stroke.width)
     
-def detectEllipse(stroke):
+def detectEllipse(stroke, features=None):
     """
-    Detect, whether the input stroke is an ellipse and calculate its center and
-    dimensions
+    Detect, whether the input stroke is an ellipse and calculate its center,
+    dimensions and rotation.
     
     Make sure that ellipse detection is run *after* circle detection, as
     ellipses are circles too ;-)
+    
+    An ellipse is fitted to the points directly, see fitEllipse(). The stroke
+    is replaced, if it goes around the ellipse once, its ends (almost) meet
+    and none of its points is far from the ellipse. Hand drawn circles that
+    circle detection rejected (e.g. because their points are not evenly
+    spaced) are found here too, they are replaced by a Circle.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be analyzed and possibly replaced.
+    features -- Features of the stroke, computed if omitted (default None)
     """
-    if (not isinstance(stroke, Stroke) or len(stroke.coordList[1]) != 2 or 
-            stroke.coordList[-1] != stroke.coordList[0]):
-        return stroke
-    
-    normalizedCoords = []
-    xList = [x for x, y in stroke.coordList]
-    yList = [y for x, y in stroke.coordList]
-    
-    # Determine bounding rectangle
-    xMax = max(xList)
-    xMin = min(xList)
-    yMax = max(yList)
-    yMin = min(yList)
-    width = xMax - xMin
-    height = yMax - yMin
-    
-    # Prevent division by zero
-    if height == 0 or width == 0:
-        return stroke
-    
-    # Normalize the bounding rectangle to a square, so we can run the circle
-    # detection code on it.
-    if height < width:
-        factor = height/width
-        newXList = [xMin + factor*(x - xMin) for x in xList]
-        newYList = yList
-    else: # width < height
-        factor = width/height
-        newXList = xList
-        newYList = [yMin + factor*(y - yMin) for y in yList]
-    for i,j in zip(newXList,newYList):
-        normalizedCoords.append([i,j])
-    
-    # If a stroke, that was transformed to fit into a square is a circle, the
-    # original stroke is in fact an ellipse.
-    circle = detectCircle(Stroke(color=stroke.color, coordList=normalizedCoords,
-                                 width=stroke.width), increasedTolerance=True)
-    if isinstance(circle, Circle):
-        return Ellipse(color=stroke.color, left=xMin, right=xMax, top=yMax,
-                       bottom=yMin, width=stroke.width)
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if features.variableWidth or features.pointCount < 10:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    
+    # The ends of a hand drawn ellipse do not meet exactly. 0.05 is an
+    # empirically determined share of the stroke's length.
+    if not features.closed:
+        gap = hypot(xList[-1] - xList[0], yList[-1] - yList[0])
+        # The length of an ellipse is less than twice the sum of the width
+        # and height of its bounding box, which is cheaper to check first
+        size = features.maxX - features.minX + features.maxY - features.minY
+        if gap > 0.1*size or gap > 0.05*features.length:
+            return stroke
+        fit = fitEllipse(xList, yList)
     else:
+        # The last point is the same as the first one, leave it out of the fit
+        fit = fitEllipse(xList[:-1], yList[:-1])
+    if fit is None:
+        return stroke
+    x, y, a, b, angle = fit
+    a = abs(a)
+    b = abs(b)
+    if min(a, b) < ELLIPSE_MIN_RATIO*max(a, b):
+        return stroke
+    
+    # Every point has to be close to the ellipse and the stroke has to go
+    # around it exactly once.
+    c = cos(-angle*pi/180)
+    s = sin(-angle*pi/180)
+    maxDistance = max(ELLIPSE_TOLERANCE*min(a, b), 0.02)
+    winding = 0.0
+    previous = None
+    for px, py in zip(xList, yList):
+        # Position in the coordinate system of the ellipse, scaled to a unit
+        # circle
+        u = ((px - x)*c - (py - y)*s) / a
+        v = ((px - x)*s + (py - y)*c) / b
+        radius = hypot(u, v)
+        if radius == 0:
+            return stroke
+        # abs(radius - 1) is the distance to the ellipse relative to the
+        # distance to its center
+        if abs(radius - 1)*hypot(px - x, py - y)/radius > maxDistance:
+            return stroke
+        pointAngle = atan2(v, u)
+        if previous is not None:
+            step = (pointAngle - previous + pi) % (2*pi) - pi
+            winding += step
+        previous = pointAngle
+    if not 2*pi*0.9 < abs(winding) < 2*pi*1.1:
         return stroke
     
-def detectRectangle(stroke):
+    if abs(a - b) < CIRCLE_TOLERANCE:
+        return Circle(color=stroke.color, x=x, y=y, radius=(a + b) / 2,
+                      width=stroke.width)
+    
+    # Rotations of less than half a degree are not visible, neither are
+    # rotations of ellipses that are (almost) circles
+    if abs(angle) < 0.5 or abs(a - b) < maxDistance:
+        angle = 0.0
+    return Ellipse(color=stroke.color, left=x - a, right=x + a, top=y + b,
+                   bottom=y - b, angle=angle, width=stroke.width)
+    
+def detectRectangle(stroke, features=None):
     """
     Detect Rectangles, input should be a Stroke that has already been
     simplified.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be analyzed and possibly replaced.
+    features -- Features of the stroke, computed if omitted (default None)
     """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
     
     #TODO: support strokes that do not have a length of 5
-    if (not isinstance(stroke, Stroke) or len(stroke.coordList) != 5 or 
-            stroke.coordList[-1] != stroke.coordList[0] or
-            len(stroke.coordList[1]) != 2):
+    if (features.variableWidth or features.pointCount != 5 or
+            not features.closed):
         return stroke
     
-    coords = stroke.coordList
-
-    # Determine bounding box of the stroke:
-    left = right = coords[0][0]
-    top = bottom = coords[0][1]
-    for coord in coords[1:]:
-        left = min(left, coord[0])
-        right = max(right, coord[0])
-        top = max(top, coord[1])
-        bottom = min(bottom, coord[1])
+    # Bounding box of the stroke:
+    left = features.minX
+    right = features.maxX
+    top = features.maxY
+    bottom = features.minY
+    coords = list(zip(features.xList, features.yList))
     
     # All edges of the bounding box should be in the stroke, otherwise its not
     # an rectangle
-    if ([left, top] not in coords or [right, top] not in coords or
-            [left, bottom] not in coords or [right, bottom] not in coords):
+    if ((left, top) not in coords or (right, top) not in coords or
+            (left, bottom) not in coords or (right, bottom) not in coords):
         return stroke
     
     # Every coordinate in the stroke should be on the edges, otherwise its not
     # a rectangle
-    for coord in coords:
-        if coord[0] not in (left, right) and coord[1] not in (top, bottom):
+    for x, y in coords:
+        if x not in (left, right) and y not in (top, bottom):
             return stroke
     
     return Rectangle(color=stroke.color, x1=left, y1=bottom, x2=right, y2=top,
                      width=stroke.width)
     
-def simplifyStrokes(stroke):
+# Maximum distance of the points of a polygon to its sides, relative to the
+# length of the stroke
+POLYGON_TOLERANCE = 0.015
+# Minimum change of direction in degrees at a corner of a polygon
+POLYGON_MIN_ANGLE = 25
+# Maximum number of corners of a polygon, strokes with more are rather curves
+POLYGON_MAX_CORNERS = 6
+# Maximum deviation in degrees of the corners of a rectangle from 90 degrees
+RECTANGLE_ANGLE_TOLERANCE = 10
+
+def _fitLine(xList, yList):
     """
-    Detect collinear parts of a stroke and remove them.
+    Fit a line to a list of points with total least squares. Return a point
+    on it and its direction as (x, y, dx, dy).
     """
-    s = 0
+    length = len(xList)
+    meanX = sum(xList) / length
+    meanY = sum(yList) / length
+    sxx = syy = sxy = 0.0
+    for x, y in zip(xList, yList):
+        u = x - meanX
+        v = y - meanY
+        sxx += u*u
+        syy += v*v
+        sxy += u*v
+    angle = atan2(2*sxy, sxx - syy) / 2
+    return (meanX, meanY, cos(angle), sin(angle))
+
+def _intersectLines(first, second):
+    """
+    Return the intersection of two lines as returned by _fitLine(), or None
+    if they are (almost) parallel.
+    """
+    x1, y1, dx1, dy1 = first
+    x2, y2, dx2, dy2 = second
+    cross = dx1*dy2 - dy1*dx2
+    if abs(cross) < 0.1:
+        return None
+    t = ((x2 - x1)*dy2 - (y2 - y1)*dx2) / cross
+    return (x1 + t*dx1, y1 + t*dy1)
+
+def _segmentDistance(px, py, ax, ay, bx, by):
+    """Return the distance of point p to the segment from a to b."""
+    dx = bx - ax
+    dy = by - ay
+    segment2 = dx*dx + dy*dy
+    if segment2 > 0:
+        t = ((px - ax)*dx + (py - ay)*dy) / segment2
+        t = min(max(t, 0.0), 1.0)
+        return hypot(px - ax - t*dx, py - ay - t*dy)
+    return hypot(px - ax, py - ay)
+
+def _turn(corners, i):
+    """Return the change of direction in radians at corners[i]."""
+    px, py = corners[i-1]
+    x, y = corners[i]
+    nx, ny = corners[(i+1) % len(corners)]
+    return atan2((x - px)*(ny - y) - (y - py)*(nx - x),
+                 (x - px)*(nx - x) + (y - py)*(ny - y))
+
+def detectPolygon(stroke, features=None):
+    """
+    Detect, whether the input stroke is a closed convex polygon, e.g. a hand
+    drawn triangle or box, and replace it by a Polygon or, if it has four
+    right angles, by a (possibly rotated) Rectangle.
     
-    if not isinstance(stroke, Stroke) or len(stroke.coordList[1]) != 2:
+    Corner candidates are found by simplifying the stroke with the
+    Ramer-Douglas-Peucker algorithm, using a tolerance relative to its
+    length. Candidates where the direction changes by less than
+    POLYGON_MIN_ANGLE are dropped. The corners are then placed at the
+    intersections of lines fitted to the sides, and every point of the stroke
+    has to be close to the resulting polygon.
+    
+    Run it after circle and ellipse detection, which are stricter.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be analyzed and possibly replaced.
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if features.variableWidth or features.pointCount < 4:
         return stroke
     
-    while s < len(stroke.coordList) - 2:
-        ax = stroke.coordList[s][0]
-        ay = stroke.coordList[s][1]
-        bx = stroke.coordList[s+1][0]
-        by = stroke.coordList[s+1][1]
-        cx = stroke.coordList[s+2][0]
-        cy = stroke.coordList[s+2][1]
-        
+    xList = features.xList
+    yList = features.yList
+    # Tiny strokes, e.g. dots, are left alone
+    size = features.maxX - features.minX + features.maxY - features.minY
+    if size < 10*stroke.width:
+        return stroke
+    
+    # The ends of a hand drawn polygon do not meet exactly. The length of a
+    # convex polygon is less than twice the size of its bounding box, which
+    # is cheaper to check first.
+    if not features.closed:
+        gap = hypot(xList[-1] - xList[0], yList[-1] - yList[0])
+        if gap > 0.1*size:
+            return stroke
+    length = features.length
+    tolerance = max(POLYGON_TOLERANCE*length, stroke.width/2)
+    if not features.closed and gap > max(0.05*length, 2*tolerance):
+        return stroke
+    
+    # Corner candidates, the last point is the same as (or close to) the
+    # first one
+    indices = ramerDouglasPeucker(xList, yList, tolerance)[:-1]
+    if len(indices) < 3 or len(indices) > 2*POLYGON_MAX_CORNERS:
+        return stroke
+    
+    # Drop the candidate with the smallest change of direction, until all
+    # of them are real corners
+    minTurn = POLYGON_MIN_ANGLE*pi/180
+    while len(indices) >= 3:
+        corners = [(xList[i], yList[i]) for i in indices]
+        turns = [abs(_turn(corners, i)) for i in range(len(corners))]
+        smallest = min(range(len(turns)), key=turns.__getitem__)
+        if turns[smallest] >= minTurn:
+            break
+        del indices[smallest]
+    if not 3 <= len(indices) <= POLYGON_MAX_CORNERS:
+        return stroke
+    
+    # Fit a line to the points of every side, leaving out the points close to
+    # the corners, which are often rounded.
+    sides = []
+    count = len(indices)
+    pointCount = features.pointCount
+    for k in range(count):
+        start = indices[k]
+        end = indices[(k+1) % count]
+        if end <= start:
+            end += pointCount - 1
+        side = [(i % (pointCount - 1)) for i in range(start, end + 1)]
+        margin = len(side) // 5
+        if len(side) - 2*margin >= 2:
+            side = side[margin:len(side) - margin]
+        sides.append(_fitLine([xList[i] for i in side],
+                              [yList[i] for i in side]))
+    
+    corners = []
+    for k in range(count):
+        corner = _intersectLines(sides[k-1], sides[k])
+        if corner is None:
+            corner = (xList[indices[k]], yList[indices[k]])
+        corners.append(corner)
+    
+    # Convex: the direction changes the same way at every corner, by 360
+    # degrees in total
+    turns = [_turn(corners, k) for k in range(count)]
+    if not (all(turn > 0 for turn in turns) or
+            all(turn < 0 for turn in turns)):
+        return stroke
+    if abs(abs(sum(turns)) - 2*pi) > 0.1:
+        return stroke
+    
+    # Every point has to be close to the polygon
+    for px, py in zip(xList, yList):
+        if min(_segmentDistance(px, py, corners[k-1][0], corners[k-1][1],
+                                corners[k][0], corners[k][1])
+               for k in range(count)) > 2*tolerance:
+            return stroke
+    
+    if count == 4 and all(abs(abs(turn) - pi/2) <
+                          RECTANGLE_ANGLE_TOLERANCE*pi/180 for turn in turns):
+        return _rectangle(stroke, corners)
+    return Polygon(color=stroke.color, points=corners, width=stroke.width)
+
+def _rectangle(stroke, corners):
+    """Return the Rectangle that matches four corners best."""
+    x = sum(corner[0] for corner in corners) / 4
+    y = sum(corner[1] for corner in corners) / 4
+    
+    # Direction of the first side, averaged with the opposite one
+    (ax, ay), (bx, by), (cx, cy), (dx, dy) = corners
+    first = atan2(by - ay, bx - ax)
+    opposite = atan2(cy - dy, cx - dx)
+    angle = first + ((opposite - first + pi) % (2*pi) - pi) / 2
+    # Keep the rotation between -45 and 45 degrees
+    quarter = round(angle / (pi/2))
+    angle -= quarter*pi/2
+    
+    # Extent of the corners along the rotated axes
+    c = cos(angle)
+    s = sin(angle)
+    us = [(px - x)*c + (py - y)*s for px, py in corners]
+    vs = [(py - y)*c - (px - x)*s for px, py in corners]
+    halfWidth = (max(us) - min(us)) / 4 + (sorted(us)[2] - sorted(us)[1]) / 4
+    halfHeight = (max(vs) - min(vs)) / 4 + (sorted(vs)[2] - sorted(vs)[1]) / 4
+    
+    angle = degrees(angle)
+    # Rotations of less than half a degree are not visible
+    if abs(angle) < 0.5:
+        angle = 0.0
+    return Rectangle(color=stroke.color, x1=x - halfWidth, y1=y - halfHeight,
+                     x2=x + halfWidth, y2=y + halfHeight, angle=angle,
+                     width=stroke.width)
+
+def simplifyStrokes(stroke, features=None):
+    """
+    Detect collinear parts of a stroke and remove them.
+    
+    The points that are kept are collected in a single pass over the
+    coordinates of the stroke, so the run time is linear in its length.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be simplified.
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if features.variableWidth or features.pointCount < 3:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    
+    # Point a is the last point that is kept, b is the point that is checked
+    # and c the point after it.
+    ax = xList[0]
+    ay = yList[0]
+    bx = xList[1]
+    by = yList[1]
+    kept = [ax, ay]
+    
+    # If the product of both individual lengths is 'almost equal' to the
+    # scalar product, then these vectors are colinear.
+    # 0.99999 is an epsilon to compensate float inaccurracy.
+    # Testing has shown that this is a good value. maybe one should
+    # calculate the absolute error ...
+    # Both sides of the comparison are squared, to avoid two square roots.
+    epsilon = 0.99999**2
+    
+    for cx, cy in zip(xList[2:], yList[2:]):
+        abx = ax - bx
+        aby = ay - by
+        bcx = bx - cx
+        bcy = by - cy
         # Calculate the dot / scalar product of the two vectors
-        scalarProduct = (ax-bx) * (bx-cx) + (ay-by) * (by-cy)
+        scalarProduct = abx*bcx + aby*bcy
+        
+        if (scalarProduct > 0 and
+                (abx*abx + aby*aby) * (bcx*bcx + bcy*bcy) * epsilon <
+                scalarProduct*scalarProduct):
+            # b is between a and c, drop it
+            bx = cx
+            by = cy
+        else:
+            kept.append(bx)
+            kept.append(by)
+            ax = bx
+            ay = by
+            bx = cx
+            by = cy
+    kept.append(bx)
+    kept.append(by)
+    
+    if len(kept) < 2*features.pointCount:
+        stroke.setCoords(array('d', kept))
+    return stroke
+
+def ramerDouglasPeucker(xList, yList, tolerance):
+    """
+    Simplify a polyline with the Ramer-Douglas-Peucker algorithm and return
+    the sorted indices of the points that are kept.
+    
+    A point is removed if it is closer than 'tolerance' to the simplified
+    polyline. The first and last points are always kept.
+    
+    Every split scans all points between its ends. This takes O(n log n)
+    time if the farthest points divide the polyline roughly in half, as
+    they do for handwriting, but O(n**2) in the worst case, e.g. for a
+    spiral where every split only separates a single point. Distances are
+    measured to the segment, not to the line through its ends (which would
+    allow the O(n log n) path hull variant of Hershberger and Snoeyink), so
+    that strokes which double back on themselves are not cut short.
+    """
+    length = len(xList)
+    if length < 3:
+        return list(range(length))
+    
+    tolerance2 = tolerance*tolerance
+    keep = bytearray(length)
+    keep[0] = keep[-1] = 1
+    stack = [(0, length - 1)]
+    
+    while stack:
+        first, last = stack.pop()
+        ax = xList[first]
+        ay = yList[first]
+        dx = xList[last] - ax
+        dy = yList[last] - ay
+        segment2 = dx*dx + dy*dy
+        
+        # Find the point farthest away from the segment between first and last
+        maxDistance2 = -1.0
+        farthest = first
+        for i in range(first + 1, last):
+            px = xList[i] - ax
+            py = yList[i] - ay
+            if segment2 > 0:
+                t = (px*dx + py*dy) / segment2
+                if t < 0:
+                    t = 0
+                elif t > 1:
+                    t = 1
+                px -= t*dx
+                py -= t*dy
+            distance2 = px*px + py*py
+            if distance2 > maxDistance2:
+                maxDistance2 = distance2
+                farthest = i
+        
+        if maxDistance2 > tolerance2:
+            keep[farthest] = 1
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    
+    return [i for i in range(length) if keep[i]]
+
+def visvalingamWhyatt(xList, yList, tolerance):
+    """
+    Simplify a polyline with the Visvalingam-Whyatt algorithm and return the
+    sorted indices of the points that are kept.
+    
+    Points are removed in order of the area of the triangle they form with
+    their neighbours, as long as that area is smaller than tolerance**2. The
+    first and last points are always kept.
+    """
+    length = len(xList)
+    if length < 3:
+        return list(range(length))
+    
+    threshold = tolerance*tolerance
+    previous = list(range(-1, length - 1))
+    following = list(range(1, length + 1))
+    removed = bytearray(length)
+    
+    def area(i):
+        p = previous[i]
+        n = following[i]
+        return abs((xList[p] - xList[i]) * (yList[n] - yList[i]) -
+                   (xList[n] - xList[i]) * (yList[p] - yList[i])) / 2
+    
+    areas = [0.0] + [area(i) for i in range(1, length - 1)] + [0.0]
+    heap = [(areas[i], i) for i in range(1, length - 1)]
+    heapq.heapify(heap)
+    
+    while heap:
+        currentArea, i = heapq.heappop(heap)
+        # Skip entries that are outdated since a neighbour was removed
+        if removed[i] or currentArea != areas[i]:
+            continue
+        if currentArea >= threshold:
+            break
+        
+        removed[i] = 1
+        p = previous[i]
+        n = following[i]
+        following[p] = n
+        previous[n] = p
+        for j in (p, n):
+            if 0 < j < length - 1:
+                # The area of a point is never smaller than the one of a point
+                # removed before it
+                areas[j] = max(area(j), currentArea)
+                heapq.heappush(heap, (areas[j], j))
+    
+    return [i for i in range(length) if not removed[i]]
+
+# Algorithms for simplifyTolerance(), selected by name
+SIMPLIFICATION_METHODS = {
+    "rdp": ramerDouglasPeucker,
+    "visvalingam": visvalingamWhyatt,
+}
+# Algorithm used unless another one is given. Unlike ramerDouglasPeucker(),
+# it takes O(n log n) time even in the worst case.
+DEFAULT_SIMPLIFICATION = "visvalingam"
+
+def simplifyTolerance(stroke, tolerance, method=DEFAULT_SIMPLIFICATION,
+                      features=None):
+    """
+    Remove the points of a stroke that the simplification algorithm
+    'method' drops with 'tolerance' (in pt): with "rdp", the stroke deviates
+    at most 'tolerance' from the original, with "visvalingam", points are
+    removed while the triangle they form with their neighbours is smaller
+    than tolerance**2.
+    
+    Unlike simplifyStrokes(), this also removes points that are not exactly
+    collinear. It should run after the shape detection, which depends on
+    the original points.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be simplified (mandatory)
+    tolerance -- Tolerance in pt (mandatory)
+    method -- Name of the algorithm, see SIMPLIFICATION_METHODS
+              (default DEFAULT_SIMPLIFICATION)
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if features.variableWidth or features.pointCount < 3:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    indices = features.simplified(method, tolerance)
+    
+    if len(indices) < len(xList):
+        kept = array('d')
+        for i in indices:
+            kept.append(xList[i])
+            kept.append(yList[i])
+        stroke.setCoords(kept)
+    return stroke
+
+# Minimum change of direction in degrees between two segments of a stroke,
+# where fitCurves() does not try to join them smoothly
+CURVE_CORNER_ANGLE = 60
+
+def fitCurves(stroke, tolerance, method=DEFAULT_SIMPLIFICATION,
+              features=None):
+    """
+    Replace a stroke by a sequence of cubic Bezier curves that deviate at
+    most 'tolerance' (in pt) from it, see bezier.fitCurve().
+    
+    The stroke is only replaced, if the curves need fewer points than
+    simplifyTolerance() would keep: every curve has two control points in
+    addition to its end point. Sharp corners are kept, the curves are split
+    there.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be replaced (mandatory)
+    tolerance -- Maximum deviation in pt (mandatory)
+    method -- Algorithm simplifyTolerance() uses
+              (default DEFAULT_SIMPLIFICATION)
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if features.variableWidth or features.pointCount < 4:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    # Number of segments left after simplifyTolerance()
+    indices = features.simplified(method, tolerance)
+    segments = len(indices) - 1
+    maxCurves = (segments - 1) // 3
+    if maxCurves < 1:
+        return stroke
+    
+    # A Bezier curve has at most two inflection points, but a curve that
+    # replaces several segments rarely has more than one. If the simplified
+    # stroke changes the direction in which it turns more often, the curves
+    # are unlikely to need fewer points.
+    inflections = 0
+    previous = 0
+    for k in range(1, segments):
+        a, b, c = indices[k-1], indices[k], indices[k+1]
+        cross = ((xList[b] - xList[a])*(yList[c] - yList[b]) -
+                 (yList[b] - yList[a])*(xList[c] - xList[b]))
+        sign = (cross > 0) - (cross < 0)
+        if sign != 0:
+            if previous != 0 and sign != previous:
+                inflections += 1
+            previous = sign
+    if inflections > maxCurves:
+        return stroke
+    
+    minTurn = cos(CURVE_CORNER_ANGLE*pi/180)
+    corners = []
+    for i in range(1, features.pointCount - 1):
+        ax = xList[i] - xList[i-1]
+        ay = yList[i] - yList[i-1]
+        bx = xList[i+1] - xList[i]
+        by = yList[i+1] - yList[i]
+        lengths = hypot(ax, ay)*hypot(bx, by)
+        if lengths > 0 and (ax*bx + ay*by) < minTurn*lengths:
+            corners.append(i)
+    
+    curves = fitCurve(xList, yList, tolerance, corners, maxCurves=maxCurves)
+    if curves is None:
+        return stroke
+    return Curve(color=stroke.color, start=(xList[0], yList[0]),
+                 segments=curves, width=stroke.width)
+
+# Default maximum deviation in pt of simplifyWidths() from the path and from
+# the widths of a stroke, well below what can be seen
+WIDTH_PATH_TOLERANCE = 0.02
+WIDTH_TOLERANCE = 0.02
+
+def simplifyWidths(stroke, tolerance=WIDTH_PATH_TOLERANCE,
+                   widthTolerance=WIDTH_TOLERANCE, features=None):
+    """
+    Remove points of a stroke with variable width, as long as neither its
+    path nor its width change by more than the given tolerances.
+    
+    Consecutive segments are merged into one, if all points between them are
+    closer than 'tolerance' to the merged segment and if their widths differ
+    by at most 'widthTolerance'. The merged segment gets the width closest
+    to the middle of their range.
+    
+    Segments are merged greedily in a single pass over the points: starting
+    at the last kept point, the directions that a merged segment may take
+    form a cone, which gets narrower with every point passed (the "sleeve"
+    algorithm of Zhao and Saalfeld). The run time is linear in the length of
+    the stroke.
+    
+    Keyword arguments:
+    stroke -- The Stroke that should be simplified (mandatory)
+    tolerance -- Maximum deviation from the path in pt
+                 (default WIDTH_PATH_TOLERANCE)
+    widthTolerance -- Maximum difference of the merged widths in pt
+                      (default WIDTH_TOLERANCE)
+    features -- Features of the stroke, computed if omitted (default None)
+    """
+    if not isinstance(stroke, Stroke):
+        return stroke
+    if features is None:
+        features = Features(stroke)
+    if not features.variableWidth or features.pointCount < 3:
+        return stroke
+    
+    xList = features.xList
+    yList = features.yList
+    # widths[i] is the width of the segment from point i to point i+1
+    widths = stroke.widths
+    length = features.pointCount
+    newCoords = array('d')
+    newWidths = array('d')
+    
+    anchor = 0
+    while anchor < length - 1:
+        ax = xList[anchor]
+        ay = yList[anchor]
+        minWidth = maxWidth = widths[anchor]
+        end = anchor + 1
+        # Cone of allowed directions, relative to 'reference'
+        reference = None
+        low = -pi
+        high = pi
+        maxDistance = 0.0
         
-        # Calculate the lengths of both vectors (from a to b, from b to c)
-        firstLength = sqrt((ax-bx)**2 + (ay-by)**2)
-        secondLength = sqrt((bx-cx)**2 + (by-cy)**2)
+        for j in range(anchor + 1, length):
+            if j > anchor + 1:
+                width = widths[j-1]
+                if width < minWidth:
+                    if maxWidth - width > widthTolerance:
+                        break
+                    newMin, newMax = width, maxWidth
+                elif width > maxWidth:
+                    if width - minWidth > widthTolerance:
+                        break
+                    newMin, newMax = minWidth, width
+                else:
+                    newMin, newMax = minWidth, maxWidth
+            else:
+                newMin, newMax = minWidth, maxWidth
+            dx = xList[j] - ax
+            dy = yList[j] - ay
+            distance = hypot(dx, dy)
+            # Points on the segment must not be farther away than its end
+            if distance + tolerance < maxDistance:
+                break
+            if distance > tolerance:
+                direction = atan2(dy, dx)
+                if reference is None:
+                    reference = direction
+                direction = (direction - reference + pi) % (2*pi) - pi
+                if direction < low or direction > high:
+                    break
+                spread = asin(tolerance / distance)
+                if direction - spread > low:
+                    low = direction - spread
+                if direction + spread < high:
+                    high = direction + spread
+            minWidth = newMin
+            maxWidth = newMax
+            if distance > maxDistance:
+                maxDistance = distance
+            end = j
         
-        # If the product of both individual lengths is 'almost equal' to
-        # the scalar product, then these vectors are colinear.
-        # 0.99999 is an epsilon to compensate float inaccurracy.
-        # Testing has shown that this is a good value. maybe one should
-        # calculate the absolute error ...
-        if firstLength * secondLength * 0.99999 < scalarProduct:
-            del stroke.coordList[s+1]
+        # Use an existing width, the one closest to the middle of the range
+        if minWidth == maxWidth:
+            width = minWidth
         else:
-            s += 1
+            middle = (minWidth + maxWidth) / 2
+            width = min(widths[anchor:end], key=lambda w: abs(w - middle))
+        newCoords.append(ax)
+        newCoords.append(ay)
+        newWidths.append(width)
+        anchor = end
+    
+    if len(newWidths) + 1 < length:
+        newCoords.append(xList[-1])
+        newCoords.append(yList[-1])
+        stroke.setCoords(newCoords, newWidths)
     return stroke
 
-def runAll(document):
+class Pass:
     """
-    Iterate over a list of pages and run all optimization algorithms on them.
+    An optimization pass, as registered in PASSES.
+    
+    'function' is called as function(stroke, features, manager) and returns
+    either the (possibly modified) stroke or an item that replaces it. Passes
+    that remove points from a stroke have to set 'simplifies'.
     """
-    for page in document:
+    def __init__(self, name, function, description, simplifies=False):
+        """
+        Constructor
+        
+        Keyword arguments:
+        name -- Name of the pass, e.g. for the commandline (mandatory)
+        function -- The function that implements the pass (mandatory)
+        description -- Short description for the user (mandatory)
+        simplifies -- True if the pass removes points (default False)
+        """
+        self.name = name
+        self.function = function
+        self.description = description
+        self.simplifies = simplifies
+
+# All known passes, by name
+PASSES = collections.OrderedDict()
+
+def registerPass(optimizationPass):
+    """Add a Pass to the registry, so a PassManager can use it by name."""
+    PASSES[optimizationPass.name] = optimizationPass
+
+def _simplifyPass(stroke, features, manager):
+    return simplifyStrokes(stroke, features=features)
+
+def _rectanglePass(stroke, features, manager):
+    return detectRectangle(stroke, features=features)
+
+def _circlePass(stroke, features, manager):
+    return detectCircle(stroke, features=features)
+
+def _ellipsePass(stroke, features, manager):
+    return detectEllipse(stroke, features=features)
+
+def _polygonPass(stroke, features, manager):
+    return detectPolygon(stroke, features=features)
+
+def _curvePass(stroke, features, manager):
+    if manager.tolerance is None:
+        return stroke
+    return fitCurves(stroke, manager.tolerance, manager.method,
+                     features=features)
+
+def _tolerancePass(stroke, features, manager):
+    if manager.tolerance is None:
+        return stroke
+    return simplifyTolerance(stroke, manager.tolerance, manager.method,
+                             features=features)
+
+def _widthPass(stroke, features, manager):
+    if manager.tolerance is None:
+        tolerance = WIDTH_PATH_TOLERANCE
+    else:
+        tolerance = manager.tolerance
+    return simplifyWidths(stroke, tolerance, manager.widthTolerance,
+                          features=features)
+
+registerPass(Pass("simplify", _simplifyPass, "remove collinear points",
+                  simplifies=True))
+registerPass(Pass("rectangle", _rectanglePass, "detect rectangles"))
+registerPass(Pass("circle", _circlePass, "detect circles"))
+registerPass(Pass("ellipse", _ellipsePass,
+                  "detect ellipses, run it after circle"))
+registerPass(Pass("polygon", _polygonPass,
+                  "detect polygons and rotated rectangles, run it after "
+                  "ellipse"))
+registerPass(Pass("curve", _curvePass,
+                  "replace strokes by Bezier curves within the tolerance, "
+                  "run it after the shape detection"))
+registerPass(Pass("tolerance", _tolerancePass,
+                  "simplify strokes within the tolerance, run it after the "
+                  "shape detection", simplifies=True))
+registerPass(Pass("width", _widthPass,
+                  "simplify strokes with variable width within the tolerance "
+                  "and width tolerance", simplifies=True))
+
+# Passes that are run by default, in this order
+DEFAULT_PASSES = ["simplify", "rectangle", "circle", "ellipse", "polygon",
+                  "curve", "tolerance", "width"]
+
+class PassManager:
+    """
+    Runs a chain of optimization passes on every item of a page.
+    
+    Every item is visited once: its Features are computed and it is handed to
+    one pass after another, until a pass replaces it with a shape or all
+    passes are done. A PassManager can be used as 'preprocess' function of an
+    OutputModule.
+    
+    If a Statistics object is given, every pass is timed and counted in it.
+    """
+    def __init__(self, passes=None, tolerance=None,
+                 method=DEFAULT_SIMPLIFICATION,
+                 widthTolerance=WIDTH_TOLERANCE, statistics=None):
+        """
+        Constructor
+        
+        Keyword arguments:
+        passes -- Names of the passes to run, in this order (default
+                  DEFAULT_PASSES)
+        tolerance -- Tolerance in pt of the 'tolerance' pass, which does
+                     nothing if this is None (default None)
+        method -- Algorithm of the 'tolerance' pass
+                  (default DEFAULT_SIMPLIFICATION)
+        widthTolerance -- Maximum change of the width in pt of the 'width'
+                          pass, which uses 'tolerance' for the path if it is
+                          set (default WIDTH_TOLERANCE)
+        statistics -- Statistics object that is updated for every stroke
+                      (default None)
+        """
+        if passes is None:
+            passes = DEFAULT_PASSES
+        for name in passes:
+            if name not in PASSES:
+                raise ValueError("Unknown optimization pass: " + name)
+        self.passes = list(passes)
+        self.tolerance = tolerance
+        self.method = method
+        self.widthTolerance = widthTolerance
+        self.statistics = statistics
+
+    def __repr__(self):
+        return "PassManager(passes={!r}, tolerance={!r}, method={!r}, "\
+               "widthTolerance={!r})".format(self.passes, self.tolerance,
+                                             self.method, self.widthTolerance)
+
+    def __call__(self, page):
+        """Optimize a page in-place and return it."""
+        passes = [PASSES[name] for name in self.passes]
+        if self.statistics is None:
+            runStroke = self.runStroke
+        else:
+            runStroke = self.runStrokeStatistics
+            self.statistics.pages += 1
         for layer in page.layerList:
-            inplace_map(simplifyStrokes, layer.itemList)
-            inplace_map(detectRectangle, layer.itemList)
-            inplace_map(detectCircle, layer.itemList)
-            inplace_map(detectEllipse, layer.itemList)
+            itemList = layer.itemList
+            for i, item in enumerate(itemList):
+                if isinstance(item, Stroke):
+                    itemList[i] = runStroke(item, passes)
+        return page
+
+    def runStroke(self, stroke, passes):
+        """Run a list of Pass objects on a stroke and return the result."""
+        features = Features(stroke)
+        for optimizationPass in passes:
+            result = optimizationPass.function(stroke, features, self)
+            if result is not stroke:
+                if not isinstance(result, Stroke):
+                    # Replaced by a shape, no other pass applies
+                    return result
+                stroke = result
+                features = Features(stroke)
+            elif (optimizationPass.simplifies and
+                    stroke.pointCount() != features.pointCount):
+                features = Features(stroke)
+        return stroke
+
+    def runStrokeStatistics(self, stroke, passes):
+        """
+        Same as runStroke(), but time and count every pass in
+        self.statistics.
+        """
+        statistics = self.statistics
+        clock = time.perf_counter
+        start = clock()
+        features = Features(stroke)
+        statistics.featureTime += clock() - start
+        statistics.strokes += 1
+        statistics.inputPoints += features.pointCount
+        
+        for optimizationPass in passes:
+            passStatistics = statistics.passStatistics(optimizationPass.name)
+            passStatistics.examined += 1
+            start = clock()
+            result = optimizationPass.function(stroke, features, self)
+            passStatistics.time += clock() - start
+            
+            if not isinstance(result, Stroke):
+                passStatistics.replaced += 1
+                passStatistics.pointsRemoved += features.pointCount
+                return result
+            pointCount = result.pointCount()
+            if result is not stroke or pointCount != features.pointCount:
+                passStatistics.pointsRemoved += (features.pointCount -
+                                                 pointCount)
+                stroke = result
+                start = clock()
+                features = Features(stroke)
+                statistics.featureTime += clock() - start
+        statistics.outputPoints += features.pointCount
+        return stroke
+
+    def takeStatistics(self):
+        """
+        Return the statistics collected so far and start over with empty
+        ones. Return None if no statistics are collected.
+        
+        OutputModule uses this to collect the statistics of worker processes.
+        """
+        if self.statistics is None:
+            return None
+        statistics = self.statistics
+        self.statistics = Statistics()
+        return statistics
+
+    def addStatistics(self, statistics):
+        """Add statistics returned by takeStatistics() of a copy of this."""
+        if self.statistics is not None:
+            self.statistics.merge(statistics)
+
+def runAll(document, **kwargs):
+    """
+    Iterate over pages and run all optimization algorithms on them.
+    
+    Keyword arguments are passed on to PassManager.
+
+    If 'document' is a list of pages, it is optimized in-place and returned.
+    Any other iterable, e.g. the generator returned by
+    xournalparser.iterparse(), is optimized lazily: a generator is returned
+    that yields every page after it has been optimized.
+    """
+    manager = PassManager(**kwargs)
+    if isinstance(document, list):
+        for page in document:
+            manager(page)
+        return document
+    return (manager(page) for page in document)
+
+def runPage(page, **kwargs):
+    """
+    Run all optimization algorithms on a single page and return it.
+    
+    Keyword arguments are passed on to PassManager.
+    """
+    return PassManager(**kwargs)(page)
 
 def inplace_map(function, iterable):
     """Similar to pythons map() builtin, but it works in-place."""
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+from math import sqrt, hypot, atan2, acos, cos, sin, ceil, pi
+
+"""
+Outlines of strokes with variable width, so they can be filled as a single
+path instead of being drawn segment by segment.
+"""
+
+# Maximum distance (in pt) between the round joins and caps and the polylines
+# that approximate them
+OUTLINE_TOLERANCE = 0.05
+
+def strokeOutline(stroke, tolerance=OUTLINE_TOLERANCE):
+    """
+    Return the outline of a stroke as a list of (x, y) tuples. Filling the
+    closed polygon with the nonzero rule covers the same area as the stroke.
+    
+    The stroke is treated as a circle moving along its points, whose diameter
+    changes linearly along every segment. The diameter at a point is the mean
+    width of the segments that meet there. Both sides of every segment are
+    the outer tangents of the circles at its ends, they are connected by
+    round joins, and both ends get round caps.
+    
+    Keyword arguments:
+    stroke -- The Stroke, with fixed or variable width (mandatory)
+    tolerance -- Maximum distance (in pt) of the polylines that approximate
+                 joins and caps from the exact arcs (default OUTLINE_TOLERANCE)
+    """
+    coords = stroke.coords
+    widths = stroke.widths
+    count = len(coords) // 2
+    if widths is None:
+        widths = [stroke.width] * (count - 1)
+    
+    # Radius at every point, repeated points are merged
+    xList = [coords[0]]
+    yList = [coords[1]]
+    radii = [widths[0] / 2 if count > 1 else stroke.width / 2]
+    for i in range(1, count):
+        x = coords[2*i]
+        y = coords[2*i + 1]
+        if i < count - 1:
+            radius = (widths[i-1] + widths[i]) / 4
+        else:
+            radius = widths[i-1] / 2
+        if x == xList[-1] and y == yList[-1]:
+            radii[-1] = max(radii[-1], radius)
+            continue
+        xList.append(x)
+        yList.append(y)
+        radii.append(radius)
+    
+    if len(xList) == 1:
+        # A dot
+        points = [(xList[0] + radii[0], yList[0])]
+        _arc(points, xList[0], yList[0], radii[0], 0.0, -2*pi, tolerance)
+        return points
+    
+    # Direction of every segment and directions from its end points to both
+    # tangents
+    directions = []
+    left = []
+    right = []
+    for i in range(len(xList) - 1):
+        dx = xList[i+1] - xList[i]
+        dy = yList[i+1] - yList[i]
+        length = hypot(dx, dy)
+        ux = dx / length
+        uy = dy / length
+        # If one circle contains the other, the tangent degenerates
+        s = min(max((radii[i] - radii[i+1]) / length, -1.0), 1.0)
+        c = sqrt(1 - s*s)
+        directions.append((ux, uy))
+        left.append((ux*s - uy*c, uy*s + ux*c))
+        right.append((ux*s + uy*c, uy*s - ux*c))
+    
+    last = len(xList) - 1
+    # Both sides as lists of (start, end, normal, direction, vertex), where
+    # vertex is the (x, y, radius) circle the side ends on. The outline runs
+    # clockwise (in a y-up system): left side forwards, right side backwards.
+    leftSide = []
+    rightSide = []
+    for i in range(last):
+        start = (xList[i], yList[i], radii[i])
+        end = (xList[i+1], yList[i+1], radii[i+1])
+        ux, uy = directions[i]
+        nx, ny = left[i]
+        leftSide.append(((start[0] + nx*start[2], start[1] + ny*start[2]),
+                         (end[0] + nx*end[2], end[1] + ny*end[2]),
+                         left[i], (ux, uy), end))
+        nx, ny = right[i]
+        rightSide.append(((end[0] + nx*end[2], end[1] + ny*end[2]),
+                          (start[0] + nx*start[2], start[1] + ny*start[2]),
+                          right[i], (-ux, -uy), start))
+    rightSide.reverse()
+    
+    points = []
+    _side(points, leftSide, tolerance)
+    _cap(points, xList[last], yList[last], radii[last], left[-1], right[-1],
+         tolerance)
+    _side(points, rightSide, tolerance)
+    _cap(points, xList[0], yList[0], radii[0], right[0], left[0], tolerance)
+    return points
+
+def _side(points, side, tolerance):
+    """Append the points of one side of the outline, see strokeOutline()."""
+    points.append(side[0][0])
+    for current, following in zip(side, side[1:]):
+        _join(points, current, following, tolerance)
+    points.append(side[-1][1])
+
+def _arc(points, x, y, radius, start, sweep, tolerance):
+    """
+    Append the points of an arc around (x, y), from angle 'start' by 'sweep'
+    (both in radians), without its end points.
+    """
+    if radius <= tolerance:
+        step = pi / 2
+    else:
+        step = 2*acos(1 - tolerance / radius)
+    steps = int(ceil(abs(sweep) / step))
+    for k in range(1, steps):
+        angle = start + sweep*k/steps
+        points.append((x + radius*cos(angle), y + radius*sin(angle)))
+
+def _join(points, current, following, tolerance):
+    """
+    Connect two consecutive segments of a side of the outline, both tangent
+    to the circle at the point they share.
+    """
+    end, normal1, direction1, (x, y, radius) = current[1:]
+    start, normal2, direction2 = following[0], following[2], following[3]
+    cosine = normal1[0]*normal2[0] + normal1[1]*normal2[1]
+    sweep = atan2(normal1[0]*normal2[1] - normal1[1]*normal2[0], cosine)
+    # The tangents of tapered segments are tilted, so near U-turns both
+    # sides may seem to turn inwards. The side the path turns away from is
+    # the outer one then.
+    if (sweep > 0 and
+            direction1[0]*direction2[1] - direction1[1]*direction2[0] <= 0 and
+            direction1[0]*direction2[0] + direction1[1]*direction2[1] < 0):
+        sweep -= 2*pi
+    
+    # Intersection of both sides
+    if abs(sweep) < pi / 2:
+        scale = radius / (1 + cosine)
+        miterX = x + (normal1[0] + normal2[0])*scale
+        miterY = y + (normal1[1] + normal2[1])*scale
+    
+    if sweep < 0:
+        # Outer side: a round join, unless the corner of both sides is close
+        # enough to it
+        if abs(sweep) < pi / 2 and radius*(1 / cos(sweep / 2) - 1) <= tolerance:
+            points.append((miterX, miterY))
+            return
+        points.append(end)
+        _arc(points, x, y, radius, atan2(normal1[1], normal1[0]), sweep,
+             tolerance)
+        points.append(start)
+        return
+    
+    # Inner side: the sides cross, unless the segments are too short
+    if (abs(sweep) < pi / 2 and
+            _between(current[0], end, miterX, miterY) and
+            _between(start, following[1], miterX, miterY)):
+        points.append((miterX, miterY))
+        return
+    # Pivot around the point itself. The loops this creates are inside the
+    # outline and do not change the filled area.
+    points.append(end)
+    points.append((x, y))
+    points.append(start)
+
+def _between(a, b, x, y):
+    """Return True if (x, y) projects onto the line segment from a to b."""
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    product = (x - a[0])*dx + (y - a[1])*dy
+    return 0 <= product <= dx*dx + dy*dy
+
+def _cap(points, x, y, radius, before, after, tolerance):
+    """Append a round cap around the end point (x, y) of a stroke."""
+    start = atan2(before[1], before[0])
+    sweep = atan2(after[1], after[0]) - start
+    while sweep >= 0:
+        sweep -= 2*pi
+    _arc(points, x, y, radius, start, sweep, tolerance)
@@ -17,11 +17,18 @@
 # You should have received a copy of the GNU General Public License
 # along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
 import sys
+import copy
+import shutil
+import tempfile
+import functools
+import collections
+import multiprocessing
 
-from . import Stroke, TextBox, Rectangle, Circle, Ellipse
-
-COLOR_PREFIX = "xou"
+from . import Stroke, TextBox, Rectangle, Circle, Ellipse, Polygon, Curve
+from .color import texColorName
+from .emitter import Emitter
 
 class OutputModule:
     """
@@ -44,16 +51,54 @@ class OutputModule:
         """
         raise NotImplementedError
         
-    def __init__(self, document, output=sys.stdout):
+    # Bodies larger than this are spooled to disk in single pass mode
+    SPOOL_SIZE = 8 * 1024 * 1024
+    # Pages per worker process that are rendered ahead in parallel mode
+    PARALLEL_WINDOW = 2
+
+    def __init__(self, document, output=sys.stdout, palette=None,
+                 singlePass=False, bufferSize=65536, preprocess=None, jobs=1,
+                 cache=None):
         """
         Constructor
         
         Keyword arguments:
-        document -- List of 'Page' objects (default [])
+        document -- List of 'Page' objects or an iterator yielding them, e.g.
+                    from xournalparser.iterparse() (default [])
         output -- Where to write the TikZ code to (default sys.stdout)
+        palette -- Palette with all colors of the document, as filled by the
+                   parser (default None)
+        singlePass -- Write the body before the header, so the header can use
+                      information collected while writing the body and the
+                      document is traversed only once. The body is spooled
+                      and written to the output after the header.
+                      (default False)
+        bufferSize -- Number of characters that are collected before they are
+                      written to the output (default 65536)
+        preprocess -- Function that is applied to every page before it is
+                      written, e.g. optimizations.runPage. It has to return
+                      the page. If it has takeStatistics() and
+                      addStatistics() methods, like
+                      optimizations.PassManager, the statistics of worker
+                      processes are added to it. (default None)
+        jobs -- Number of processes that preprocess and render pages in
+                parallel. The pages are written in their original order.
+                (default 1)
+        cache -- PageCache that stores the output of every page. Pages with
+                 a digest (see xournalparser.parse()) are only preprocessed
+                 and rendered if they are not in the cache. (default None)
         """
         self.output = output
+        self.emitter = Emitter(output, chunkSize=bufferSize)
         self.document = document
+        self.palette = palette
+        self.singlePass = singlePass
+        self.preprocess = preprocess
+        self.jobs = jobs
+        self.cache = cache
+        self._cacheOptions = None
+        # Pages to write instead of the document, see printRendered()
+        self._rendered = None
         self.currentPage = None
         self.currentLayer = None
     
@@ -63,31 +108,24 @@ class OutputModule:
         Convert a color to an unique string for use in a TeX document.
 
         Keyword arguments:
-        tup -- Tuple of (red, green, blue, opacity)
-        """
-        (r, g, b, o) = tup
-        if (r, g, b) == (0, 0, 0):
-            return "black"
-        elif (r, g, b) == (255, 255, 255):
-            return "white"
-        elif (r, g, b) == (255, 0, 0):
-            return "red"
-        elif (r, g, b) == (0, 255, 0):
-            return "green"
-        elif (r, g, b) == (0, 0, 255):
-            return "blue"
-        elif (r, g, b) == (0, 173, 239):
-            return "cyan"
-        elif (r, g, b) == (236, 0, 140):
-            return "magenta"
-        elif (r, g, b) == (255, 242, 0):
-            return "yellow"
-        else:
-            return "{}{:02x}{:02x}{:02x}".format(COLOR_PREFIX, r, g, b)
+        tup -- Tuple of (red, green, blue, opacity), preferably a Color
+        """
+        try:
+            return tup.texName
+        except AttributeError:
+            return texColorName(tup[0], tup[1], tup[2])
       
     def write(self, value):
-        """print() wrapper function. Writes the value to output file."""
-        print(value, file=self.output, end="")
+        """Write a string to the output file (buffered)."""
+        self.emitter.write(value)
+
+    def writeAll(self, fragments):
+        """Write the concatenation of an iterable of strings (buffered)."""
+        self.emitter.writeAll(fragments)
+
+    def flush(self):
+        """Write everything that is still buffered to the output file."""
+        self.emitter.flush()
         
     def errorMsg(self, value):
         """
@@ -101,9 +139,27 @@ class OutputModule:
       
     def printAll(self):
         """Write the header, body and footer of the output file."""
-        self.header()
-        self.body()
+        if not self.singlePass:
+            self.header()
+            self.body()
+            self.footer()
+            self.flush()
+            return
+
+        with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE,
+                                           mode="w+") as spool:
+            self.emitter.output = spool
+            try:
+                self.body()
+                self.flush()
+            finally:
+                self.emitter.output = self.output
+            self.header()
+            self.flush()
+            spool.seek(0)
+            shutil.copyfileobj(spool, self.output)
         self.footer()
+        self.flush()
 
     def header(self):
         """
@@ -121,8 +177,185 @@ class OutputModule:
         You may optionally override this function, if you want to write an
         output module.
         """
-        for page in self.document:
+        entries = self._rendered
+        if entries is None:
+            entries = self.renderPages()
+        for text, state in entries:
+            self.mergePageState(state)
+            self.write(text)
+
+    def _template(self):
+        """
+        Return a copy of this output module without a document, output and
+        cache, to render pages elsewhere.
+        """
+        template = copy.copy(self)
+        template.document = None
+        template.output = None
+        template.emitter = None
+        template.palette = None
+        template.cache = None
+        template.jobs = 1
+        return template
+
+    def _renderParallel(self):
+        """
+        Preprocess and render the pages in a pool of worker processes and
+        yield the results (see renderPage()) in the original order. Pages
+        found in the cache are not sent to the workers.
+        
+        At most PARALLEL_WINDOW pages per process are taken from the document
+        ahead of the one that is yielded next, so a streamed document is
+        never held in memory as a whole.
+        """
+        template = self._template()
+        window = self.PARALLEL_WINDOW * self.jobs
+        
+        # (key, cache entry, pending result) of every page taken from the
+        # document that has not been yielded yet, in order
+        pending = collections.deque()
+        
+        def finish(key, entry, result):
+            if result is not None:
+                entry, statistics = result.get()
+                if statistics is not None:
+                    self.preprocess.addStatistics(statistics)
+                if key is not None:
+                    self.cache.put(key, entry)
+            return entry
+        
+        with multiprocessing.Pool(self.jobs, _initWorker,
+                                  (template,)) as pool:
+            for page in self.document:
+                key = self._cacheKey(page)
+                entry = None
+                if key is not None:
+                    entry = self.cache.get(key)
+                result = None
+                if entry is None:
+                    result = pool.apply_async(_renderPage, (page,))
+                pending.append((key, entry, result))
+                if len(pending) >= window:
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+
+    def renderPages(self):
+        """
+        Preprocess and render every page of the document, see renderPage(),
+        and yield the results in order. Pages are taken from the cache if
+        possible and rendered in parallel if 'jobs' is greater than 1.
+        """
+        if self.jobs > 1:
+            yield from self._renderParallel()
+        else:
+            for page in self.document:
+                key = self._cacheKey(page)
+                entry = None
+                if key is not None:
+                    entry = self.cache.get(key)
+                if entry is None:
+                    if self.preprocess is not None:
+                        page = self.preprocess(page)
+                    entry = self.renderPage(page)
+                    if key is not None:
+                        self.cache.put(key, entry)
+                yield entry
+        
+        if self.cache is not None:
+            self.cache.prune()
+
+    def pageFiles(self):
+        """
+        Yield a complete output file (header, page and footer) for every
+        page of the document, e.g. to write each page to its own file. The
+        pages are rendered by renderPages().
+        """
+        template = self._template()
+        template.preprocess = None
+        template.document = []
+        # Rendering pages changes the state of this module, e.g. the colors
+        # that have been defined, the copies must not share it
+        template = copy.deepcopy(template)
+        for entry in self.renderPages():
+            module = copy.deepcopy(template)
+            buffer = io.StringIO()
+            module.output = buffer
+            module.emitter = Emitter(buffer)
+            module.printRendered([entry])
+            yield buffer.getvalue()
+
+    def printRendered(self, entries):
+        """
+        Write the header, pages that have been rendered before (see
+        renderPage()) and the footer.
+        """
+        self._rendered = entries
+        try:
+            self.printAll()
+        finally:
+            self._rendered = None
+
+    def _cacheKey(self, page):
+        """Return the cache key of a page, or None if it can't be cached."""
+        if self.cache is None or page.digest is None:
+            return None
+        if self._cacheOptions is None:
+            self._cacheOptions = self.cacheOptions()
+        return self.cache.key(page.digest, self._cacheOptions)
+
+    def cacheOptions(self):
+        """
+        Return a string that describes all settings which affect the output
+        of a single page.
+        
+        Output modules with settings of their own have to extend this.
+        """
+        return "{}.{} preprocess={}".format(type(self).__module__,
+                                            type(self).__qualname__,
+                                            _describe(self.preprocess))
+
+    def renderPage(self, page):
+        """
+        Write a page to a string instead of the output file.
+        
+        Return a tuple of the text and the state collected while writing it,
+        see pageState(). The page is rendered as in single pass mode, i.e.
+        anything that is not part of the page itself ends up in the state.
+        """
+        previous = self.pageState()
+        singlePass = self.singlePass
+        buffer = io.StringIO()
+        emitter = self.emitter
+        self.emitter = Emitter(buffer)
+        self.singlePass = True
+        try:
             self.page(page)
+            self.flush()
+            state = self.pageState()
+        finally:
+            self.emitter = emitter
+            self.singlePass = singlePass
+            self.mergePageState(previous)
+        return buffer.getvalue(), state
+
+    def pageState(self):
+        """
+        Return and reset the state collected while writing pages, that is
+        needed to write the rest of the file (e.g. the colors used so far).
+        The result must be picklable.
+        
+        Override this together with mergePageState(), if the output module
+        collects information while writing the body.
+        """
+        return None
+
+    def mergePageState(self, state):
+        """
+        Merge the state returned by pageState() of a page that has been
+        rendered by another instance of this output module.
+        """
+        pass
             
     def page(self, page):
         """
@@ -156,6 +389,10 @@ class OutputModule:
                 self.ellipse(item)
             elif isinstance(item, Rectangle):
                 self.rectangle(item)
+            elif isinstance(item, Polygon):
+                self.polygon(item)
+            elif isinstance(item, Curve):
+                self.curve(item)
             else:
                 self.errorMsg("Warning: Unknown Object in itemList of {} on {}"
                               .format(layer, self.currentPage))
@@ -200,6 +437,22 @@ class OutputModule:
         """
         pass
 
+    def polygon(self, polygon):
+        """
+        Write a closed polygon in the output file.
+        
+        Override this, if you want to write an output module.
+        """
+        pass
+
+    def curve(self, curve):
+        """
+        Write a path of Bezier curves in the output file.
+        
+        Override this, if you want to write an output module.
+        """
+        pass
+
     def footer(self):
         """
         Write a footer in the output file.
@@ -207,3 +460,40 @@ class OutputModule:
         Override this, if you want to write an output module.
         """
         pass
+
+def _describe(function):
+    """Return a description of a function that is stable between runs."""
+    if function is None:
+        return "None"
+    if isinstance(function, functools.partial):
+        return "{}({})".format(_describe(function.func), ", ".join(
+            [repr(arg) for arg in function.args] +
+            ["{}={!r}".format(key, value)
+             for key, value in sorted(function.keywords.items())]))
+    if hasattr(function, "__qualname__"):
+        return "{}.{}".format(getattr(function, "__module__", ""),
+                              function.__qualname__)
+    return repr(function)
+
+# Output module used by the worker processes of OutputModule._renderParallel()
+_workerModule = None
+
+def _initWorker(module):
+    """Initialize a worker process with a copy of the output module."""
+    global _workerModule
+    _workerModule = module
+
+def _renderPage(page):
+    """
+    Preprocess and render a page in a worker process.
+    
+    Return a tuple of the rendered page (see OutputModule.renderPage()) and
+    the statistics collected by the preprocess function, if any.
+    """
+    module = _workerModule
+    statistics = None
+    if module.preprocess is not None:
+        page = module.preprocess(page)
+        if hasattr(module.preprocess, "takeStatistics"):
+            statistics = module.preprocess.takeStatistics()
+    return module.renderPage(page), statistics
@@ -1,4 +1,7 @@
 from .tikzlinewidth import TikzLineWidth
 from .tikzdebug import TikzDebug
+from .pdf import Pdf
+from .svg import Svg
+from .pgf import Pgf
 
-__all__ = ["TikzLineWidth", "TikzDebug"]
+__all__ = ["TikzLineWidth", "TikzDebug", "Pdf", "Svg", "Pgf"]
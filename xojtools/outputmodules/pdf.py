@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from math import cos, sin, radians
+
+from .. import OutputModule
+from ..outline import strokeOutline
+from ..formatter import NumberFormatter
+
+"""
+PDF output without LaTeX: every page becomes a PDF page with an uncompressed
+content stream.
+"""
+
+# Distance of the control points of a cubic Bezier curve that approximates a
+# quarter circle, relative to the radius
+KAPPA = 0.5522847498
+
+# Position of the first baseline of a text box below its top and the distance
+# between lines, relative to the font size. Xournal's default font "Sans" is
+# replaced by Helvetica.
+TEXT_ASCENT = 0.93
+TEXT_LEADING = 1.17
+
+# The document catalog, the page tree and the font are the first objects, the
+# objects of the pages follow
+CATALOG = 1
+PAGES = 2
+FONT = 3
+FIRST_PAGE = 4
+
+class Pdf(OutputModule):
+    """An output module that writes a PDF file directly."""
+    @staticmethod
+    def name():
+        """
+        Return the name of this output module, this can be presented to the user.
+        """
+        return "PDF"
+
+    def __init__(self, document, output=sys.stdout, **kwargs):
+        """
+        Constructor
+        
+        Keyword arguments:
+        document -- List or iterator of 'Page' objects (default [])
+        output -- Where to write the PDF to (default sys.stdout). The file is
+                  plain ASCII, so a text file is fine.
+        
+        All other keyword arguments are passed on to OutputModule. Single pass
+        mode is never used: the header does not depend on the body, and the
+        position of every object in the file has to be known while writing
+        it.
+        """
+        super(Pdf, self).__init__(document, output=output, **kwargs)
+        self.singlePass = False
+        self.formatter = NumberFormatter(2)
+        self.colorFormatter = NumberFormatter(3)
+        # Number of characters written so far and the offsets of all objects
+        self.position = 0
+        self.offsets = {}
+        self.pageCount = 0
+        # (content stream object, width, height, opacities, font) of the page
+        # whose content stream has been written, but not its page object
+        self.openPage = None
+        # True while a page is rendered to a string, see renderPage()
+        self.rendering = False
+        # State of the page that has been rendered last, see pageState()
+        self.pageInfo = None
+        self.resetGraphicsState()
+
+    def write(self, value):
+        """Write a string to the output file (buffered)."""
+        self.position += len(value)
+        self.emitter.write(value)
+
+    def writeAll(self, fragments):
+        """Write the concatenation of an iterable of strings (buffered)."""
+        self.write("".join(fragments))
+
+    def beginObject(self, number):
+        """Remember the position of object 'number' and start it."""
+        self.offsets[number] = self.position
+        self.write("{} 0 obj\n".format(number))
+
+    def header(self):
+        """Write the PDF header, the document catalog and the font."""
+        self.write("%PDF-1.4\n")
+        self.beginObject(CATALOG)
+        self.write("<< /Type /Catalog /Pages {} 0 R >>\nendobj\n"
+                   .format(PAGES))
+        self.beginObject(FONT)
+        self.write("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                   "/Encoding /WinAnsiEncoding >>\nendobj\n")
+
+    def page(self, page):
+        """
+        Write a page: its content stream, followed by the page object.
+        
+        The content stream only depends on the page itself, so it can be
+        rendered by another process or taken from the cache. The page is
+        rendered to a string first, because the length of the stream has to
+        be written in front of it.
+        """
+        if not self.rendering:
+            text, state = self.renderPage(page)
+            self.mergePageState(state)
+            self.write(text)
+            return
+        
+        start = self.position
+        self.resetGraphicsState()
+        # Xournal's y axis points down
+        self.write("1 0 0 -1 0 {} cm\n1 J\n1 j\n".format(
+                       self.formatter.number(page.height)))
+        super(Pdf, self).page(page)
+        self.pageInfo = (page.width, page.height, self.position - start,
+                         sorted(self.opacities.items()), self.fontUsed)
+
+    def renderPage(self, page):
+        """Render a page to a string, see OutputModule.renderPage()."""
+        position = self.position
+        self.rendering = True
+        try:
+            return super(Pdf, self).renderPage(page)
+        finally:
+            self.rendering = False
+            self.position = position
+
+    def pageState(self):
+        """
+        Return and reset the size, the length of the content stream and the
+        resources of the page that has been rendered last.
+        """
+        info = self.pageInfo
+        self.pageInfo = None
+        return info
+
+    def mergePageState(self, state):
+        """
+        Start the content stream of a page that has been rendered, its
+        content is written next.
+        """
+        if state is None:
+            return
+        self.closePage()
+        width, height, length, opacities, fontUsed = state
+        number = FIRST_PAGE + 2 * self.pageCount
+        self.pageCount += 1
+        self.beginObject(number)
+        self.write("<< /Length {} >>\nstream\n".format(length))
+        self.openPage = (number, width, height, opacities, fontUsed)
+
+    def closePage(self):
+        """End the open content stream and write its page object."""
+        if self.openPage is None:
+            return
+        number, width, height, opacities, fontUsed = self.openPage
+        self.openPage = None
+        self.write("\nendstream\nendobj\n")
+        
+        resources = []
+        if fontUsed:
+            resources.append("/Font << /F1 {} 0 R >>".format(FONT))
+        if opacities:
+            resources.append("/ExtGState << {} >>".format(" ".join(
+                "/A{0} << /CA {1} /ca {1} >>".format(name, opacity)
+                for name, opacity in opacities)))
+        formatNumber = self.formatter.number
+        self.beginObject(number + 1)
+        self.write("<< /Type /Page /Parent {} 0 R /MediaBox [0 0 {} {}] "
+                   "/Contents {} 0 R /Resources << {} >> >>\nendobj\n"
+                   .format(PAGES, formatNumber(width), formatNumber(height),
+                           number, " ".join(resources)))
+
+    def footer(self):
+        """Write the page tree, the cross-reference table and the trailer."""
+        self.closePage()
+        self.beginObject(PAGES)
+        self.write("<< /Type /Pages /Kids [{}] /Count {} >>\nendobj\n".format(
+                       " ".join("{} 0 R".format(FIRST_PAGE + 2 * i + 1)
+                                for i in range(self.pageCount)),
+                       self.pageCount))
+        
+        size = FIRST_PAGE + 2 * self.pageCount
+        start = self.position
+        parts = ["xref\n0 {}\n0000000000 65535 f \n".format(size)]
+        parts.extend("{:010d} 00000 n \n".format(self.offsets[number])
+                     for number in range(1, size))
+        parts.append("trailer\n<< /Size {} /Root {} 0 R >>\nstartxref\n{}\n"
+                     "%%EOF\n".format(size, CATALOG, start))
+        self.writeAll(parts)
+
+    def resetGraphicsState(self):
+        """Forget the graphics state, at the beginning of a page."""
+        self.strokeColor = None
+        self.fillColor = None
+        self.lineWidth = None
+        self.opacity = 1000
+        # Opacities used on the page, name -> value
+        self.opacities = {}
+        self.fontUsed = False
+
+    def style(self, color, width=None, fill=False):
+        """
+        Return the operators that set the stroke color (or fill color) to
+        'color', the line width to 'width' and the opacity, if they differ
+        from the current graphics state.
+        """
+        parts = []
+        rgb = " ".join(self.colorFormatter.numbers(
+                           (color[0] / 255, color[1] / 255, color[2] / 255)))
+        if fill:
+            if rgb != self.fillColor:
+                self.fillColor = rgb
+                parts.append(rgb + " rg\n")
+        elif rgb != self.strokeColor:
+            self.strokeColor = rgb
+            parts.append(rgb + " RG\n")
+        if width is not None:
+            width = self.formatter.number(width)
+            if width != self.lineWidth:
+                self.lineWidth = width
+                parts.append(width + " w\n")
+        
+        # Opacities are set with graphics state parameter dictionaries, whose
+        # names only depend on the value
+        opacity = round(color[3] * 1000)
+        if opacity != self.opacity:
+            self.opacity = opacity
+            self.opacities[opacity] = self.colorFormatter.number(
+                                          opacity / 1000)
+            parts.append("/A{} gs\n".format(opacity))
+        return "".join(parts)
+
+    def stroke(self, stroke):
+        """
+        Write a stroke. Strokes with variable width are filled with their
+        outline, see outline.strokeOutline().
+        """
+        if stroke.widths is not None:
+            points = strokeOutline(stroke)
+            parts = [self.style(stroke.color, fill=True)]
+            self._polyline(parts, [x for x, y in points],
+                           [y for x, y in points])
+            parts.append("h\nf\n")
+            self.writeAll(parts)
+            return
+        
+        coords = stroke.coords
+        parts = [self.style(stroke.color, stroke.width)]
+        # A closed stroke ends with "h", so its ends are joined
+        closed = (len(coords) > 4 and coords[0] == coords[-2] and
+                  coords[1] == coords[-1])
+        if closed:
+            coords = coords[:-2]
+        self._polyline(parts, coords[0::2], coords[1::2])
+        if closed:
+            parts.append("h\n")
+        parts.append("S\n")
+        self.writeAll(parts)
+
+    def _polyline(self, parts, xList, yList):
+        """Append the path operators of a polyline."""
+        numbers = self.formatter.numbers
+        xList = numbers(xList)
+        yList = numbers(yList)
+        parts.append("{} {} m\n".format(xList[0], yList[0]))
+        parts.extend(map("{} {} l\n".format, xList[1:], yList[1:]))
+
+    def curve(self, curve):
+        """Write a path of Bezier curves."""
+        number = self.formatter.number
+        parts = [self.style(curve.color, curve.width),
+                 "{} {} m\n".format(number(curve.start[0]),
+                                    number(curve.start[1]))]
+        parts.extend("{} {} {} {} {} {} c\n".format(*map(number, segment))
+                     for segment in curve.segments)
+        parts.append("S\n")
+        self.writeAll(parts)
+
+    def textbox(self, textbox):
+        """
+        Write a text box in Helvetica. Characters that are not in the
+        WinAnsi encoding are replaced by '?'.
+        """
+        number = self.formatter.number
+        size = textbox.size
+        self.fontUsed = True
+        # The text matrix flips the y axis back, so the text is upright
+        parts = [self.style(textbox.color, fill=True),
+                 "BT\n/F1 {} Tf\n{} TL\n1 0 0 -1 {} {} Tm\n".format(
+                     number(size), number(size * TEXT_LEADING),
+                     number(textbox.x),
+                     number(textbox.y + size * TEXT_ASCENT))]
+        for line in textbox.text.split("\n"):
+            parts.append("({}) Tj\nT*\n".format(_pdfString(line)))
+        parts.append("ET\n")
+        self.writeAll(parts)
+
+    def _rotation(self, angle, x, y):
+        """
+        Return the operators that save the graphics state and rotate the
+        coordinate system by 'angle' degrees around (x, y), like TikZ's
+        "rotate around". Nothing for angles that are (almost) zero.
+        """
+        if not round(angle, 2):
+            return ""
+        c = cos(radians(angle))
+        s = sin(radians(angle))
+        return "q\n{:.5f} {:.5f} {:.5f} {:.5f} {:.3f} {:.3f} cm\n".format(
+                   c, s, -s, c, x - x * c + y * s, y - x * s - y * c)
+
+    def _ellipsePath(self, parts, x, y, radiusX, radiusY):
+        """Append an ellipse as four Bezier curves."""
+        number = self.formatter.number
+        kx = KAPPA * radiusX
+        ky = KAPPA * radiusY
+        parts.append("{} {} m\n".format(number(x + radiusX), number(y)))
+        for x1, y1, x2, y2, x3, y3 in (
+                (x + radiusX, y + ky, x + kx, y + radiusY, x, y + radiusY),
+                (x - kx, y + radiusY, x - radiusX, y + ky, x - radiusX, y),
+                (x - radiusX, y - ky, x - kx, y - radiusY, x, y - radiusY),
+                (x + kx, y - radiusY, x + radiusX, y - ky, x + radiusX, y)):
+            parts.append("{} {} {} {} {} {} c\n".format(
+                number(x1), number(y1), number(x2), number(y2), number(x3),
+                number(y3)))
+        parts.append("h\n")
+
+    def circle(self, circle):
+        """Write a circle."""
+        parts = [self.style(circle.color, circle.width)]
+        self._ellipsePath(parts, circle.x, circle.y, circle.radius,
+                          circle.radius)
+        parts.append("S\n")
+        self.writeAll(parts)
+
+    def ellipse(self, ell):
+        """Write a (possibly rotated) ellipse."""
+        x = (ell.left + ell.right) / 2
+        y = (ell.top + ell.bottom) / 2
+        rotation = self._rotation(ell.angle, x, y)
+        parts = [self.style(ell.color, ell.width), rotation]
+        self._ellipsePath(parts, x, y, abs(ell.left - ell.right) / 2,
+                          abs(ell.top - ell.bottom) / 2)
+        parts.append("S\n")
+        if rotation:
+            parts.append("Q\n")
+        self.writeAll(parts)
+
+    def rectangle(self, rect):
+        """Write a (possibly rotated) rectangle."""
+        number = self.formatter.number
+        rotation = self._rotation(rect.angle, (rect.x1 + rect.x2) / 2,
+                                  (rect.y1 + rect.y2) / 2)
+        parts = [self.style(rect.color, rect.width), rotation,
+                 "{} {} {} {} re\nS\n".format(number(rect.x1), number(rect.y1),
+                                              number(rect.x2 - rect.x1),
+                                              number(rect.y2 - rect.y1))]
+        if rotation:
+            parts.append("Q\n")
+        self.writeAll(parts)
+
+    def polygon(self, polygon):
+        """Write a closed polygon."""
+        parts = [self.style(polygon.color, polygon.width)]
+        self._polyline(parts, [x for x, y in polygon.points],
+                       [y for x, y in polygon.points])
+        parts.append("h\nS\n")
+        self.writeAll(parts)
+
+def _pdfString(text):
+    """
+    Return 'text' as the content of a PDF string in WinAnsi encoding, with
+    only ASCII characters.
+    """
+    parts = []
+    for char in text:
+        if char in "\\()":
+            parts.append("\\" + char)
+        elif " " <= char <= "~":
+            parts.append(char)
+        else:
+            try:
+                parts.append("\\{:03o}".format(char.encode("cp1252")[0]))
+            except UnicodeEncodeError:
+                parts.append("?")
+    return "".join(parts)
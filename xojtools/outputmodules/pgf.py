@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from math import cos, sin, radians
+
+from . import TikzLineWidth
+from .tikzlinewidth import WIDTH_DIGITS
+from ..outline import strokeOutline
+from ..formatter import NumberFormatter
+
+"""
+Output with commands of PGF's basic layer, which TeX processes much faster
+than TikZ paths.
+"""
+
+# Decimal places of all numbers, unless 'digits' is given
+PGF_DIGITS = 3
+
+class Pgf(TikzLineWidth):
+    """
+    An output module that writes a pgfpicture with the same content as
+    TikzLineWidth, using the commands of PGF's basic layer.
+    """
+    @staticmethod
+    def name():
+        """
+        Return the name of this output module, this can be presented to the user.
+        """
+        return "PGF basic layer"
+
+    def __init__(self, document, output=sys.stdout, **kwargs):
+        """
+        Constructor
+        
+        Keyword arguments:
+        document -- List or iterator of 'Page' objects (default [])
+        output -- Where to write the PGF code to (default sys.stdout)
+        
+        All other keyword arguments are passed on to TikzLineWidth. Without
+        'digits', all numbers are rounded to PGF_DIGITS decimal places, as
+        TeX can't read numbers in exponential notation. PGF points are
+        always absolute, so 'relative' only rounds the numbers. Items are
+        not grouped, as every setting is only written when it changes
+        anyway.
+        """
+        kwargs["group"] = False
+        super(Pgf, self).__init__(document, output=output, **kwargs)
+        if self.formatter is None:
+            self.formatter = NumberFormatter(PGF_DIGITS)
+            self.widthFormatter = NumberFormatter(max(PGF_DIGITS,
+                                                      WIDTH_DIGITS))
+        self.resetGraphicsState()
+
+    def header(self):
+        """
+        Define short macros for points and path segments, open a pgfpicture
+        environment and define the colors, see defineColors().
+        """
+        self.write(\
+"""\\def\\xojm#1#2{\\pgfpathmoveto{\\pgfqpoint{#1pt}{#2pt}}}
+\\def\\xojl#1#2{\\pgfpathlineto{\\pgfqpoint{#1pt}{#2pt}}}
+\\def\\xojc#1#2#3#4#5#6{\\pgfpathcurveto{\\pgfqpoint{#1pt}{#2pt}}%
+  {\\pgfqpoint{#3pt}{#4pt}}{\\pgfqpoint{#5pt}{#6pt}}}
+\\def\\xojs#1#2#3#4#5{\\pgfsetlinewidth{#1pt}\\xojm{#2}{#3}\\xojl{#4}{#5}%
+  \\pgfusepath{stroke}}
+\\begin{pgfpicture}
+\\pgfsetroundcap
+\\pgfsetroundjoin
+""")
+        self.defineColors()
+
+    def footer(self):
+        """Close the pgfpicture environment."""
+        self.write("\\end{pgfpicture}\n")
+
+    def page(self, page):
+        """
+        Write a page in a pgfscope, so it does not depend on the graphics
+        state left behind by the page before.
+        """
+        self.resetGraphicsState()
+        self.write("\\begin{pgfscope}\n")
+        super(Pgf, self).page(page)
+        self.write("\\end{pgfscope}\n")
+
+    def resetGraphicsState(self):
+        """Forget the graphics state, at the beginning of a scope."""
+        self.strokeColor = None
+        self.fillColor = None
+        self.lineWidth = None
+        self.strokeOpacity = "1"
+        self.fillOpacity = "1"
+
+    def style(self, color, width=None, fill=False):
+        """
+        Return the commands that set the stroke color (or fill color) to
+        'color', the line width to 'width' and the opacity, if they differ
+        from the current graphics state.
+        """
+        texColor = self.useColor(color)
+        opacity = "1"
+        if color[3] != 1.0:
+            opacity = "{:.3}".format(color[3])
+        parts = []
+        if fill:
+            if texColor != self.fillColor:
+                self.fillColor = texColor
+                parts.append("\\pgfsetfillcolor{" + texColor + "}")
+            if opacity != self.fillOpacity:
+                self.fillOpacity = opacity
+                parts.append("\\pgfsetfillopacity{" + opacity + "}")
+        else:
+            if texColor != self.strokeColor:
+                self.strokeColor = texColor
+                parts.append("\\pgfsetstrokecolor{" + texColor + "}")
+            if opacity != self.strokeOpacity:
+                self.strokeOpacity = opacity
+                parts.append("\\pgfsetstrokeopacity{" + opacity + "}")
+        if width is not None:
+            width = self.width(width)
+            if width != self.lineWidth:
+                self.lineWidth = width
+                parts.append("\\pgfsetlinewidth{" + width + "pt}")
+        if parts:
+            parts.append("\n")
+        return "".join(parts)
+
+    def points(self, xList, yList):
+        """
+        Return the rounded coordinates of points, with the y axis pointing
+        up like in PGF.
+        """
+        numbers = self.formatter.numbers
+        return numbers(xList), numbers([-y for y in yList])
+
+    def _polyline(self, parts, xList, yList, closed=False):
+        """
+        Append the path commands of a polyline. The last point of a closed
+        polyline is replaced by \\pgfpathclose, if it equals the first one
+        after rounding.
+        """
+        xList, yList = self.points(xList, yList)
+        closed = closed and xList[0] == xList[-1] and yList[0] == yList[-1]
+        if closed:
+            xList.pop()
+            yList.pop()
+        parts.append("\\xojm{{{}}}{{{}}}".format(xList[0], yList[0]))
+        parts.extend(map("\\xojl{{{}}}{{{}}}".format, xList[1:], yList[1:]))
+        if closed:
+            parts.append("\\pgfpathclose")
+
+    def stroke(self, stroke):
+        """
+        Write a stroke. Strokes with variable width are drawn segment by
+        segment, with round caps, or filled with their outline in outline
+        mode.
+        """
+        if stroke.widths is None:
+            coords = stroke.coords
+            parts = [self.style(stroke.color, stroke.width)]
+            # A stroke that ends where it began is closed, like "-- cycle"
+            self._polyline(parts, coords[0::2], coords[1::2],
+                           closed=len(coords) > 4)
+            parts.append("\\pgfusepath{stroke}\n")
+            self.writeAll(parts)
+        elif self.outline:
+            self.strokeOutline(stroke)
+        else:
+            coords = stroke.coords
+            xList, yList = self.points(coords[0::2], coords[1::2])
+            parts = [self.style(stroke.color)]
+            parts.extend(map("\\xojs{{{}}}{{{}}}{{{}}}{{{}}}{{{}}}\n".format,
+                             self.widthFormatter.numbers(stroke.widths),
+                             xList, yList, xList[1:], yList[1:]))
+            self.lineWidth = None
+            self.writeAll(parts)
+
+    def strokeOutline(self, stroke):
+        """
+        Fill the outline of a stroke, see outline.strokeOutline().
+        """
+        points = strokeOutline(stroke)
+        parts = [self.style(stroke.color, fill=True)]
+        self._polyline(parts, [x for x, y in points], [y for x, y in points])
+        parts.append("\\pgfpathclose\\pgfusepath{fill}\n")
+        self.writeAll(parts)
+
+    def curve(self, curve):
+        """Write a path of Bezier curves."""
+        number = self.formatter.number
+        parts = [self.style(curve.color, curve.width),
+                 "\\xojm{{{}}}{{{}}}".format(number(curve.start[0]),
+                                             number(-curve.start[1]))]
+        parts.extend("\\xojc{{{}}}{{{}}}{{{}}}{{{}}}{{{}}}{{{}}}".format(
+                         number(x1), number(-y1), number(x2), number(-y2),
+                         number(x), number(-y))
+                     for x1, y1, x2, y2, x, y in curve.segments)
+        parts.append("\\pgfusepath{stroke}\n")
+        self.writeAll(parts)
+
+    def textbox(self, textbox):
+        """
+        Write a text box, with its top left corner at the position of the
+        text box, like the north west anchor of the TikZ node.
+        """
+        number = self.formatter.number
+        texColor = self.useColor(textbox.color)
+        text = textbox.text
+        if "\n" in text:
+            text = ("\\begin{tabular}{@{}l@{}}" + text.replace('\n', "\\\\") +
+                    "\\end{tabular}")
+        if texColor != "black":
+            text = "\\color{" + texColor + "}" + text
+        # Text is filled, this only sets the opacity
+        parts = [self.style(textbox.color, fill=True)]
+        parts.append("\\pgftext[left,top,at=\\pgfqpoint{{{}pt}}{{{}pt}}]"
+                     "{{{}}}\n".format(number(textbox.x),
+                                       number(-(textbox.y + 2.5)), text))
+        self.writeAll(parts)
+
+    def circle(self, circle):
+        """Write a circle."""
+        number = self.formatter.number
+        self.writeAll((self.style(circle.color, circle.width),
+                       "\\pgfpathcircle{{\\pgfqpoint{{{}pt}}{{{}pt}}}}{{{}pt}}"
+                       "\\pgfusepath{{stroke}}\n".format(
+                           number(circle.x), number(-circle.y),
+                           number(circle.radius))))
+
+    def ellipse(self, ell):
+        """
+        Write an ellipse. It is rotated like with TikZ's "rotate around",
+        by turning its axes.
+        """
+        number = self.formatter.number
+        x = (ell.left + ell.right) / 2
+        y = (ell.top + ell.bottom) / 2
+        radiusX = abs(ell.left - ell.right) / 2
+        radiusY = abs(ell.top - ell.bottom) / 2
+        angle = radians(round(ell.angle, 2))
+        c = cos(angle)
+        s = sin(angle)
+        self.writeAll((self.style(ell.color, ell.width),
+                       "\\pgfpathellipse{{\\pgfqpoint{{{}pt}}{{{}pt}}}}"
+                       "{{\\pgfqpoint{{{}pt}}{{{}pt}}}}"
+                       "{{\\pgfqpoint{{{}pt}}{{{}pt}}}}"
+                       "\\pgfusepath{{stroke}}\n".format(
+                           number(x), number(-y), number(radiusX * c),
+                           number(-radiusX * s), number(-radiusY * s),
+                           number(-radiusY * c))))
+
+    def rectangle(self, rect):
+        """
+        Write a rectangle. Rotated rectangles are written as a closed path
+        through their rotated corners.
+        """
+        parts = [self.style(rect.color, rect.width)]
+        if round(rect.angle, 2):
+            angle = radians(round(rect.angle, 2))
+            c = cos(angle)
+            s = sin(angle)
+            x = (rect.x1 + rect.x2) / 2
+            y = (rect.y1 + rect.y2) / 2
+            corners = ((rect.x1, rect.y1), (rect.x2, rect.y1),
+                       (rect.x2, rect.y2), (rect.x1, rect.y2))
+            self._polyline(parts,
+                           [x + (cx - x) * c - (cy - y) * s
+                            for cx, cy in corners],
+                           [y + (cx - x) * s + (cy - y) * c
+                            for cx, cy in corners])
+            parts.append("\\pgfpathclose")
+        else:
+            number = self.formatter.number
+            parts.append("\\pgfpathrectanglecorners"
+                         "{{\\pgfqpoint{{{}pt}}{{{}pt}}}}"
+                         "{{\\pgfqpoint{{{}pt}}{{{}pt}}}}".format(
+                             number(rect.x1), number(-rect.y1),
+                             number(rect.x2), number(-rect.y2)))
+        parts.append("\\pgfusepath{stroke}\n")
+        self.writeAll(parts)
+
+    def polygon(self, polygon):
+        """Write a closed polygon."""
+        parts = [self.style(polygon.color, polygon.width)]
+        self._polyline(parts, [x for x, y in polygon.points],
+                       [y for x, y in polygon.points])
+        parts.append("\\pgfpathclose\\pgfusepath{stroke}\n")
+        self.writeAll(parts)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from xml.sax.saxutils import escape
+
+from .. import OutputModule
+from ..outline import strokeOutline
+from ..formatter import NumberFormatter
+from .pdf import TEXT_ASCENT, TEXT_LEADING
+
+"""
+SVG output: the pages of a document are written one below the other, every
+page as soon as it has been converted.
+"""
+
+# Space between two pages in pt
+PAGE_GAP = 10
+
+class Svg(OutputModule):
+    """An output module that writes an SVG image."""
+    @staticmethod
+    def name():
+        """
+        Return the name of this output module, this can be presented to the user.
+        """
+        return "SVG"
+
+    def __init__(self, document, output=sys.stdout, **kwargs):
+        """
+        Constructor
+        
+        Keyword arguments:
+        document -- List or iterator of 'Page' objects (default [])
+        output -- Where to write the SVG image to (default sys.stdout)
+        
+        All other keyword arguments are passed on to OutputModule. The size
+        of the image is written in the header, it is known in advance for a
+        list of pages and collected while writing the body in single pass
+        mode. Otherwise it is left out.
+        """
+        super(Svg, self).__init__(document, output=output, **kwargs)
+        self.formatter = NumberFormatter(2)
+        # Sizes of the pages written so far
+        self.pageSizes = []
+        # True while a page is rendered to a string, see renderPage()
+        self.rendering = False
+        # Size of the page that has been rendered last, see pageState()
+        self.pageInfo = None
+
+    @staticmethod
+    def documentSize(sizes):
+        """Return the size of the image for pages of the given sizes."""
+        sizes = list(sizes)
+        if not sizes:
+            return 0, 0
+        return (max(width for width, height in sizes),
+                sum(height for width, height in sizes) +
+                PAGE_GAP * (len(sizes) - 1))
+
+    def header(self):
+        """
+        Write the XML declaration and open the svg element. Unless they are
+        set on an element, shapes are not filled and lines have round caps
+        and joins.
+        """
+        if self.singlePass:
+            sizes = self.pageSizes
+        elif isinstance(self.document, list):
+            sizes = [(page.width, page.height) for page in self.document]
+        else:
+            sizes = None
+        size = ""
+        if sizes is not None:
+            width, height = self.documentSize(sizes)
+            number = self.formatter.number
+            size = (' width="{0}pt" height="{1}pt" viewBox="0 0 {0} {1}"'
+                    .format(number(width), number(height)))
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<svg xmlns="http://www.w3.org/2000/svg" version="1.1"{} '
+                   'style="background:#ccc" fill="none" '
+                   'stroke-linecap="round" stroke-linejoin="round">\n'
+                   .format(size))
+
+    def page(self, page):
+        """
+        Write a page as a group with a white background, moved below the
+        pages before it.
+        
+        The content of the group does not depend on the position of the
+        page, so it can be rendered by another process or taken from the
+        cache. The group is opened by beginPage().
+        """
+        if self.rendering:
+            self.pageInfo = (page.width, page.height)
+        else:
+            self.beginPage(page.width, page.height)
+        number = self.formatter.number
+        self.write('<rect width="{}" height="{}" fill="white"/>\n'.format(
+                       number(page.width), number(page.height)))
+        super(Svg, self).page(page)
+        self.write("</g>\n")
+
+    def beginPage(self, width, height):
+        """Open the group of the next page, with the given size."""
+        offset = self.documentSize(self.pageSizes)[1]
+        if self.pageSizes:
+            offset += PAGE_GAP
+            self.write('<g transform="translate(0 {})">\n'.format(
+                           self.formatter.number(offset)))
+        else:
+            self.write("<g>\n")
+        self.pageSizes.append((width, height))
+
+    def renderPage(self, page):
+        """Render a page to a string, see OutputModule.renderPage()."""
+        self.rendering = True
+        try:
+            return super(Svg, self).renderPage(page)
+        finally:
+            self.rendering = False
+
+    def pageState(self):
+        """Return and reset the size of the page that has been rendered last."""
+        info = self.pageInfo
+        self.pageInfo = None
+        return info
+
+    def mergePageState(self, state):
+        """Open the group of a page that has been rendered, it is written next."""
+        if state is not None:
+            self.beginPage(*state)
+
+    def footer(self):
+        """Close the svg element."""
+        self.write("</svg>\n")
+
+    @staticmethod
+    def color(color):
+        """Return the "#rrggbb" code of a color tuple."""
+        return "#{:02x}{:02x}{:02x}".format(color[0], color[1], color[2])
+
+    def paint(self, color, width=None):
+        """
+        Return the attributes that stroke an element with 'color' and
+        'width', or fill it if 'width' is None.
+        """
+        if width is None:
+            attributes = ' fill="{}"'.format(self.color(color))
+        else:
+            attributes = ' stroke="{}" stroke-width="{}"'.format(
+                             self.color(color), self.formatter.number(width))
+        if color[3] != 1.0:
+            attributes += ' opacity="{:.3}"'.format(color[3])
+        return attributes
+
+    def rotation(self, angle, x, y):
+        """Return the transform attribute that rotates around (x, y)."""
+        if not round(angle, 2):
+            return ""
+        number = self.formatter.number
+        return ' transform="rotate({} {} {})"'.format(round(angle, 2),
+                                                      number(x), number(y))
+
+    def pathData(self, xList, yList, closed=False):
+        """
+        Return compact path data for a polyline: the first point is absolute
+        and all others are relative to the point before, e.g.
+          M10.5 20l1.25-.5 2 0z
+        Relative coordinates are computed from the rounded absolute ones, so
+        the rounding errors do not add up.
+        """
+        formatter = self.formatter
+        scale = formatter.scale
+        xInts = [round(x * scale) for x in xList]
+        yInts = [round(y * scale) for y in yList]
+        values = [xInts[0] / scale, yInts[0] / scale]
+        if closed and xInts[-1] == xInts[0] and yInts[-1] == yInts[0]:
+            # The closing segment is implied by "z"
+            xInts.pop()
+            yInts.pop()
+        for x, previousX, y, previousY in zip(xInts[1:], xInts,
+                                              yInts[1:], yInts):
+            values.append((x - previousX) / scale)
+            values.append((y - previousY) / scale)
+        numbers = formatter.numbers(values)
+        data = "M" + _join(numbers[:2])
+        if len(numbers) > 2:
+            data += "l" + _join(numbers[2:])
+        if closed:
+            data += "z"
+        return data
+
+    def stroke(self, stroke):
+        """
+        Write a stroke as a path. Strokes with variable width are filled with
+        their outline, see outline.strokeOutline().
+        """
+        if stroke.widths is not None:
+            points = strokeOutline(stroke)
+            data = self.pathData([x for x, y in points],
+                                 [y for x, y in points], closed=True)
+            self.write('<path d="{}"{}/>\n'.format(
+                           data, self.paint(stroke.color)))
+            return
+        
+        coords = stroke.coords
+        closed = (len(coords) > 4 and coords[0] == coords[-2] and
+                  coords[1] == coords[-1])
+        data = self.pathData(coords[0::2], coords[1::2], closed)
+        self.write('<path d="{}"{}/>\n'.format(
+                       data, self.paint(stroke.color, stroke.width)))
+
+    def curve(self, curve):
+        """Write a path of Bezier curves."""
+        numbers = self.formatter.numbers
+        parts = ["M", _join(numbers(curve.start)), "C"]
+        parts.append(_join(numbers(value for segment in curve.segments
+                                   for value in segment)))
+        self.write('<path d="{}"{}/>\n'.format(
+                       "".join(parts), self.paint(curve.color, curve.width)))
+
+    def textbox(self, textbox):
+        """
+        Write a text box, every line in its own tspan element. Xournal's
+        font "Sans" becomes the generic font family sans-serif.
+        """
+        number = self.formatter.number
+        x = number(textbox.x)
+        parts = ['<text x="{}" y="{}" font-family="sans-serif" '
+                 'font-size="{}"{}>'.format(
+                     x, number(textbox.y + textbox.size * TEXT_ASCENT),
+                     number(textbox.size), self.paint(textbox.color))]
+        for index, line in enumerate(textbox.text.split("\n")):
+            if index == 0:
+                parts.append("<tspan>")
+            else:
+                parts.append('<tspan x="{}" dy="{}em">'.format(x,
+                                                                TEXT_LEADING))
+            parts.append(escape(line))
+            parts.append("</tspan>")
+        parts.append("</text>\n")
+        self.writeAll(parts)
+
+    def circle(self, circle):
+        """Write a circle."""
+        number = self.formatter.number
+        self.write('<circle cx="{}" cy="{}" r="{}"{}/>\n'.format(
+                       number(circle.x), number(circle.y),
+                       number(circle.radius),
+                       self.paint(circle.color, circle.width)))
+
+    def ellipse(self, ell):
+        """Write a (possibly rotated) ellipse."""
+        number = self.formatter.number
+        x = (ell.left + ell.right) / 2
+        y = (ell.top + ell.bottom) / 2
+        self.write('<ellipse cx="{}" cy="{}" rx="{}" ry="{}"{}{}/>\n'.format(
+                       number(x), number(y),
+                       number(abs(ell.left - ell.right) / 2),
+                       number(abs(ell.top - ell.bottom) / 2),
+                       self.paint(ell.color, ell.width),
+                       self.rotation(ell.angle, x, y)))
+
+    def rectangle(self, rect):
+        """Write a (possibly rotated) rectangle."""
+        number = self.formatter.number
+        self.write('<rect x="{}" y="{}" width="{}" height="{}"{}{}/>\n'.format(
+                       number(min(rect.x1, rect.x2)),
+                       number(min(rect.y1, rect.y2)),
+                       number(abs(rect.x2 - rect.x1)),
+                       number(abs(rect.y2 - rect.y1)),
+                       self.paint(rect.color, rect.width),
+                       self.rotation(rect.angle, (rect.x1 + rect.x2) / 2,
+                                     (rect.y1 + rect.y2) / 2)))
+
+    def polygon(self, polygon):
+        """Write a closed polygon."""
+        numbers = self.formatter.numbers
+        points = " ".join(
+            map("{},{}".format, numbers(x for x, y in polygon.points),
+                numbers(y for x, y in polygon.points)))
+        self.write('<polygon points="{}"{}/>\n'.format(
+                       points, self.paint(polygon.color, polygon.width)))
+
+def _join(numbers):
+    """
+    Join numbers for path data as short as possible: without leading zeros
+    and without a space in front of negative numbers.
+    """
+    parts = []
+    for text in numbers:
+        if text.startswith("0."):
+            text = text[1:]
+        elif text.startswith("-0."):
+            text = "-" + text[2:]
+        if parts and text[0] != "-":
+            parts.append(" ")
+        parts.append(text)
+    return "".join(parts)
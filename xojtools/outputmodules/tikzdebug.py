@@ -35,11 +35,7 @@ class TikzDebug(TikzLineWidth):
         """
         super(TikzDebug, self).stroke(stroke)
         
-        if len(stroke.coordList[0]) == 3:
-            for x, y, w in stroke.coordList:
-                self.write("  \\draw[red, line width=1pt] ({}, {}) -- cycle;\n"
-                           .format(x, y))
-        elif len(stroke.coordList[0]) == 2:
-            for x, y in stroke.coordList:
-                self.write("  \\draw[red, line width=1pt] ({}, {}) -- cycle;\n"
+        coords = stroke.coords
+        for x, y in zip(coords[0::2], coords[1::2]):
+            self.writePath("red, line width=1pt", " ({}, {}) -- cycle"
                            .format(x, y))
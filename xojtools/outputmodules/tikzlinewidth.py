@@ -17,7 +17,20 @@
 # You should have received a copy of the GNU General Public License
 # along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
+from collections import Counter
+
 from .. import OutputModule, COLOR_PREFIX
+from ..outline import strokeOutline
+from ..formatter import NumberFormatter
+
+# In grouping mode, a shared style is defined for a combination of color, line
+# width and opacity, if it is used by at least this many paths or groups of a
+# layer.
+STYLE_MIN_USES = 3
+# In compact mode, line widths are rounded to at least this many decimal
+# places, so thin lines do not vanish with a small 'digits'
+WIDTH_DIGITS = 3
 
 class TikzLineWidth(OutputModule):
     """An output module that supports lines with variable width."""
@@ -28,13 +41,61 @@ class TikzLineWidth(OutputModule):
         """
         return "variable line width"
 
+    def __init__(self, document, output=sys.stdout, outline=False,
+                 digits=None, relative=False, group=False, **kwargs):
+        """
+        Constructor
+        
+        Keyword arguments:
+        document -- List or iterator of 'Page' objects (default [])
+        output -- Where to write the TikZ code to (default sys.stdout)
+        outline -- Fill the outline of strokes with variable width, instead
+                   of drawing every segment with its own width
+                   (default False)
+        digits -- Compact output: round all coordinates to this many
+                  decimal places (line widths to at least WIDTH_DIGITS),
+                  without trailing zeros and superfluous spaces. None keeps
+                  the numbers as they are. (default None)
+        relative -- Compact output with relative coordinates "++(dx,dy)"
+                    for the points of strokes and curves, rounded to
+                    'digits' (or 2) decimal places (default False)
+        group -- Write consecutive items of a layer with the same color, line
+                 width and opacity as one group and define shared styles for
+                 frequent combinations, see writeGroups(). The output is
+                 always written in a single pass then, so the styles are
+                 defined in the header. (default False)
+        
+        All other keyword arguments (e.g. palette, singlePass) are passed on
+        to OutputModule. In single pass mode, the colors and styles are
+        collected while writing the body and defined in the header afterwards.
+        """
+        super(TikzLineWidth, self).__init__(document, output=output, **kwargs)
+        if group:
+            self.singlePass = True
+        self.outline = outline
+        self.relative = relative
+        self.group = group
+        if digits is None and relative:
+            digits = 2
+        self.formatter = None
+        self.widthFormatter = None
+        if digits is not None:
+            self.formatter = NumberFormatter(digits)
+            self.widthFormatter = NumberFormatter(max(digits, WIDTH_DIGITS))
+        self.definedColors = set()
+        # Colors used by the items written so far, in order of appearance
+        self.usedColors = {}
+        self.definedStyles = set()
+        # Shared styles used so far, name -> options
+        self.usedStyles = {}
+        # Paths of the current layer in grouping mode, see writePath()
+        self.pendingPaths = None
+
     def header(self):
         """
         Open a tikzpicture environment and define a style for variable width
-        lines.
+        lines and the colors, see defineColors().
         """
-        colorList = []
-        newline = ""
         self.write(\
 """\\tikzset{
   vlw/.style={
@@ -48,22 +109,272 @@ class TikzLineWidth(OutputModule):
   t/.initial=0.4pt,
 }
 \\begin{tikzpicture}[yscale=-1, y=1pt, x=1pt, every path/.style={line cap=round, line join=round}]\n""")
-        for page in self.document:
-            for layer in page.layerList:
-                for item in layer.itemList:
-                    texColor = self.toTexColor(item.color)
-                    if (texColor not in colorList and
-                           texColor.startswith(COLOR_PREFIX)):
-                        r = item.color[0]/255.0
-                        g = item.color[1]/255.0
-                        b = item.color[2]/255.0
-                        texColor = self.toTexColor(item.color)
-                        self.write("  \\definecolor{{{}}}{{rgb}}{{{:.4},{:.4},"
-                                   "{:.4}}}\n".format(texColor, r, g, b))
-                        colorList.append(self.toTexColor(item.color))
-                        newline = '\n'
+        self.defineColors()
+
+    def defineColors(self):
+        """
+        Define the colors at the beginning of the picture.
+        
+        In single pass mode, the body has already been written and the colors
+        and styles used by it are defined here. Otherwise all colors of the
+        palette are defined. Without a palette, the colors of a list of pages
+        are collected from its items. The colors of streamed documents (e.g.
+        from xournalparser.iterparse()) are not known in advance, they are
+        defined on first use instead.
+        """
+        newline = ""
+        styles = ()
+        if self.singlePass:
+            colors = self.usedColors.values()
+            styles = self.usedStyles.items()
+        elif self.palette is not None:
+            colors = self.palette
+        elif isinstance(self.document, list):
+            colors = (item.color for page in self.document
+                      for layer in page.layerList for item in layer.itemList)
+        else:
+            return
+        for color in colors:
+            if self.defineColor(color):
+                newline = '\n'
+        for name, options in styles:
+            if self.defineStyle(name, options):
+                newline = '\n'
         self.write(newline)
 
+    def defineColor(self, color):
+        """
+        Write a \\definecolor command for 'color', unless it is predefined or
+        has already been defined. Return True if something was written.
+        """
+        texColor = self.toTexColor(color)
+        if (texColor in self.definedColors or
+                not texColor.startswith(COLOR_PREFIX)):
+            return False
+        r = color[0]/255.0
+        g = color[1]/255.0
+        b = color[2]/255.0
+        self.write("  \\definecolor{{{}}}{{rgb}}{{{:.4},{:.4},"
+                   "{:.4}}}\n".format(texColor, r, g, b))
+        self.definedColors.add(texColor)
+        return True
+
+    def useColor(self, color):
+        """
+        Register 'color' as used by the current item and return its TeX name.
+        
+        The color is defined right away, unless all definitions are written
+        to the header.
+        """
+        texColor = self.toTexColor(color)
+        if texColor not in self.usedColors:
+            self.usedColors[texColor] = color
+            if not self.singlePass:
+                self.defineColor(color)
+        return texColor
+
+
+    def defineStyle(self, name, options):
+        """
+        Write a \\tikzset command that defines the style 'name', unless it
+        has already been defined. Return True if something was written.
+        """
+        if name in self.definedStyles:
+            return False
+        self.write("  \\tikzset{{{}/.style={{{}}}}}\n".format(name, options))
+        self.definedStyles.add(name)
+        return True
+
+    def useStyle(self, key):
+        """
+        Register the shared style for the group key 'key' (see writePath())
+        as used and return its name.
+        
+        Grouping mode always writes the output in a single pass, so the style
+        is defined in the header, see defineColors().
+        """
+        name = self.styleName(key)
+        if name not in self.usedStyles:
+            self.usedStyles[name] = self.groupOptions(key)
+        return name
+
+    @staticmethod
+    def styleName(key):
+        """
+        Return the name of the shared style for the group key 'key', e.g.
+        "xoj-black-1.41" or "xoj-red-1.41-0.502". The name only depends on
+        the key, so pages can be rendered and cached independently.
+        """
+        texColor, width, opacity = key
+        parts = ["xoj", texColor]
+        if width is not None:
+            parts.append(width)
+        if opacity != 1.0:
+            parts.append("{:.3}".format(opacity))
+        return "-".join(parts)
+
+    @staticmethod
+    def groupOptions(key):
+        """Return the options shared by all paths with the group key 'key'."""
+        texColor, width, opacity = key
+        options = texColor
+        if width is not None:
+            options += ",line width={}pt".format(width)
+        if opacity != 1.0:
+            options += ",opacity={:.3}".format(opacity)
+        return options
+
+    def cacheOptions(self):
+        """
+        Add the outline, number format and grouping settings to the cache
+        options.
+        """
+        digits = None
+        if self.formatter is not None:
+            digits = self.formatter.digits
+        return "{} outline={} digits={} relative={} group={}".format(
+                   super(TikzLineWidth, self).cacheOptions(), self.outline,
+                   digits, self.relative, self.group)
+
+    def number(self, value, places=None):
+        """
+        Format a number for the output: in compact mode with the formatter,
+        otherwise rounded to 'places' decimal places, if given.
+        """
+        if self.formatter is not None:
+            return self.formatter.number(value)
+        if places is not None:
+            value = round(value, places)
+        return str(value)
+
+    def width(self, value):
+        """
+        Format a line width for the output: in compact mode with at least
+        WIDTH_DIGITS decimal places, otherwise as it is.
+        """
+        if self.widthFormatter is not None:
+            return self.widthFormatter.number(value)
+        return str(value)
+
+    def pageState(self):
+        """Return and reset the colors and styles used so far."""
+        state = (list(self.usedColors.values()),
+                 list(self.usedStyles.items()))
+        self.usedColors = {}
+        self.usedStyles = {}
+        return state
+
+    def mergePageState(self, state):
+        """
+        Register the colors and styles used by a page that was rendered
+        elsewhere.
+        """
+        colors, styles = state
+        for color in colors:
+            self.useColor(color)
+        for name, options in styles:
+            self.usedStyles.setdefault(name, options)
+
+    def writePath(self, options, path, key=None, extra=None, command="draw"):
+        """
+        Write a path command to the output file:
+          \command[options,extra] path;
+        
+        In grouping mode, the paths of a layer are collected and written by
+        writeGroups() at the end of the layer instead.
+        
+        Keyword arguments:
+        options -- Options of the path, when written on its own (mandatory)
+        path -- The path itself, including a leading space if needed
+                (mandatory)
+        key -- Tuple (texColor, width, opacity) of the style of the path, see
+               groupOptions(). Paths with the same key and command can be
+               grouped. None if the path must not be grouped. (default None)
+        extra -- Further option only used by this path (default None)
+        command -- The TikZ command, e.g. "draw", "fill" or "node"
+                   (default "draw")
+        """
+        if self.pendingPaths is not None:
+            self.pendingPaths.append((command, key, options, extra, path))
+            return
+        if extra is not None:
+            options += "," + extra
+        self.writeAll(("  \\", command, "[", options, "]", path, ";\n"))
+
+    def layer(self, layer):
+        """
+        Write a layer. In grouping mode, its paths are collected first and
+        then written in groups, see writeGroups().
+        """
+        if not self.group:
+            super(TikzLineWidth, self).layer(layer)
+            return
+        self.pendingPaths = []
+        try:
+            super(TikzLineWidth, self).layer(layer)
+            paths = self.pendingPaths
+        finally:
+            self.pendingPaths = None
+        self.writeGroups(paths)
+
+    def writeGroups(self, paths):
+        """
+        Write the paths collected by writePath(), with consecutive paths of
+        the same style in one group.
+        
+        A group of opaque paths without extra options becomes a single path
+        command with several subpaths:
+          \draw[color,line width=1pt] (x1,y1) -- (x2,y2) (x3,y3) -- (x4,y4);
+        the others share their options in a scope:
+          \begin{scope}[color,line width=1pt,opacity=0.5]
+            \draw (x1,y1) -- (x2,y2);
+            \draw[rotate around={30:(x,y)}] (x3,y3) rectangle (x4,y4);
+          \end{scope}
+        A style, e.g. "xoj-black-1.41", is defined for every key that is used
+        by at least STYLE_MIN_USES groups or single paths of the layer.
+        """
+        groups = []
+        previous = None
+        for entry in paths:
+            commandAndKey = entry[:2]
+            if entry[1] is not None and commandAndKey == previous:
+                groups[-1].append(entry)
+            else:
+                groups.append([entry])
+            previous = commandAndKey
+        uses = Counter(group[0][:2] for group in groups
+                       if group[0][1] is not None)
+        styles = {}
+        for commandAndKey, count in uses.items():
+            if count >= STYLE_MIN_USES:
+                styles[commandAndKey] = self.useStyle(commandAndKey[1])
+        
+        for group in groups:
+            command, key, options, extra, path = group[0]
+            if (command, key) in styles:
+                options = styles[command, key]
+            elif len(group) > 1:
+                options = self.groupOptions(key)
+            if len(group) == 1:
+                if extra is not None:
+                    options += "," + extra
+                self.writeAll(("  \\", command, "[", options, "]", path,
+                               ";\n"))
+            elif key[2] == 1.0 and all(entry[3] is None for entry in group):
+                parts = ["  \\", command, "[", options, "]"]
+                parts.extend(entry[4] for entry in group)
+                parts.append(";\n")
+                self.writeAll(parts)
+            else:
+                parts = ["  \\begin{scope}[", options, "]\n"]
+                for entry in group:
+                    parts.append("    \\" + command)
+                    if entry[3] is not None:
+                        parts.append("[" + entry[3] + "]")
+                    parts.append(entry[4])
+                    parts.append(";\n")
+                parts.append("  \\end{scope}\n")
+                self.writeAll(parts)
 
     def stroke(self, stroke):
         """
@@ -73,43 +384,139 @@ class TikzLineWidth(OutputModule):
           \draw[vlw=color] (x1,y1) to[t=width1] (x2,y2) to[t=width2] ... ;
         or
           \draw[color,line width=1pt,opacity=0.555] (x1,y1) -- (x2,y2) -- ... ;
+        
+        In compact mode, the numbers are rounded and there are no spaces:
+          \draw[color,line width=1pt](x1,y1)--(x2,y2)--...;
+        and with relative coordinates:
+          \draw[color,line width=1pt](x1,y1)--++(dx2,dy2)--...;
+        
+        In outline mode, strokes with variable width are filled instead:
+          \fill[color] (x1,y1) -- (x2,y2) -- ... -- cycle;
         """
-        texColor = self.toTexColor(stroke.color)
+        if self.outline and stroke.widths is not None:
+            self.strokeOutline(stroke)
+            return
+        texColor = self.useColor(stroke.color)
         opacity = stroke.color[3]
-        firstX = stroke.coordList[0][0]
-        firstY = stroke.coordList[0][1]
-        coordList = stroke.coordList[1:]
-        width = stroke.width
+        coords = stroke.coords
+        widths = stroke.widths
         
-        self.write("  \\draw[")
-        if len(coordList[0]) == 3:
+        if widths is not None:
             # Stroke has variable width:
+            key = None
             if opacity == 1.0:
-                self.write("vlw={}".format(texColor))
+                options = "vlw={}".format(texColor)
             else:
-                self.write("vlw={{{},opacity={:.3}}}".format(texColor,
-                                                              opacity))
-            self.write("] ({}, {})".format(firstX, firstY))
-            for x, y, width in coordList:
-                self.write(" to[t={}pt] ({}, {})".format(width, x, y))
+                options = "vlw={{{},opacity={:.3}}}".format(texColor, opacity)
         else:
             # Stroke has fixed width:
-            self.write("{},line width={}pt".format(texColor, width))
+            width = self.width(stroke.width)
+            key = (texColor, width, opacity)
+            options = "{},line width={}pt".format(texColor, width)
             if opacity != 1.0:
-                self.write(",opacity={:.3}".format(opacity))
-            self.write("] ({}, {})".format(firstX, firstY))
-            
-            for x, y in coordList[:-1]:
-                self.write(" -- ({}, {})".format(x, y))
-            
-            # If a stroke is closed, end it with "-- cycle".
-            lastX = coordList[-1][0]
-            lastY = coordList[-1][1]
-            if firstX == lastX and firstY == lastY:
-                self.write(" -- cycle")
-            else:
-                self.write(" -- ({}, {})".format(lastX, lastY))
-        self.write(";\n")
+                options += ",opacity={:.3}".format(opacity)
+        
+        parts = []
+        if self.formatter is None:
+            self._strokePath(parts, coords, widths)
+        else:
+            self._compactStrokePath(parts, coords, widths)
+        self.writePath(options, "".join(parts), key)
+
+    def _strokePath(self, parts, coords, widths):
+        """Append the path of a stroke with the numbers as they are."""
+        firstX = coords[0]
+        firstY = coords[1]
+        xList = coords[2::2]
+        yList = coords[3::2]
+        parts.append(" ({}, {})".format(firstX, firstY))
+        if widths is not None:
+            parts.extend(map(" to[t={}pt] ({}, {})".format,
+                             widths, xList, yList))
+            return
+        if not xList:
+            # A single point, draw a segment of length zero
+            parts.append(" -- ({}, {})".format(firstX, firstY))
+            return
+        
+        parts.extend(map(" -- ({}, {})".format, xList[:-1], yList[:-1]))
+        
+        # If a stroke is closed, end it with "-- cycle".
+        lastX = xList[-1]
+        lastY = yList[-1]
+        if firstX == lastX and firstY == lastY:
+            parts.append(" -- cycle")
+        else:
+            parts.append(" -- ({}, {})".format(lastX, lastY))
+
+    def _compactStrokePath(self, parts, coords, widths):
+        """Append the path of a stroke in compact mode."""
+        formatter = self.formatter
+        points = formatter.coordinates(coords[0::2], coords[1::2],
+                                       self.relative)
+        parts.append(points[0])
+        if widths is not None:
+            parts.extend(map("to[t={}pt]{}".format,
+                             self.widthFormatter.numbers(widths),
+                             points[1:]))
+            return
+        if len(points) == 1:
+            # A single point, draw a segment of length zero
+            parts.append("--")
+            parts.append(points[0])
+            return
+        
+        # If a stroke is closed after rounding, end it with "--cycle".
+        number = formatter.number
+        if (number(coords[0]) == number(coords[-2]) and
+                number(coords[1]) == number(coords[-1])):
+            points[-1] = "cycle"
+        parts.append("--")
+        parts.append("--".join(points[1:]))
+
+    def strokeOutline(self, stroke):
+        """
+        Write the outline of a stroke as a filled path, see
+        outline.strokeOutline().
+        """
+        texColor = self.useColor(stroke.color)
+        opacity = stroke.color[3]
+        options = texColor
+        if opacity != 1.0:
+            options += ",opacity={:.3}".format(opacity)
+        points = strokeOutline(stroke)
+        if self.formatter is None:
+            path = " {} -- cycle".format(" -- ".join(
+                       "({},{})".format(round(x, 2), round(y, 2))
+                       for x, y in points))
+        else:
+            path = "{}--cycle".format("--".join(self.formatter.coordinates(
+                       [x for x, y in points], [y for x, y in points],
+                       self.relative)))
+        self.writePath(options, path, (texColor, None, opacity),
+                       command="fill")
+        
+    def curve(self, curve):
+        """
+        Write a path of Bezier curves in the output file.
+        
+        The output will look similar to this:
+          \draw[color,line width=1pt] (x,y) .. controls (x1,y1) and (x2,y2) .. (x3,y3) ... ;
+        """
+        texColor = self.useColor(curve.color)
+        opacity = curve.color[3]
+        number = self.number
+        width = self.width(curve.width)
+        options = "{},line width={}pt".format(texColor, width)
+        if opacity != 1.0:
+            options += ",opacity={:.3}".format(opacity)
+        parts = [" ({}, {})".format(number(curve.start[0]),
+                                    number(curve.start[1]))]
+        parts.extend(" .. controls ({}, {}) and ({}, {}) .. ({}, {})".format(
+                         number(x1, 2), number(y1, 2), number(x2, 2),
+                         number(y2, 2), number(x), number(y))
+                     for x1, y1, x2, y2, x, y in curve.segments)
+        self.writePath(options, "".join(parts), (texColor, width, opacity))
         
     def textbox(self, textbox):
         """
@@ -120,16 +527,47 @@ class TikzLineWidth(OutputModule):
         """
         coordX = textbox.x
         coordY = textbox.y + 2.5  # shift down by 2.5pt to match Xournals output
-        texColor = self.toTexColor(textbox.color)
+        texColor = self.useColor(textbox.color)
         opacity = textbox.color[3]
         text = textbox.text.replace('\n', "\\\\")
 
-        self.write("  \\node[align=left, below right, inner sep=0pt")
+        options = "align=left, below right, inner sep=0pt"
+        if texColor != "black":
+            options += "," + texColor
+        if opacity != 1.0:
+            options += ",opacity={:.3}".format(opacity)
+        self.writePath(options, " at ({},{}) {{{}}}".format(
+                           self.number(coordX), self.number(coordY), text),
+                       command="node")
+
+    def shapeOptions(self, width, color, extra=None):
+        """
+        Return the option list of a \draw command for a shape, e.g.:
+          [line width=width, color, opacity=0.5]
+        
+        Keyword arguments:
+        width -- Line width in pt (mandatory)
+        color -- Color tuple (mandatory)
+        extra -- Further option appended to the list (default None)
+        """
+        options = self._shapeOptions(width, color)[0]
+        if extra is not None:
+            options += "," + extra
+        return "[" + options + "]"
+
+    def _shapeOptions(self, width, color):
+        """
+        Return the options of a shape without brackets and its group key.
+        """
+        texColor = self.useColor(color)
+        opacity = color[3]
+        width = self.width(width)
+        options = "line width={}pt".format(width)
         if texColor != "black":
-            self.write("," + texColor)
+            options += "," + texColor
         if opacity != 1.0:
-            self.write(",opacity={:.3}".format(opacity))
-        self.write("] at ({},{}) {{{}}};\n".format(coordX, coordY, text))
+            options += ",opacity={:.3}".format(opacity)
+        return options, (texColor, width, opacity)
 
     def circle(self, circle):
         """
@@ -138,19 +576,13 @@ class TikzLineWidth(OutputModule):
         The output will look similar to this:
           \draw[line width=width, color, opacity=0.5] (x,y) circle (radius);
         """
-        coordX = round(circle.x, 3)
-        coordY = round(circle.y, 3)
-        width = circle.width
-        texColor = self.toTexColor(circle.color)
-        opacity = circle.color[3]
-        radius = round(circle.radius, 3)
+        coordX = self.number(circle.x, 3)
+        coordY = self.number(circle.y, 3)
+        radius = self.number(circle.radius, 3)
 
-        self.write("  \\draw[line width={}pt".format(width))
-        if texColor != "black":
-            self.write("," + texColor)
-        if opacity != 1.0:
-            self.write(",opacity={:.3}".format(opacity))
-        self.write("] ({},{}) circle ({});\n".format(coordX, coordY, radius))
+        options, key = self._shapeOptions(circle.width, circle.color)
+        self.writePath(options, " ({},{}) circle ({})".format(coordX, coordY,
+                                                              radius), key)
 
     def rectangle(self, rect):
         """
@@ -158,45 +590,69 @@ class TikzLineWidth(OutputModule):
         
         The output will look similar to this:
           \draw[line width=width, color, opacity=0.5] (x1,y1) rectangle (x2,y2);
+        
+        Rotated rectangles get an additional option:
+          rotate around={angle:(x,y)}
+        
+        The corners of detected boxes are computed, so they are rounded to
+        three decimal places like those of ellipses.
         """
-        firstX = rect.x1
-        firstY = rect.y1
-        secondX = rect.x2
-        secondY = rect.y2
-        width = rect.width
-        texColor = self.toTexColor(rect.color)
-        opacity = rect.color[3]
+        number = self.number
+        firstX = number(rect.x1, 3)
+        firstY = number(rect.y1, 3)
+        secondX = number(rect.x2, 3)
+        secondY = number(rect.y2, 3)
+        if round(rect.angle, 2):
+            extra = "rotate around={{{}:({},{})}}".format(
+                        number(rect.angle, 2),
+                        number((rect.x1 + rect.x2) / 2, 3),
+                        number((rect.y1 + rect.y2) / 2, 3))
+        else:
+            extra = None
 
-        self.write("  \\draw[line width={}pt".format(width))
-        if texColor != "black":
-            self.write("," + texColor)
-        if opacity != 1.0:
-            self.write(",opacity={:.3}".format(opacity))
-        self.write("] ({},{}) rectangle ({},{});\n".format(firstX, firstY,
-                                                           secondX, secondY))
+        options, key = self._shapeOptions(rect.width, rect.color)
+        self.writePath(options, " ({},{}) rectangle ({},{})".format(
+                           firstX, firstY, secondX, secondY), key, extra)
+
+    def polygon(self, polygon):
+        """
+        Write a closed polygon in the output file.
+        
+        The output will look similar to this:
+          \draw[line width=width, color, opacity=0.5] (x1,y1) -- (x2,y2) -- (x3,y3) -- cycle;
+        """
+        options, key = self._shapeOptions(polygon.width, polygon.color)
+        parts = []
+        for x, y in polygon.points:
+            parts.append(" ({},{}) --".format(self.number(x, 3),
+                                              self.number(y, 3)))
+        parts.append(" cycle")
+        self.writePath(options, "".join(parts), key)
 
     def ellipse(self, ell):
         """
-        Write a rectangle in the output file.
+        Write an ellipse in the output file.
         
         The output will look similar to this:
           \draw[line width=width, color, opacity=0.5] (x,y) ellipse (width and height);
+        
+        Rotated ellipses get an additional option:
+          rotate around={angle:(x,y)}
         """
-        x = round((ell.left + ell.right) / 2, 3)
-        y = round((ell.top + ell.bottom) / 2, 3)
-        halfWidth = round((ell.left - ell.right) / 2, 3)
-        halfHeight = round((ell.top - ell.bottom) / 2, 3)
-        width = ell.width
-        texColor = self.toTexColor(ell.color)
-        opacity = ell.color[3]
+        number = self.number
+        x = number((ell.left + ell.right) / 2, 3)
+        y = number((ell.top + ell.bottom) / 2, 3)
+        halfWidth = number(abs(ell.left - ell.right) / 2, 3)
+        halfHeight = number(abs(ell.top - ell.bottom) / 2, 3)
+        if round(ell.angle, 2):
+            extra = "rotate around={{{}:({},{})}}".format(
+                        number(ell.angle, 2), x, y)
+        else:
+            extra = None
 
-        self.write("  \\draw[line width={}pt".format(width))
-        if texColor != "black":
-            self.write("," + texColor)
-        if opacity != 1.0:
-            self.write(",opacity={:.3}".format(opacity))
-        self.write("] ({},{}) ellipse ({} and {});\n".format(x, y, halfWidth,
-                                                             halfHeight))
+        options, key = self._shapeOptions(ell.width, ell.color)
+        self.writePath(options, " ({},{}) ellipse ({} and {})".format(
+                           x, y, halfWidth, halfHeight), key, extra)
 
     def footer(self):
         """Close the tikzpicture environment."""
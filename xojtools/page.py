@@ -23,7 +23,8 @@ class Page:
     
     A page contains one or more layers
     """
-    def __init__(self, number=-1, layerList=None, width=-1, height=-1):
+    def __init__(self, number=-1, layerList=None, width=-1, height=-1,
+                 digest=None):
         """
         Constructor
         
@@ -32,6 +33,8 @@ class Page:
         layerList -- List of 'Layer' objects (default [])
         width -- 'Physical' width of the page in pt (default -1)
         height -- 'Physical' height of the page in pt (default -1)
+        digest -- Hash of the page's XML content, used to identify unchanged
+                  pages (default None)
         """
         self.number = number
         self.layerList = layerList
@@ -39,6 +42,7 @@ class Page:
             self.layerList = []
         self.width = width
         self.height = height
+        self.digest = digest
     
     def __str__(self):
         return "Page " + str(self.number)
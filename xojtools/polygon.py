@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+class Polygon:
+    """
+    Represents a closed Polygon (identified by its corners).
+    
+    Note that Xournal does not save polygons as such in its .xoj files.
+    We need to do our best to recognize them.
+    """
+    def __init__(self, color=None, points=None, width=0):
+        """
+        Constructor
+        
+        Keyword arguments:
+        color -- Polygon color, tuple of red, green, blue and opacity (default (0,0,0,1.0))
+        points -- List of (x, y) tuples, one for every corner (default [])
+        width -- Width of the stroke in pt (default 0)
+        """
+        self.color = color
+        if color is None:
+            self.color = (0, 0, 0, 1.0)
+        self.points = points
+        if points is None:
+            self.points = []
+        self.width = width
+        
+    def __str__(self):
+        return "Polygon with {} corners {} with color '{}' and width {}pt"\
+               .format(len(self.points), self.points, self.color, self.width)
+
+    def print(self, prefix=""):
+        """
+        Print a short description of the object.
+        (for debugging purposes)
+        
+        Keyword arguments:
+        prefix -- Prefix output with this string (default "")
+        """
+        print("{}Polygon with {} corners {} with color '{}' and width {}pt"\
+              .format(prefix, len(self.points), self.points, self.color,
+                      self.width))
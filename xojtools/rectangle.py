@@ -19,12 +19,14 @@
 
 class Rectangle:
     """
-    Represents a Rectangle (identfied by its lower left and upper right corner).
+    Represents a Rectangle (identfied by its lower left and upper right corner,
+    it may be rotated around its center).
     
     Note that Xournal does not save rectangles as such in its .xoj files.
     We need to do our best to recognize them.
     """
-    def __init__(self, color=None, x1=-1.0, y1=-1.0, x2=-1.0, y2=-1.0, width=0):
+    def __init__(self, color=None, x1=-1.0, y1=-1.0, x2=-1.0, y2=-1.0, width=0,
+                 angle=0.0):
         """
         Constructor
         
@@ -35,6 +37,8 @@ class Rectangle:
         x2 -- x-Coordinate of upper right corner (default -1.0)
         y2 -- y-Coordinate of upper right corner (default -1.0)
         width -- Width of the stroke in pt (default 0)
+        angle -- Counterclockwise rotation around the center in degrees
+                 (default 0.0)
         """
         self.color = color
         if color is None:
@@ -44,11 +48,13 @@ class Rectangle:
         self.x2 = x2
         self.y2 = y2
         self.width = width
+        self.angle = angle
         
     def __str__(self):
-        return "Rectangle at ({},{}) to ({},{}) with color '{}' and width {}pt"\
-               .format(self.x1, self.y1, self.x2, self.y2, self.color,
-                       self.width)
+        return "Rectangle at ({},{}) to ({},{}) rotated by {} degrees with "\
+               "color '{}' and width {}pt"\
+               .format(self.x1, self.y1, self.x2, self.y2, self.angle,
+                       self.color, self.width)
 
     def print(self, prefix=""):
         """
@@ -58,6 +64,7 @@ class Rectangle:
         Keyword arguments:
         prefix -- Prefix output with this string (default "")
         """
-        print("{}Rectangle at ({},{}) to ({},{}) with color '{}' and width {}pt"\
-              .format(prefix, self.x1, self.y1, self.x2, self.y2, self.color,
-                      self.width))
+        print("{}Rectangle at ({},{}) to ({},{}) rotated by {} degrees with "
+              "color '{}' and width {}pt"\
+              .format(prefix, self.x1, self.y1, self.x2, self.y2, self.angle,
+                      self.color, self.width))
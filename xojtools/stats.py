@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# This file is part of xoj2tikz.
+# Copyright (C) 2012 Fabian Henze
+# 
+# xoj2tikz is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# xoj2tikz is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import json
+import collections
+
+"""Statistics about the optimization passes and the output of a conversion."""
+
+class PassStatistics:
+    """Counters of a single optimization pass."""
+    def __init__(self, name):
+        """
+        Constructor
+        
+        Keyword arguments:
+        name -- Name of the pass (mandatory)
+        """
+        self.name = name
+        self.time = 0.0
+        self.examined = 0
+        self.replaced = 0
+        self.pointsRemoved = 0
+
+    def merge(self, other):
+        """Add the counters of another PassStatistics object."""
+        self.time += other.time
+        self.examined += other.examined
+        self.replaced += other.replaced
+        self.pointsRemoved += other.pointsRemoved
+
+    def asDict(self):
+        """Return the counters as a dict."""
+        return {"time": self.time, "examined": self.examined,
+                "replaced": self.replaced, "pointsRemoved": self.pointsRemoved}
+
+class Statistics:
+    """
+    Statistics collected while converting one or more documents.
+    
+    The optimization passes are timed and counted by a PassManager, the size
+    of the output by a ByteCounter. Every point that is removed from a stroke
+    or replaced by a shape is counted by exactly one pass, so the points
+    removed by all passes add up to the difference of 'inputPoints' and
+    'outputPoints'.
+    """
+    def __init__(self):
+        self.passes = collections.OrderedDict()
+        self.pages = 0
+        self.strokes = 0
+        self.featureTime = 0.0
+        self.inputPoints = 0
+        self.outputPoints = 0
+        self.outputBytes = 0
+
+    def passStatistics(self, name):
+        """Return the PassStatistics of a pass, create it if necessary."""
+        if name not in self.passes:
+            self.passes[name] = PassStatistics(name)
+        return self.passes[name]
+
+    def merge(self, other):
+        """Add the statistics of another Statistics object."""
+        for name, passStatistics in other.passes.items():
+            self.passStatistics(name).merge(passStatistics)
+        self.pages += other.pages
+        self.strokes += other.strokes
+        self.featureTime += other.featureTime
+        self.inputPoints += other.inputPoints
+        self.outputPoints += other.outputPoints
+        self.outputBytes += other.outputBytes
+
+    def clear(self):
+        """Reset all counters."""
+        self.__init__()
+
+    def asDict(self):
+        """Return all statistics as a dict, e.g. for json.dump()."""
+        return {"pages": self.pages, "strokes": self.strokes,
+                "featureTime": self.featureTime,
+                "inputPoints": self.inputPoints,
+                "outputPoints": self.outputPoints,
+                "outputBytes": self.outputBytes,
+                "passes": collections.OrderedDict(
+                    (name, passStatistics.asDict())
+                    for name, passStatistics in self.passes.items())}
+
+    def json(self):
+        """Return all statistics as a JSON string."""
+        return json.dumps(self.asDict(), indent=2)
+
+    def table(self):
+        """Return all statistics as a human readable table."""
+        lines = ["{:<12} {:>10} {:>10} {:>10} {:>14}".format(
+                     "pass", "time", "examined", "replaced", "points removed")]
+        for name, passStatistics in self.passes.items():
+            lines.append("{:<12} {:>9.4f}s {:>10} {:>10} {:>14}".format(
+                             name, passStatistics.time,
+                             passStatistics.examined, passStatistics.replaced,
+                             passStatistics.pointsRemoved))
+        lines.append("{:<12} {:>9.4f}s {:>10}".format(
+                         "(features)", self.featureTime, self.strokes))
+        lines.append("")
+        lines.append("pages optimized: {}".format(self.pages))
+        lines.append("input points:    {}".format(self.inputPoints))
+        lines.append("output points:   {}".format(self.outputPoints))
+        lines.append("output bytes:    {}".format(self.outputBytes))
+        return "\n".join(lines) + "\n"
+
+class ByteCounter:
+    """
+    File-like wrapper that counts the bytes written to a text file in
+    Statistics.outputBytes.
+    """
+    def __init__(self, output, statistics, encoding="utf-8"):
+        """
+        Constructor
+        
+        Keyword arguments:
+        output -- The wrapped file-like object (mandatory)
+        statistics -- Statistics object to update (mandatory)
+        encoding -- Encoding used to count the bytes (default "utf-8")
+        """
+        self.output = output
+        self.statistics = statistics
+        self.encoding = encoding
+
+    def write(self, text):
+        self.statistics.outputBytes += len(text.encode(self.encoding))
+        return self.output.write(text)
+
+    def flush(self):
+        self.output.flush()
@@ -17,15 +17,28 @@
 # You should have received a copy of the GNU General Public License
 # along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
 
+from array import array
+
 class Stroke:
     """
     Stores information about a Xournal penstroke, possibly with variable width.
     
     A Stroke is created by the Xournal tools "pen", "highlighter" or "eraser".
-    If a stroke has variable width, self.coordList contains tuples of three
-    else tuples of two floats.
+    
+    Internally the points of a stroke are kept in two flat arrays of doubles:
+    self.coords holds the x and y coordinates in alternating order, and
+    self.widths holds the width of every segment (or is None, if the stroke
+    has a fixed width). The width of segment i ends at point i+1.
+    
+    For code that prefers a list of points, self.coordList provides a view
+    with a list of three (x, y, width) or, if the stroke has a fixed width,
+    of two (x, y) floats per point. This view is only created when it is
+    accessed, and it replaces the arrays until self.coords or self.widths
+    are accessed again. Do not hold on to one representation while using
+    the other.
     """
-    def __init__(self, color=None, coordList=None, width=0):
+    def __init__(self, color=None, coordList=None, width=0, coords=None,
+                 widths=None):
         """
         Constructor
         
@@ -33,14 +46,103 @@ class Stroke:
         color -- Stroke color, tuple of red, green, blue and opacity (default (0,0,0,1.0))
         coordList -- List of coordinates the stroke goes through (default [])
         width -- Width of the stroke in pt (default 0)
+        coords -- array('d') of alternating x and y coordinates, used instead
+                  of coordList (default None)
+        widths -- array('d') of segment widths in pt if the stroke has
+                  variable width, only used together with coords
+                  (default None)
         """
         self.color = color
         if color is None:
             self.color = (0, 0, 0, 1.0)
-        self.coordList = coordList
-        if coordList is None:
-            self.coordList = []
+        self._coordList = None
+        self._coords = None
+        self._widths = None
+        if coords is not None:
+            self._coords = coords
+            self._widths = widths
+        elif coordList is not None:
+            self._coordList = coordList
+        else:
+            self._coords = array('d')
         self.width = width
+
+    @property
+    def coordList(self):
+        """List of [x, y] or [x, y, width] lists, one per point."""
+        if self._coordList is None:
+            coords = self._coords
+            xs = coords[0::2]
+            ys = coords[1::2]
+            if self._widths is None:
+                self._coordList = [[x, y] for x, y in zip(xs, ys)]
+            else:
+                widths = self._widths
+                # Xournal stores one width per segment, the first point
+                # carries the width of the last segment.
+                self._coordList = [[xs[i], ys[i], widths[i-1]]
+                                   for i in range(len(xs))]
+            self._coords = None
+            self._widths = None
+        return self._coordList
+
+    @coordList.setter
+    def coordList(self, value):
+        self._coordList = value
+        self._coords = None
+        self._widths = None
+
+    @property
+    def coords(self):
+        """array('d') of alternating x and y coordinates."""
+        if self._coords is None:
+            self._pack()
+        return self._coords
+
+    @property
+    def widths(self):
+        """array('d') of segment widths, or None if the width is fixed."""
+        if self._coords is None:
+            self._pack()
+        return self._widths
+
+    def setCoords(self, coords, widths=None):
+        """
+        Replace the points of this stroke.
+        
+        Keyword arguments:
+        coords -- array('d') of alternating x and y coordinates
+        widths -- array('d') of segment widths or None (default None)
+        """
+        self._coords = coords
+        self._widths = widths
+        self._coordList = None
+
+    def pointCount(self):
+        """Return the number of points of this stroke."""
+        if self._coordList is not None:
+            return len(self._coordList)
+        return len(self._coords) // 2
+
+    def hasVariableWidth(self):
+        """Return True if the width of this stroke varies along its path."""
+        if self._coordList is not None:
+            return len(self._coordList) > 0 and len(self._coordList[0]) == 3
+        return self._widths is not None
+
+    def _pack(self):
+        """Convert self.coordList back to flat arrays."""
+        coordList = self._coordList
+        coords = array('d')
+        for point in coordList:
+            coords.append(point[0])
+            coords.append(point[1])
+        if len(coordList) > 0 and len(coordList[0]) == 3:
+            self._widths = array('d', [point[2] for point in coordList[1:]])
+        else:
+            self._widths = None
+        self._coords = coords
+        self._coordList = None
         
     def __str__(self):
         return "Stroke with color '{}' and coords: {}"\
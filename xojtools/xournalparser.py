@@ -18,15 +18,17 @@
 # along with xoj2tikz.  If not, see <http://www.gnu.org/licenses/>.
 
 import sys
-import re
+import hashlib
+from array import array
 
 import xml.etree.cElementTree as ET
 
 from . import Page, Layer, Stroke, TextBox
+from .color import Palette, parseColor
 
 """A parser for Xournal files using the ElementTree API."""
 
-def parse(file):
+def parse(file, palette=None, digest=False):
     """
     Parse a Xournal .xoj file (wrapper function of ElementTree.parse())
     
@@ -35,22 +37,76 @@ def parse(file):
     
     Positional Arguments:
     file -- A file-like object or a string with Xournal XML content (NOT gziped)
+    
+    Keyword arguments:
+    palette -- Palette that collects the colors of the document. Items refer
+               to the Color objects of this palette. (default: a new Palette)
+    digest -- Store a hash of every page's XML content in Page.digest
+              (default False)
     """
+    if palette is None:
+        palette = Palette()
     tree = ET.parse(file)
 
     if tree.getroot().tag != "xournal":
         raise Exception("Not a xournal document")
     
-    return _root(tree.getroot())
+    return _root(tree.getroot(), palette, digest)
+
+def iterparse(file, palette=None, digest=False):
+    """
+    Parse a Xournal .xoj file incrementally and yield one 'Page' at a time.
+
+    Unlike parse(), the document is never held in memory as a whole: every
+    page element is converted to a Page object as soon as it has been read and
+    is then discarded, together with the (potentially large) preview image.
+    Memory usage therefore does not depend on the number of pages.
+
+    Positional Arguments:
+    file -- A file-like object with Xournal XML content (NOT gziped)
     
-def _root(root):
+    Keyword arguments:
+    palette -- Palette that collects the colors of the document. It is filled
+               while the pages are read. (default: a new Palette)
+    digest -- Store a hash of every page's XML content in Page.digest
+              (default False)
+    """
+    if palette is None:
+        palette = Palette()
+    context = ET.iterparse(file, events=("start", "end"))
+    root = None
+    depth = 0
+
+    for event, element in context:
+        if event == "start":
+            if root is None:
+                if element.tag != "xournal":
+                    raise Exception("Not a xournal document")
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only direct children of the root element are handled here, their
+        # subtrees are complete once their end event has been reached.
+        if depth != 1:
+            continue
+
+        if element.tag == "page":
+            yield _page(element, palette, digest)
+        elif element.tag not in ("title", "preview"):
+            raise Exception("Unknown tag: xournal/" + element.tag)
+        # Drop the processed subtree, so it can be garbage-collected
+        root.clear()
+
+def _root(root, palette, digest):
     """Parse root element and its subtree"""
     
     pages = []
     
     for element in root:
         if element.tag == "page":
-            pages.append(_page(element))
+            pages.append(_page(element, palette, digest))
             
         elif element.tag == "title":
             # The title is the same for every Xournal file -> ignore
@@ -63,7 +119,7 @@ def _root(root):
         
     return pages
 
-def _page(page):
+def _page(page, palette, digest=False):
     """Parse 'page' element and its subtree"""
     
     layers = []
@@ -72,7 +128,7 @@ def _page(page):
     
     for element in page:
         if element.tag == "layer":
-            layers.append(_layer(element))
+            layers.append(_layer(element, palette))
         
         elif element.tag == "background":
             pass #TODO
@@ -81,9 +137,14 @@ def _page(page):
         else:
             raise Exception("Unknown tag: xournal/page/" + element.tag)
     
-    return Page(layerList=layers, width=width, height=height)
+    if digest:
+        digest = hashlib.sha1(ET.tostring(page)).hexdigest()
+    else:
+        digest = None
+    
+    return Page(layerList=layers, width=width, height=height, digest=digest)
 
-def _layer(layer):
+def _layer(layer, palette):
     """Parse 'layer' element and its subtree"""
     
     items = []
@@ -91,9 +152,9 @@ def _layer(layer):
     
     for element in layer:
         if element.tag == "stroke":
-            item = _stroke(element)
+            item = _stroke(element, palette)
         elif element.tag == "text":
-            item = _text(element)
+            item = _text(element, palette)
         
         elif element.tag == "image":
             pass #TODO
@@ -105,7 +166,7 @@ def _layer(layer):
     
     return Layer(itemList=items)
 
-def _stroke(stroke):
+def _stroke(stroke, palette):
     """Parse 'stroke' element"""
     
     tool = stroke.attrib["tool"]
@@ -114,34 +175,30 @@ def _stroke(stroke):
               file=sys.stderr)
         return
 
-    coordinates = []
-    temp = [float(x) for x in stroke.text.strip().split(' ') if len(x) > 0]
-    widths = [max(0.0, float(x)) for x in stroke.attrib["width"].split(' ')]
+    coordinates = array('d', map(float, stroke.text.split()))
+    if len(coordinates) % 2 == 1:
+        del coordinates[-1]
+    widths = array('d', [max(0.0, float(x))
+                         for x in stroke.attrib["width"].split()])
     nominalWidth = widths.pop(0)
     if tool == "highlighter":
-        color = getColor(stroke.attrib["color"], defaultOpacity=0.5)
+        color = palette.get(stroke.attrib["color"], defaultOpacity=0.5)
     else:
-        color = getColor(stroke.attrib["color"])
-    
-    for i in range(int(len(temp)/2)):
-        x = temp[2*i]
-        y = temp[2*i+1]
-        if len(widths) > 0:
-            width = widths[i-1]
-            coordinates.append([x, y, width])
-        else:
-            coordinates.append([x, y])
+        color = palette.get(stroke.attrib["color"])
+    if len(widths) == 0:
+        widths = None
 
-    return Stroke(color=color, coordList=coordinates, width=nominalWidth)
+    return Stroke(color=color, coords=coordinates, widths=widths,
+                  width=nominalWidth)
     
-def _text(text):
+def _text(text, palette):
     """Parse 'text' element"""
     
     font = text.attrib["font"]
     size = float(text.attrib["size"])
     x = float(text.attrib["x"])
     y = float(text.attrib["y"])
-    color = getColor(text.attrib["color"])
+    color = palette.get(text.attrib["color"])
     content = text.text
     
     return TextBox(font=font, size=size, x=x, y=y, color=color, text=content)
@@ -150,43 +207,12 @@ def getColor(code, defaultOpacity=1.0):
     """
     Parse a xournal color name and return a tuple of four: (r, g, b, opacity)
 
+    The result is a xojtools.color.Color. Use a Palette to share equal colors
+    between items.
+
     Keyword arguments:
     code -- The color string to parse (mandatory)
     defaultOpacity -- If 'code' does not contain opacity information, use this.
                       (default 1.0)
     """
-    opacity = defaultOpacity
-    regex = re.compile(r"#([0-9a-fA-F]{2})([0-9a-fA-F]{2})"
-                       r"([0-9a-fA-F]{2})([0-9a-fA-F]{2})")
-    
-    if code == "black":
-        r, g, b = (0, 0, 0)
-    elif code == "blue":
-        r, g, b = (51, 51, 204)
-    elif code == "red":
-        r, g, b = (255, 0, 0)
-    elif code == "green":
-        r, g, b = (0, 128, 0)
-    elif code == "gray":
-        r, g, b = (128, 128, 128)
-    elif code == "lightblue":
-        r, g, b = (0, 192, 255)
-    elif code == "lightgreen":
-        r, g, b = (0, 255, 0)
-    elif code == "magenta":
-        r, g, b = (255, 0, 255)
-    elif code == "orange":
-        r, g, b = (255, 128, 0)
-    elif code == "yellow":
-        r, g, b = (255, 255, 0)
-    elif code == "white":
-        r, g, b = (255, 255, 255)
-    elif re.match(regex, code):
-        r, g, b, opacity = re.match(regex, code).groups()
-        r = int(r, 16)
-        g = int(g, 16)
-        b = int(b, 16)
-        opacity = int(opacity, 16)/255.0
-    else:
-        raise Exception("invalid color")
-    return (r, g, b, opacity)
+    return parseColor(code, defaultOpacity)